@@ -1,12 +1,22 @@
 from flask import Flask
+from werkzeug.exceptions import HTTPException
 from flask_cors import CORS
 from config import Config
-from routes.qr_routes import qr_bp
-from routes.history_routes import history_bp
+from routes.qr_routes import qr_bp, warm_decoder
+from routes.history_routes import history_bp, history_pruner
+from routes.stats_routes import stats_bp
+from routes.scan_stream_routes import scan_stream_bp, scan_stream_async, sock
+from utils.file_handler import BATCH_ENDPOINTS, InMemoryRequest
+from utils import metrics
+from utils.asgi import AsgiApp
+from utils.decode_executor import decode_executor
+from utils.warmup import readiness, warm_codecs
+from models.qr_history import qr_history
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.request_class = InMemoryRequest
     
     # Initialize CORS
     CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=True)
@@ -14,9 +24,15 @@ def create_app():
     # Initialize config
     Config.init_app(app)
     
+    # Request latency, byte and error metrics for /metrics
+    metrics.init_app(app)
+    
     # Register blueprints
     app.register_blueprint(qr_bp, url_prefix='/api')
     app.register_blueprint(history_bp, url_prefix='/api')
+    app.register_blueprint(stats_bp, url_prefix='/api')
+    app.register_blueprint(scan_stream_bp, url_prefix='/api')
+    sock.init_app(app)
     
     @app.route('/')
     def index():
@@ -26,10 +42,20 @@ def create_app():
             'endpoints': {
                 'scan_file': '/api/scan/file',
                 'scan_data': '/api/scan/data',
+                'scan_raw': '/api/scan/raw',
+                'scan_stream': '/api/scan/stream',
+                'scan_batch': '/api/scan/batch',
                 'generate': '/api/generate',
+                'generate_batch': '/api/generate/batch',
                 'info': '/api/info',
                 'history': '/api/history',
-                'history_stats': '/api/history/stats'
+                'history_stats': '/api/history/stats',
+                'history_search': '/api/history/search',
+                'history_export': '/api/history/export',
+                'history_import': '/api/history/import',
+                'stats': '/api/stats',
+                'metrics': '/metrics',
+                'ready': '/ready'
             }
         }
     
@@ -37,6 +63,18 @@ def create_app():
     def health_check():
         return {'status': 'healthy', 'message': 'API is running'}
     
+    @app.route('/ready')
+    def readiness_check():
+        # Servers without the Gunicorn hook start warming on the first probe
+        warm_up()
+        status = readiness.status()
+        return status, 200 if status['ready'] else 503
+    
+    @app.route('/metrics')
+    def prometheus_metrics():
+        output, content_type = metrics.render_metrics()
+        return output, 200, {'Content-Type': content_type}
+    
     @app.errorhandler(400)
     def bad_request(error):
         return {'error': 'Bad request'}, 400
@@ -55,9 +93,53 @@ def create_app():
     
     return app
 
+def warm_up():
+    """Warm this process up in the background; /ready answers 200 when done.
+
+    Runs after fork (gunicorn.conf.py post_worker_init) because threads,
+    connections and the decode pool belong to the worker process.
+    """
+    readiness.start([
+        ('codecs', warm_codecs),
+        ('schema', qr_history.init_db),
+        # Background history retention (no-op when disabled)
+        ('history_pruner', history_pruner.start),
+        ('decode_pool', decode_executor.start),
+        ('decode', warm_decoder)
+    ])
+
+def create_asgi_app(wsgi_app):
+    """ASGI entry point serving wsgi_app: gunicorn -k asgi app:asgi_app.
+
+    Bodies are received without holding a thread and WebSocket scans are
+    coroutines; see utils.asgi.AsgiApp.
+    """
+    adapter = wsgi_app.url_map.bind('localhost')
+    
+    def max_body(method, path):
+        # InMemoryRequest's per-endpoint limit, before the body is received
+        try:
+            endpoint, _ = adapter.match(path, method=method)
+        except HTTPException:
+            return Config.MAX_CONTENT_LENGTH
+        if endpoint in BATCH_ENDPOINTS:
+            return Config.BATCH_MAX_CONTENT_LENGTH
+        return Config.MAX_CONTENT_LENGTH
+    
+    return AsgiApp(
+        wsgi_app,
+        websockets={'/api/scan/stream': scan_stream_async},
+        on_startup=warm_up,
+        threads=Config.ASGI_THREADS,
+        max_body=max_body,
+        spool_bytes=Config.MAX_CONTENT_LENGTH
+    )
+
 #this is app qr-scanner app
 app = create_app()
+asgi_app = create_asgi_app(app)
 
 if __name__ == '__main__':
     # This block is used for local development and is not run by Gunicorn.
+    warm_up()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
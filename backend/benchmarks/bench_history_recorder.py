@@ -0,0 +1,69 @@
+"""Compare history write throughput for each HISTORY_WRITE_MODE.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_history_recorder [--records N] [--threads T]
+
+T writer threads each record N/T scan results (one record per call, as a
+camera scan with one code does). Throughput counts a record only once it
+is committed, so async mode includes the final flush. Per-call latency is
+what a request handler would wait for.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from models.qr_history import QRHistory
+from models.history_recorder import HistoryRecorder
+
+SAMPLE_DATA = {
+    'method': 'camera_capture',
+    'qr_info': {'type': 'url', 'length': 29},
+    'position': {'x': 10, 'y': 10, 'width': 120, 'height': 120}
+}
+
+def run_mode(mode, records, threads, workdir):
+    """Return (records/sec, per-call latencies in ms) for one mode"""
+    history = QRHistory(os.path.join(workdir, f'{mode}.db'))
+    history.init_db()
+    recorder = HistoryRecorder(history, mode=mode)
+
+    per_thread = records // threads
+    latencies = [[] for _ in range(threads)]
+
+    def writer(index):
+        for i in range(per_thread):
+            start = time.perf_counter()
+            recorder.record('scan', f'https://example.com/{index}/{i}', SAMPLE_DATA)
+            latencies[index].append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    recorder.close()
+    elapsed = time.perf_counter() - start
+
+    return per_thread * threads / elapsed, [ms for batch in latencies for ms in batch]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='qr-bench-')
+
+    print(f"{'mode':>6} {'rec/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for mode in HistoryRecorder.MODES:
+        rate, latencies = run_mode(mode, args.records, args.threads, workdir)
+        p99 = statistics.quantiles(latencies, n=100)[-1]
+        print(f'{mode:>6} {rate:10.0f} {statistics.median(latencies):9.3f} {p99:9.3f}')
+
+if __name__ == '__main__':
+    main()
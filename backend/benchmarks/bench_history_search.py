@@ -0,0 +1,61 @@
+"""Measure /api/history/search latency as the history table grows.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_history_search [--sizes 100000,1000000,5000000]
+
+Rows come from bench_history_stats.fill (URLs of the form
+https://example.com/item/<n>). Three query shapes are timed per size:
+
+  exact   - a single rare token (one matching row)
+  prefix  - a prefix matching about 1 in 1000 rows
+  common  - a token in every row, as a prefix and as a quoted whole word;
+            rank order has to score every match, recent order reads only
+            the newest page
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.bench_history_stats import fill
+from models.qr_history import QRHistory
+
+def queries(size):
+    return [
+        ('exact', str(size // 2), 'rank'),
+        ('prefix', str(size // 2)[:-3], 'rank'),
+        ('common', 'example', 'rank'),
+        ('common', 'example', 'recent'),
+        ('common', '"example"', 'recent')
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100000,1000000,5000000')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='qr-bench-')
+
+    print(f"{'rows':>10} {'query':>7} {'text':>12} {'sort':>7} {'p50 ms':>9} {'p95 ms':>9}")
+    for size in (int(value) for value in args.sizes.split(',')):
+        history = QRHistory(os.path.join(workdir, f'history-{size}.db'))
+        fill(history, size)
+
+        for label, query, sort in queries(size):
+            history.search(query, sort=sort)  # warm up
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                history.search(query, sort=sort)
+                samples.append((time.perf_counter() - start) * 1000)
+            p95 = statistics.quantiles(samples, n=20)[-1]
+            print(f'{size:>10} {label:>7} {query:>12} {sort:>7} '
+                  f'{statistics.median(samples):9.2f} {p95:9.2f}')
+
+        history.db.close_all()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Compare /api/history/stats strategies as the history table grows.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_history_stats [--sizes 10000,1000000,10000000]
+
+For each size a fresh database is filled through the normal schema (so
+the summary triggers run on every insert) and three strategies are timed:
+
+  legacy   - load the newest 1000 rows and count in Python, as the route
+             used to (only exact below 1000 rows)
+  group_by - aggregate the full table in SQL on every request
+  summary  - read the trigger-maintained qr_history_stats table
+
+Building the 10M-row database takes several minutes and about 1.5 GB.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from models.qr_history import QRHistory
+
+FILL_CHUNK = 100000
+
+def fill(history, rows):
+    """Insert synthetic rows spread over 90 days in large transactions"""
+    for start in range(0, rows, FILL_CHUNK):
+        count = min(FILL_CHUNK, rows - start)
+        with history.db.write() as conn:
+            conn.execute('''
+                WITH RECURSIVE seq(n) AS (
+                    SELECT ? UNION ALL SELECT n + 1 FROM seq WHERE n < ?
+                )
+                INSERT INTO qr_history (type, content, data, method, content_type, timestamp)
+                SELECT
+                    CASE n % 3 WHEN 0 THEN 'generate' ELSE 'scan' END,
+                    'https://example.com/item/' || n,
+                    json_object(
+                        'method', CASE n % 3 WHEN 0 THEN 'text_input' WHEN 1 THEN 'camera_capture' ELSE 'file_upload' END,
+                        'qr_info', json_object('type', CASE n % 4 WHEN 0 THEN 'text' ELSE 'url' END)
+                    ),
+                    CASE n % 3 WHEN 0 THEN 'text_input' WHEN 1 THEN 'camera_capture' ELSE 'file_upload' END,
+                    CASE n % 4 WHEN 0 THEN 'text' ELSE 'url' END,
+                    datetime('2024-01-01', '+' || (n % 90) || ' days', '+' || (n % 86400) || ' seconds')
+                FROM seq
+            ''', (start, start + count - 1))
+
+def legacy_stats(history):
+    records = history.get_history(1000)
+    stats = {'methods': {}, 'content_types': {}}
+    for record in records:
+        if record['data'] and 'method' in record['data']:
+            method = record['data']['method']
+            stats['methods'][method] = stats['methods'].get(method, 0) + 1
+        if record['data'] and 'qr_info' in record['data']:
+            content_type = record['data']['qr_info'].get('type', 'unknown')
+            stats['content_types'][content_type] = stats['content_types'].get(content_type, 0) + 1
+    return stats
+
+def group_by_stats(history):
+    conn = history.db.connection()
+    return {
+        'total': conn.execute('SELECT COUNT(*) FROM qr_history').fetchone()[0],
+        'types': conn.execute('SELECT type, COUNT(*) FROM qr_history GROUP BY type').fetchall(),
+        'methods': conn.execute('SELECT method, COUNT(*) FROM qr_history GROUP BY method').fetchall(),
+        'content_types': conn.execute(
+            'SELECT content_type, COUNT(*) FROM qr_history GROUP BY content_type'
+        ).fetchall()
+    }
+
+def time_call(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10000,1000000,10000000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='qr-bench-')
+
+    print(f"{'rows':>10} {'fill s':>8} {'legacy ms':>10} {'group_by ms':>12} {'summary ms':>11}")
+    for size in (int(value) for value in args.sizes.split(',')):
+        history = QRHistory(os.path.join(workdir, f'history-{size}.db'))
+        start = time.perf_counter()
+        fill(history, size)
+        fill_seconds = time.perf_counter() - start
+
+        assert history.get_stats()['total_records'] == size
+
+        legacy = time_call(lambda: legacy_stats(history), args.repeat)
+        group_by = time_call(lambda: group_by_stats(history), args.repeat)
+        summary = time_call(history.get_stats, args.repeat)
+        print(f'{size:>10} {fill_seconds:8.1f} {legacy:10.2f} {group_by:12.2f} {summary:11.3f}')
+
+        history.db.close_all()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(history.db_path + suffix):
+                os.remove(history.db_path + suffix)
+
+if __name__ == '__main__':
+    main()
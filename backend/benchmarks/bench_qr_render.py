@@ -0,0 +1,80 @@
+"""Compare the resize-based QR renderer with the direct-at-size renderer.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_qr_render [--repeat N]
+
+"legacy" is the original path (make_image at box_size=10, LANCZOS resize
+to the target size, PNG encode). "direct" rasterizes the module matrix at
+the target size with integer scaling and writes a 1-bit PNG; "svg" is the
+vector output. Building the module matrix (qr.make, which includes the
+mask-pattern search) is shared by all paths and reported separately.
+"""
+import argparse
+import io
+import statistics
+import time
+
+import numpy as np
+import qrcode
+from PIL import Image
+
+from utils.qr_renderer import ERROR_LEVELS, QRRenderer
+
+PAYLOAD = 'https://example.com/products/8f14e45fceea167a5a36dedd4bea2543?ref=label'
+SIZES = [150, 300, 600, 1200]
+
+def build_qr(error_correction):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=ERROR_LEVELS[error_correction],
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(PAYLOAD)
+    qr.make(fit=True)
+    return qr
+
+def render_legacy(qr, size):
+    """The original generate_qr_code rendering path"""
+    img = qr.make_image(fill_color="black", back_color="white")
+    img = img.resize(size, Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def render_direct(qr, size):
+    return QRRenderer.render_png(np.asarray(qr.get_matrix(), dtype=bool), size)
+
+def render_svg(qr, size):
+    return QRRenderer.render_svg(np.asarray(qr.get_matrix(), dtype=bool), size)
+
+def median_ms(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    renderers = [('legacy', render_legacy), ('direct', render_direct), ('svg', render_svg)]
+
+    print(f"{'size':>6} {'ec':>3} {'matrix ms':>10} "
+          + ' '.join(f'{name + " ms":>10} {name + " B":>10}' for name, _ in renderers))
+    for side in SIZES:
+        for error_correction in 'LMQH':
+            matrix_ms, qr = median_ms(lambda: build_qr(error_correction), args.repeat)
+            row = [f'{side:>6} {error_correction:>3} {matrix_ms:10.3f}']
+            for _, renderer in renderers:
+                ms, output = median_ms(lambda: renderer(qr, (side, side)), args.repeat)
+                row.append(f'{ms:10.3f} {len(output):10d}')
+            print(' '.join(row))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Compare per-call connections with the persistent tuned connection layer.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_sqlite_writers [--workers W] [--records N]
+
+W processes (standing in for Gunicorn workers) each insert N history
+records one transaction at a time into the same database file. 'legacy'
+opens a fresh connection per insert with SQLite defaults (rollback
+journal, synchronous=FULL, Python's 5s timeout), as QRHistory used to;
+'tuned' uses one QRHistory per process. Lock errors are counted rather
+than retried.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from models.qr_history import QRHistory
+
+SAMPLE_DATA = json.dumps({'method': 'camera_capture', 'qr_info': {'type': 'url'}})
+
+def legacy_writer(path, records, start_event, results):
+    start_event.wait()
+    errors = 0
+    for i in range(records):
+        try:
+            with sqlite3.connect(path) as conn:
+                conn.execute(
+                    'INSERT INTO qr_history (type, content, data) VALUES (?, ?, ?)',
+                    ('scan', f'legacy-{os.getpid()}-{i}', SAMPLE_DATA)
+                )
+                conn.commit()
+        except sqlite3.OperationalError:
+            errors += 1
+    results.put(errors)
+
+def tuned_writer(path, records, start_event, results):
+    history = QRHistory(path)
+    history.init_db()
+    start_event.wait()
+    errors = 0
+    for i in range(records):
+        try:
+            history.add_record('scan', f'tuned-{os.getpid()}-{i}', {'method': 'camera_capture'})
+        except sqlite3.OperationalError:
+            errors += 1
+    results.put(errors)
+
+def run(target, path, workers, records):
+    """Return (committed records/sec, lock errors)"""
+    ctx = multiprocessing.get_context('spawn')
+    start_event = ctx.Event()
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=target, args=(path, records, start_event, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    time.sleep(1.0)  # Let every worker import and connect first
+
+    start = time.perf_counter()
+    start_event.set()
+    errors = sum(results.get() for _ in processes)
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+
+    return (workers * records - errors) / elapsed, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--records', type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='qr-bench-')
+
+    print(f"{'mode':>7} {'rec/s':>10} {'lock errors':>12}")
+    for mode, target in (('legacy', legacy_writer), ('tuned', tuned_writer)):
+        path = os.path.join(workdir, f'{mode}.db')
+        history = QRHistory(path)
+        if mode == 'legacy':
+            # The old layer never enabled WAL, so build the schema directly
+            conn = sqlite3.connect(path)
+            history._create_schema(conn)
+            conn.close()
+        else:
+            history.init_db()
+            history.db.close_all()
+        rate, errors = run(target, path, args.workers, args.records)
+        print(f'{mode:>7} {rate:10.0f} {errors:12d}')
+
+if __name__ == '__main__':
+    main()
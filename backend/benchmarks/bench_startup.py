@@ -0,0 +1,158 @@
+"""Measure cold start: import time, time to ready and per-worker memory.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_startup [--workers 3] [--repeat 3]
+
+Three measurements per run:
+
+  import  - `import app` in a fresh interpreter: wall time and RSS
+  ready   - Gunicorn launch until /ready answers 200 (/health on builds
+            without /ready), then the latency of the first scan and the
+            first generate request each worker would otherwise pay
+  memory  - RSS, PSS and USS of the master, each worker and the decode
+            pool processes from /proc/<pid>/smaps_rollup after the first
+            requests. PSS splits shared pages between the processes
+            mapping them, so pages a preloaded master shares copy-on-write
+            show up as a lower PSS per worker while RSS stays about the same
+
+Set GUNICORN_PRELOAD=false to compare with workers importing the app
+themselves. Linux only (reads /proc).
+"""
+import argparse
+import http.client
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from loadtest.server import BACKEND_DIR, free_port
+
+IMPORT_SNIPPET = '''
+import time
+start = time.perf_counter()
+import app
+elapsed = (time.perf_counter() - start) * 1000
+with open('/proc/self/status') as status:
+    rss = next(int(line.split()[1]) for line in status if line.startswith('VmRSS'))
+print(elapsed, rss / 1024)
+'''
+
+def measure_import(env):
+    output = subprocess.run([sys.executable, '-c', IMPORT_SNIPPET], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout.split()
+    return float(output[0]), float(output[1])
+
+def memory(pid):
+    """(rss, pss, uss) in MB from smaps_rollup"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    uss = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    return fields.get('Rss', 0) / 1024, fields.get('Pss', 0) / 1024, uss / 1024
+
+def children(pid):
+    """Child pids of every thread (pool processes are started from request threads)"""
+    pids = []
+    for task in os.listdir(f'/proc/{pid}/task'):
+        with open(f'/proc/{pid}/task/{task}/children') as handle:
+            pids.extend(int(child) for child in handle.read().split())
+    return pids
+
+def get(port, path, body=None, headers=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    start = time.perf_counter()
+    connection.request('POST' if body else 'GET', path, body=body, headers=headers or {})
+    response = connection.getresponse()
+    response.read()
+    return response.status, (time.perf_counter() - start) * 1000
+
+def qr_png():
+    import qrcode
+    buffer = io.BytesIO()
+    qrcode.make('https://example.com/startup').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+def wait_ready(port, process, timeout=120):
+    """Seconds until /ready (or /health without /ready) answers 200"""
+    start = time.perf_counter()
+    path = '/ready'
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError('Gunicorn exited during startup')
+        try:
+            status, _ = get(port, path)
+            if status == 200:
+                return time.perf_counter() - start
+            if status == 404:
+                path = '/health'
+        except OSError:
+            pass
+        time.sleep(0.02)
+    raise RuntimeError(f'Not ready after {timeout}s')
+
+def measure_server(env, workers, threads, image):
+    port = free_port()
+    with tempfile.TemporaryDirectory(prefix='qr-startup-') as workdir:
+        env = dict(env, DATABASE_PATH=os.path.join(workdir, 'qr_history.db'),
+                   QR_CACHE_DIR=os.path.join(workdir, 'qr-cache'),
+                   PROMETHEUS_MULTIPROC_DIR=os.path.join(workdir, 'prometheus'))
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+             '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--threads', str(threads),
+             'app:app'],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            ready = wait_ready(port, process)
+            _, first_scan = get(port, '/api/scan/raw?cache=0', image, {'Content-Type': 'image/png'})
+            _, first_generate = get(port, '/api/generate?text=startup&format=png')
+
+            master = memory(process.pid)
+            worker_pids = children(process.pid)
+            workers_memory = [memory(pid) for pid in worker_pids]
+            # Decode pool processes are spawned by the worker that served the scan
+            pool_memory = [memory(pid) for worker in worker_pids for pid in children(worker)]
+            return ready, first_scan, first_generate, master, workers_memory, pool_memory
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    image = qr_png()
+
+    imports = [measure_import(env) for _ in range(args.repeat)]
+    print(f"import app: {statistics.median(ms for ms, _ in imports):.0f} ms, "
+          f"RSS {statistics.median(rss for _, rss in imports):.1f} MB")
+
+    runs = [measure_server(env, args.workers, args.threads, image) for _ in range(args.repeat)]
+    print(f"preload={env.get('GUNICORN_PRELOAD', 'default')} workers={args.workers}")
+    print(f"  ready:          {statistics.median(run[0] for run in runs) * 1000:8.0f} ms")
+    print(f"  first scan:     {statistics.median(run[1] for run in runs):8.0f} ms")
+    print(f"  first generate: {statistics.median(run[2] for run in runs):8.0f} ms")
+
+    _, _, _, master, workers, pool = runs[-1]
+    print(f"  {'process':<10} {'RSS MB':>8} {'PSS MB':>8} {'USS MB':>8}")
+    print(f"  {'master':<10} {master[0]:8.1f} {master[1]:8.1f} {master[2]:8.1f}")
+    for index, (rss, pss, uss) in enumerate(workers):
+        print(f"  {'worker ' + str(index):<10} {rss:8.1f} {pss:8.1f} {uss:8.1f}")
+    for index, (rss, pss, uss) in enumerate(pool):
+        print(f"  {'decode ' + str(index):<10} {rss:8.1f} {pss:8.1f} {uss:8.1f}")
+    total = master[1] + sum(item[1] for item in workers + pool)
+    print(f"  {'total PSS':<10} {total:>17.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""Micro-benchmarks of the real hot paths with JSON/CSV output and baselines.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_suite [--groups decode,generate,info,history]
+        [--json results.json] [--csv results.csv]
+        [--baseline benchmarks/baseline.json] [--threshold 0.25]
+
+Groups:
+
+  decode   - QRProcessor.decode_qr_from_bytes on every corpus image
+             (benchmarks.corpus); 'decoded' counts expected payloads found
+  generate - QRProcessor.generate_qr_code for each output format, cold
+             (new payload every call) and cached
+  info     - QRProcessor.get_qr_info for each content type
+  history  - every QRHistory operation on tables of --history-rows rows
+             filled like bench_history_stats
+
+The unit tests mock OpenCV, ZBar, NumPy and SQLite, so these are the only
+numbers for the real code. Decodes run inline (no process pool) and the
+generated-image disk cache is off, so results do not depend on the pool
+size or on earlier runs.
+
+With --baseline the run is compared by benchmark name against an earlier
+--json file. A benchmark is a regression when its median is more than
+--threshold slower or it decodes fewer codes; the exit status is then 1.
+Only compare runs from the same machine and library versions.
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+
+from config import Config
+
+# Decode inline and keep generated images off disk before the app modules load
+Config.DECODE_WORKERS = 0
+Config.QR_CACHE_DIR = ''
+
+from benchmarks import harness
+from benchmarks.bench_history_stats import fill
+from benchmarks.corpus import QUICK_VARIANTS, VARIANTS, build_corpus, make_payload
+from models.qr_history import QRHistory
+from utils.qr_processor import QRProcessor
+
+GROUPS = ('decode', 'generate', 'info', 'history')
+
+INFO_SAMPLES = {
+    'url': 'https://example.com/products/8f14e45fceea167a5a36dedd4bea2543?ref=label',
+    'email': 'mailto:someone@example.com?subject=Hello',
+    'phone': 'tel:+15551234567',
+    'sms': 'sms:+15551234567?body=Hi',
+    'wifi': 'WIFI:T:WPA;S:office;P:correct horse battery staple;;',
+    'vcard': 'BEGIN:VCARD\nVERSION:3.0\nN:Doe;Jane\nTEL:+15551234567\nEND:VCARD',
+    'event': 'BEGIN:VEVENT\nSUMMARY:Review\nDTSTART:20240101T100000Z\nEND:VEVENT',
+    'text': 'Plain text payload ' * 8
+}
+
+SAMPLE_DATA = {
+    'method': 'camera_capture',
+    'qr_info': {'type': 'url', 'length': 29},
+    'position': {'x': 10, 'y': 10, 'width': 120, 'height': 120}
+}
+
+def result(name, group, timing, **extra):
+    return dict({'name': name, 'group': group}, **timing, **extra)
+
+def bench_decode(args):
+    corpus = build_corpus(args.seed, QUICK_VARIANTS if args.quick else VARIANTS)
+    results = []
+    for image in corpus:
+        found, _ = QRProcessor.decode_qr_from_bytes(image.data)
+        payloads = {item['data'] for item in found or []}
+        timing = harness.measure(lambda: QRProcessor.decode_qr_from_bytes(image.data), args.repeat)
+        results.append(result(
+            f'decode/{image.name}', 'decode', timing,
+            params=image.params,
+            bytes=len(image.data),
+            expected=len(image.expected),
+            decoded=sum(1 for payload in image.expected if payload in payloads)
+        ))
+    return results
+
+def bench_generate(args):
+    results = []
+    counter = itertools.count()
+    prefix = make_payload(random.Random(args.seed), 64)[:56]
+    for output_format in ('data_uri', 'png', 'svg'):
+        for side in (300, 1000):
+            size = (side, side)
+
+            def cold():
+                # A payload not seen before, so every call renders
+                QRProcessor.generate_qr_code(f'{prefix}{next(counter):08d}', size=size,
+                                             output_format=output_format)
+
+            def cached():
+                QRProcessor.generate_qr_code(prefix, size=size, output_format=output_format)
+
+            results.append(result(f'generate/{output_format}-{side}-cold', 'generate',
+                                  harness.measure(cold, args.repeat)))
+            results.append(result(f'generate/{output_format}-{side}-cached', 'generate',
+                                  harness.measure(cached, args.repeat)))
+    return results
+
+def bench_info(args):
+    results = []
+    for content_type, data in INFO_SAMPLES.items():
+        # One call is far below timer resolution; time batches of 1000
+        timing = harness.measure(lambda: [QRProcessor.get_qr_info(data) for _ in range(1000)],
+                                 args.repeat)
+        results.append(result(f'info/{content_type}', 'info', timing, calls_per_sample=1000))
+    return results
+
+def history_operations(history, rows):
+    """(name, fn) pairs; writers touch fresh ids so repeats stay comparable"""
+    next_id = itertools.count(rows, -1)
+    batch = [('scan', f'https://example.com/batch/{n}', SAMPLE_DATA) for n in range(100)]
+    imports = [('scan', f'https://example.com/import/{n}', SAMPLE_DATA, '2024-02-01 12:00:00')
+               for n in range(1000)]
+    _, cursor = history.get_page(50)
+
+    return [
+        ('add_record', lambda: history.add_record('scan', 'https://example.com/new', SAMPLE_DATA)),
+        ('add_records_100', lambda: history.add_records(batch)),
+        ('import_records_1000', lambda: history.import_records(imports)),
+        ('get_page', lambda: history.get_page(50)),
+        ('get_page_cursor', lambda: history.get_page(50, cursor=cursor)),
+        ('get_page_filtered', lambda: history.get_page(50, method='file_upload', content_type='text')),
+        ('iter_records_10000', lambda: sum(1 for _ in itertools.islice(history.iter_records(), 10000))),
+        ('search_exact', lambda: history.search(str(rows // 2))),
+        ('search_common_recent', lambda: history.search('example', sort='recent')),
+        ('oldest_records_500', lambda: history.oldest_records(500)),
+        ('count', history.count),
+        ('get_stats', history.get_stats),
+        ('delete_record', lambda: history.delete_record(next(next_id))),
+        ('delete_records_100', lambda: history.delete_records([next(next_id) for _ in range(100)]))
+    ]
+
+def bench_history(args):
+    results = []
+    workdir = tempfile.mkdtemp(prefix='qr-bench-')
+    for rows in args.history_rows:
+        history = QRHistory(os.path.join(workdir, f'history-{rows}.db'))
+        fill(history, rows)
+
+        for name, fn in history_operations(history, rows):
+            timing = harness.measure(fn, args.repeat)
+            results.append(result(f'history/{name}@{rows}', 'history', timing, rows=rows))
+
+        # Destructive, so timed once
+        timing = harness.measure(history.clear_history, repeat=1, warmup=0)
+        results.append(result(f'history/clear_history@{rows}', 'history', timing, rows=rows))
+        history.db.close_all()
+    return results
+
+BENCHMARKS = {
+    'decode': bench_decode,
+    'generate': bench_generate,
+    'info': bench_info,
+    'history': bench_history
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groups', default=','.join(GROUPS))
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--quick', action='store_true', help='smaller corpus')
+    parser.add_argument('--history-rows', default='10000,100000')
+    parser.add_argument('--json', help='write results as JSON (the baseline format)')
+    parser.add_argument('--csv', help='write results as CSV')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25)
+    args = parser.parse_args()
+    args.history_rows = [int(value) for value in args.history_rows.split(',')]
+
+    groups = [group.strip() for group in args.groups.split(',') if group.strip()]
+    unknown = [group for group in groups if group not in BENCHMARKS]
+    if unknown:
+        parser.error(f'unknown group: {", ".join(unknown)}')
+
+    results = []
+    print(f"{'benchmark':<44} {'median ms':>10} {'p95 ms':>10}  extra")
+    for group in groups:
+        for item in BENCHMARKS[group](args):
+            extra = f"{item['decoded']}/{item['expected']} decoded" if 'decoded' in item else ''
+            print(f"{item['name']:<44} {item['median_ms']:10.3f} {item['p95_ms']:10.3f}  {extra}")
+            results.append(item)
+
+    meta = dict(harness.environment(), seed=args.seed, repeat=args.repeat,
+                decoder_backends=Config.DECODER_BACKENDS, decoder_mode=Config.DECODER_MODE)
+    if args.json:
+        harness.write_json(args.json, results, meta)
+    if args.csv:
+        harness.write_csv(args.csv, results)
+
+    if args.baseline:
+        _, baseline = harness.load_results(args.baseline)
+        # Groups left out of this run are not reported as missing
+        baseline = [item for item in baseline if item.get('group') in groups]
+        rows = harness.compare(results, baseline, args.threshold)
+        print()
+        print(harness.format_comparison(rows))
+        regressions = [row['name'] for row in rows if row['status'] == 'regression']
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) beyond {args.threshold:.0%}')
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
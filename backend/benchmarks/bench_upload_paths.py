@@ -0,0 +1,113 @@
+"""Compare the in-memory and disk-backed /api/scan/file paths.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_upload_paths [--requests N]
+
+Each payload is an uncompressed BMP containing one QR code, padded out to
+1 MB, 5 MB and just under MAX_CONTENT_LENGTH. Latency runs and allocation
+runs are separate so tracemalloc overhead does not skew the timings.
+Allocations are Python/NumPy heap allocations seen by tracemalloc; OpenCV's
+internal buffers are not included.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from config import Config
+
+MB = 1024 * 1024
+SIZES = [
+    ('1MB', 1 * MB),
+    ('5MB', 5 * MB),
+    ('16MB', Config.MAX_CONTENT_LENGTH - 64 * 1024),
+]
+BOUNDARY = 'benchboundary7d1f'
+
+def build_bmp(target_bytes):
+    """Build a BMP of roughly target_bytes with a QR code in the top-left"""
+    import cv2
+    import numpy as np
+    import qrcode
+
+    side = int((target_bytes / 3) ** 0.5)
+    canvas = np.full((side, side, 3), 255, np.uint8)
+
+    qr = qrcode.QRCode(box_size=8, border=4)
+    qr.add_data('https://example.com/benchmark')
+    qr.make(fit=True)
+    code = np.array(qr.make_image().convert('RGB'), dtype=np.uint8)
+    canvas[:code.shape[0], :code.shape[1]] = code
+
+    ok, encoded = cv2.imencode('.bmp', canvas)
+    if not ok:
+        raise RuntimeError('Could not encode benchmark image')
+    return encoded.tobytes()
+
+def build_multipart(payload, filename='bench.bmp'):
+    """Pre-encode the multipart body so the client side allocates nothing"""
+    head = (
+        f'--{BOUNDARY}\r\n'
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        'Content-Type: image/bmp\r\n\r\n'
+    ).encode()
+    tail = f'\r\n--{BOUNDARY}--\r\n'.encode()
+    return head + payload + tail
+
+def post(client, body):
+    return client.post(
+        '/api/scan/file',
+        data=body,
+        content_type=f'multipart/form-data; boundary={BOUNDARY}'
+    )
+
+def measure(client, body, requests):
+    """Return per-request latencies (ms) and peak traced allocations (MB)"""
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        post(client, body)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    peaks = []
+    tracemalloc.start()
+    for _ in range(requests):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        post(client, body)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append((peak - baseline) / MB)
+    tracemalloc.stop()
+
+    return latencies, peaks
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    # Keep benchmark history rows out of the real database
+    workdir = tempfile.mkdtemp(prefix='qr-bench-')
+    Config.DATABASE_PATH = os.path.join(workdir, 'qr_history.db')
+    Config.UPLOAD_FOLDER = os.path.join(workdir, 'uploads')
+
+    from app import create_app
+    app = create_app()
+    client = app.test_client()
+
+    print(f"{'size':>6} {'path':>7} {'p50 ms':>9} {'p95 ms':>9} {'alloc MB':>9}")
+    for label, target in SIZES:
+        body = build_multipart(build_bmp(target))
+        for path, to_disk in (('memory', False), ('disk', True)):
+            Config.SCAN_UPLOAD_TO_DISK = to_disk
+            post(client, body)  # warm up
+            latencies, peaks = measure(client, body, args.requests)
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            print(f'{label:>6} {path:>7} {statistics.median(latencies):9.2f} '
+                  f'{p95:9.2f} {statistics.median(peaks):9.2f}')
+
+if __name__ == '__main__':
+    main()
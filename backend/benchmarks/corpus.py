@@ -0,0 +1,160 @@
+"""Deterministic synthetic QR image corpus for decode benchmarks.
+
+Run from the backend directory to write the corpus to disk:
+
+    python -m benchmarks.corpus --out /tmp/qr-corpus [--seed 1234]
+
+Codes are generated with QRProcessor.generate_qr_code (the same renderer
+the API serves), then degraded one axis at a time from a base image so a
+slowdown or a lost decode points at one kind of input:
+
+  payload  - payload length (characters)
+  ec       - error-correction level
+  size     - rendered side in pixels
+  jpeg     - JPEG quality
+  rotate   - rotation in degrees on a white canvas
+  blur     - Gaussian blur radius in pixels
+  noise    - additive Gaussian noise sigma (0-255 scale)
+  multi    - several codes laid out on one canvas
+
+Payloads, placement and noise all come from --seed, so the same seed and
+library versions give byte-identical images.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import string
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from utils.qr_processor import QRProcessor
+
+CorpusImage = namedtuple('CorpusImage', 'name category params data expected')
+
+BASE = {'length': 64, 'ec': 'M', 'size': 400}
+VARIANTS = {
+    'payload': [16, 64, 256, 1024],
+    'ec': ['L', 'M', 'Q', 'H'],
+    'size': [200, 400, 800, 1600],
+    'jpeg': [90, 50, 20],
+    'rotate': [5, 15, 45],
+    'blur': [1.0, 2.0, 3.0],
+    'noise': [10, 25, 40],
+    'multi': [2, 4, 9]
+}
+QUICK_VARIANTS = {category: values[:2] for category, values in VARIANTS.items()}
+
+def make_payload(rng, length):
+    """URL-like payload of exactly length characters"""
+    prefix = 'https://example.com/'
+    alphabet = string.ascii_letters + string.digits
+    return prefix + ''.join(rng.choice(alphabet) for _ in range(max(0, length - len(prefix))))[:length]
+
+def render(payload, size=BASE['size'], error_correction=BASE['ec']):
+    """Grayscale PIL image of one code at size x size pixels"""
+    result, error = QRProcessor.generate_qr_code(
+        payload, size=(size, size), error_correction=error_correction, output_format='png'
+    )
+    if error:
+        raise RuntimeError(error)
+    return Image.open(io.BytesIO(result['image'])).convert('L')
+
+def encode(image, fmt='PNG', **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
+
+def build_corpus(seed=1234, variants=None):
+    """Return the corpus as a list of CorpusImage"""
+    variants = variants or VARIANTS
+    rng = random.Random(seed)
+    noise_rng = np.random.default_rng(seed)
+    corpus = []
+
+    def add(category, value, data, expected):
+        corpus.append(CorpusImage(f'{category}-{value}', category, {category: value}, data, expected))
+
+    for length in variants.get('payload', []):
+        payload = make_payload(rng, length)
+        add('payload', length, encode(render(payload)), [payload])
+
+    for level in variants.get('ec', []):
+        payload = make_payload(rng, BASE['length'])
+        add('ec', level, encode(render(payload, error_correction=level)), [payload])
+
+    for size in variants.get('size', []):
+        payload = make_payload(rng, BASE['length'])
+        add('size', size, encode(render(payload, size=size)), [payload])
+
+    for quality in variants.get('jpeg', []):
+        payload = make_payload(rng, BASE['length'])
+        add('jpeg', quality, encode(render(payload), 'JPEG', quality=quality), [payload])
+
+    for angle in variants.get('rotate', []):
+        payload = make_payload(rng, BASE['length'])
+        rotated = render(payload).rotate(angle, resample=Image.Resampling.BILINEAR,
+                                         expand=True, fillcolor=255)
+        add('rotate', angle, encode(rotated), [payload])
+
+    for radius in variants.get('blur', []):
+        payload = make_payload(rng, BASE['length'])
+        add('blur', radius, encode(render(payload).filter(ImageFilter.GaussianBlur(radius))), [payload])
+
+    for sigma in variants.get('noise', []):
+        payload = make_payload(rng, BASE['length'])
+        pixels = np.asarray(render(payload), dtype=np.float32)
+        noisy = pixels + noise_rng.normal(0, sigma, pixels.shape)
+        add('noise', sigma, encode(Image.fromarray(np.clip(noisy, 0, 255).astype(np.uint8))), [payload])
+
+    for count in variants.get('multi', []):
+        payloads = [make_payload(rng, 32) for _ in range(count)]
+        add('multi', count, encode(layout(payloads, rng)), payloads)
+
+    return corpus
+
+def layout(payloads, rng, cell=240, gap=40):
+    """Codes on a white grid with a small random offset in each cell"""
+    columns = int(len(payloads) ** 0.5 + 0.999)
+    rows = (len(payloads) + columns - 1) // columns
+    side = cell + gap
+    canvas = Image.new('L', (columns * side + gap, rows * side + gap), 255)
+    for index, payload in enumerate(payloads):
+        row, column = divmod(index, columns)
+        jitter_x, jitter_y = rng.randrange(gap // 2), rng.randrange(gap // 2)
+        canvas.paste(render(payload, size=cell),
+                     (gap + column * side + jitter_x - gap // 4, gap + row * side + jitter_y - gap // 4))
+    return canvas
+
+def write_corpus(corpus, directory):
+    """Write images plus a manifest.json with parameters and expected payloads"""
+    os.makedirs(directory, exist_ok=True)
+    manifest = []
+    for image in corpus:
+        extension = 'jpg' if image.category == 'jpeg' else 'png'
+        filename = f'{image.name}.{extension}'
+        with open(os.path.join(directory, filename), 'wb') as handle:
+            handle.write(image.data)
+        manifest.append({'file': filename, 'category': image.category,
+                         'params': image.params, 'expected': image.expected})
+
+    with open(os.path.join(directory, 'manifest.json'), 'w') as handle:
+        json.dump(manifest, handle, indent=2)
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--quick', action='store_true', help='two values per category')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.seed, QUICK_VARIANTS if args.quick else VARIANTS)
+    write_corpus(corpus, args.out)
+    print(f'Wrote {len(corpus)} images to {args.out}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Timing, result files and baseline comparison for the benchmark suite.
+
+A result is a flat dict: name (unique across the suite, e.g.
+"decode/rotate-15"), group, timing fields in milliseconds and any extra
+fields a benchmark adds (decode accuracy, row counts). Result files are
+JSON ({"meta": ..., "results": [...]}) or CSV with one row per result;
+the JSON file is also the baseline format for --baseline.
+
+Only the standard library is used here so the comparison logic can be
+unit tested without OpenCV, ZBar or NumPy.
+"""
+import csv
+import json
+import math
+import os
+import platform
+import statistics
+import time
+
+TIMING_FIELDS = ('repeat', 'min_ms', 'median_ms', 'mean_ms', 'p95_ms', 'max_ms')
+
+def measure(fn, repeat=20, warmup=1):
+    """Call fn() warmup + repeat times; return timing fields for the timed calls"""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+def summarize(samples):
+    """Timing fields for a list of millisecond samples"""
+    ordered = sorted(samples)
+    # Nearest-rank p95; statistics.quantiles needs two or more samples
+    p95 = ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+    return {
+        'repeat': len(ordered),
+        'min_ms': round(ordered[0], 4),
+        'median_ms': round(statistics.median(ordered), 4),
+        'mean_ms': round(statistics.fmean(ordered), 4),
+        'p95_ms': round(p95, 4),
+        'max_ms': round(ordered[-1], 4)
+    }
+
+def environment():
+    """Where the numbers came from; compare only runs from like machines"""
+    meta = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    }
+    for module in ('cv2', 'numpy', 'PIL', 'qrcode'):
+        try:
+            meta[module] = getattr(__import__(module), '__version__', 'unknown')
+        except ImportError:
+            meta[module] = None
+    return meta
+
+def write_json(path, results, meta=None):
+    with open(path, 'w') as handle:
+        json.dump({'meta': meta or {}, 'results': results}, handle, indent=2, sort_keys=True)
+        handle.write('\n')
+
+def write_csv(path, results):
+    """One row per result; columns are the union of all result fields"""
+    columns = ['name', 'group'] + list(TIMING_FIELDS)
+    for result in results:
+        columns.extend(key for key in result if key not in columns)
+
+    with open(path, 'w', newline='') as handle:
+        writer = csv.DictWriter(handle, fieldnames=columns)
+        writer.writeheader()
+        for result in results:
+            writer.writerow({
+                key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                for key, value in result.items()
+            })
+
+def load_results(path):
+    """(meta, results) from a JSON result file"""
+    with open(path) as handle:
+        document = json.load(handle)
+    return document.get('meta', {}), document['results']
+
+def compare(results, baseline, threshold=0.25, metric='median_ms', noise_floor_ms=0.05):
+    """Compare results with baseline results by name.
+
+    Returns one row per benchmark in either set with status:
+      regression - slower than baseline by more than threshold (0.25 = 25%),
+                   or decoded fewer codes than the baseline did
+      improved   - faster by more than threshold
+      ok         - within threshold, or within noise_floor_ms in absolute
+                   terms (cache hits take microseconds and jitter by 2x)
+      new        - no baseline entry
+      missing    - in the baseline but not run now
+    """
+    previous = {result['name']: result for result in baseline}
+    rows = []
+
+    for result in results:
+        base = previous.pop(result['name'], None)
+        row = {'name': result['name'], 'current': result.get(metric), 'baseline': None,
+               'ratio': None, 'status': 'new'}
+        if base is not None:
+            row['baseline'] = base.get(metric)
+            if row['baseline'] and row['current'] is not None:
+                row['ratio'] = round(row['current'] / row['baseline'], 3)
+
+            if result.get('decoded', 0) < base.get('decoded', 0):
+                row['status'] = 'regression'
+            elif row['ratio'] is None or abs(row['current'] - row['baseline']) <= noise_floor_ms:
+                row['status'] = 'ok'
+            elif row['ratio'] > 1 + threshold:
+                row['status'] = 'regression'
+            elif row['ratio'] < 1 - threshold:
+                row['status'] = 'improved'
+            else:
+                row['status'] = 'ok'
+        rows.append(row)
+
+    for name, base in previous.items():
+        rows.append({'name': name, 'current': None, 'baseline': base.get(metric),
+                     'ratio': None, 'status': 'missing'})
+    return rows
+
+def format_comparison(rows, metric='median_ms'):
+    lines = [f"{'benchmark':<44} {'base ' + metric:>16} {'now ' + metric:>15} {'ratio':>7}  status"]
+    for row in rows:
+        base = f"{row['baseline']:.3f}" if row['baseline'] is not None else '-'
+        current = f"{row['current']:.3f}" if row['current'] is not None else '-'
+        ratio = f"{row['ratio']:.2f}" if row['ratio'] is not None else '-'
+        lines.append(f"{row['name']:<44} {base:>16} {current:>15} {ratio:>7}  {row['status']}")
+    return '\n'.join(lines)
@@ -5,9 +5,107 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
-    DATABASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'qr_history.db')
+    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp', 'tif', 'tiff'}
+    DATABASE_PATH = os.environ.get('DATABASE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'qr_history.db'))
     CORS_ORIGINS = ['http://localhost:3000']
+    # Staged decode: large images are first tried at reduced resolution with
+    # the long side no smaller than this; small images get a 2x upscale pass
+    DECODE_REDUCED_TARGET_SIDE = int(os.environ.get('DECODE_REDUCED_TARGET_SIDE', 1280))
+    DECODE_UPSCALE_MAX_SIDE = int(os.environ.get('DECODE_UPSCALE_MAX_SIDE', 800))
+    # Tiled decode (?tiled=1) for large sheets of small codes: expected
+    # module size in pixels (?module_size= overrides it), symbol width in
+    # modules, tile side in code widths, tile size floor and tile count cap
+    DECODE_TILE_MODULE_SIZE = float(os.environ.get('DECODE_TILE_MODULE_SIZE', 4))
+    DECODE_TILE_CODE_MODULES = int(os.environ.get('DECODE_TILE_CODE_MODULES', 33))
+    DECODE_TILE_SPAN = int(os.environ.get('DECODE_TILE_SPAN', 4))
+    DECODE_TILE_MIN_SIZE = int(os.environ.get('DECODE_TILE_MIN_SIZE', 256))
+    DECODE_TILE_MAX_TILES = int(os.environ.get('DECODE_TILE_MAX_TILES', 256))
+    # Threads per decode process for tiles and animation frames (-1: one per CPU)
+    DECODE_THREADS = int(os.environ.get('DECODE_THREADS', -1))
+    # Multi-frame images (GIF, animated WebP, multi-page TIFF): frames and
+    # total pixels decoded per image; requests may lower both
+    DECODE_MAX_FRAMES = int(os.environ.get('DECODE_MAX_FRAMES', 100))
+    DECODE_MAX_FRAME_PIXELS = int(os.environ.get('DECODE_MAX_FRAME_PIXELS', 64 * 1024 * 1024))
+    # Decoder backends run on each pipeline stage: tried in order ('chain')
+    # or all at once with the first hit winning ('race')
+    DECODER_BACKENDS = [name.strip() for name in os.environ.get('DECODER_BACKENDS', 'pyzbar,opencv').split(',') if name.strip()]
+    DECODER_MODE = os.environ.get('DECODER_MODE', 'chain')
+    # Decode process pool, per Gunicorn worker. Defaults split the container's
+    # CPU quota across WEB_CONCURRENCY workers; DECODE_WORKERS=0 decodes inline
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 3))
+    DECODE_WORKERS = int(os.environ.get('DECODE_WORKERS', -1))
+    DECODE_QUEUE_SIZE = int(os.environ.get('DECODE_QUEUE_SIZE', 8))
+    DECODE_TIMEOUT = float(os.environ.get('DECODE_TIMEOUT', 30))
+    DECODE_RETRY_AFTER = int(os.environ.get('DECODE_RETRY_AFTER', 2))
+    # /api/scan/batch limits: images per batch and total request size
+    BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES', 500))
+    BATCH_MAX_CONTENT_LENGTH = int(os.environ.get('BATCH_MAX_CONTENT_LENGTH', 256 * 1024 * 1024))
+    # /api/generate/batch limits: items per request, items per pool job,
+    # characters of text per item and pixels per side of each image
+    GENERATE_BATCH_MAX_ITEMS = int(os.environ.get('GENERATE_BATCH_MAX_ITEMS', 50000))
+    GENERATE_BATCH_CHUNK = int(os.environ.get('GENERATE_BATCH_CHUNK', 64))
+    GENERATE_BATCH_MAX_TEXT = int(os.environ.get('GENERATE_BATCH_MAX_TEXT', 4296))
+    GENERATE_BATCH_MAX_SIZE = int(os.environ.get('GENERATE_BATCH_MAX_SIZE', 2000))
+    # Generated QR image cache: per-worker LRU plus a disk store shared by
+    # all workers on the pod (set QR_CACHE_DIR to '' to disable the disk tier)
+    QR_CACHE_MAX_BYTES = int(os.environ.get('QR_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    QR_CACHE_DIR = os.environ.get('QR_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'qr'))
+    QR_CACHE_DISK_MAX_BYTES = int(os.environ.get('QR_CACHE_DISK_MAX_BYTES', 256 * 1024 * 1024))
+    # History writes: 'sync' (commit per request), 'group' (wait for a shared
+    # commit) or 'async' (write-behind; queued rows are lost if the process
+    # is killed); batches flush on size or interval
+    HISTORY_WRITE_MODE = os.environ.get('HISTORY_WRITE_MODE', 'group').lower()
+    HISTORY_FLUSH_BATCH = int(os.environ.get('HISTORY_FLUSH_BATCH', 256))
+    HISTORY_FLUSH_INTERVAL = float(os.environ.get('HISTORY_FLUSH_INTERVAL', 0.05))
+    HISTORY_QUEUE_SIZE = int(os.environ.get('HISTORY_QUEUE_SIZE', 10000))
+    # SQLite connection tuning: one persistent connection per thread in WAL
+    # mode; busy timeout lets writers from other workers wait instead of failing
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 16 * 1024))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_CACHED_STATEMENTS = int(os.environ.get('SQLITE_CACHED_STATEMENTS', 128))
+    # History retention: rows older than HISTORY_RETENTION_DAYS or beyond
+    # HISTORY_MAX_ROWS are archived and pruned in the background (0, the
+    # default, disables a policy, so history is kept unless a deployment
+    # opts in; HISTORY_PRUNE_INTERVAL=0 disables the pruner). Archive
+    # segments are gzip NDJSON under HISTORY_ARCHIVE_DIR ('' skips archival)
+    HISTORY_RETENTION_DAYS = int(os.environ.get('HISTORY_RETENTION_DAYS', 0))
+    HISTORY_MAX_ROWS = int(os.environ.get('HISTORY_MAX_ROWS', 0))
+    HISTORY_PRUNE_INTERVAL = float(os.environ.get('HISTORY_PRUNE_INTERVAL', 300))
+    HISTORY_PRUNE_CHUNK = int(os.environ.get('HISTORY_PRUNE_CHUNK', 500))
+    HISTORY_PRUNE_PAUSE = float(os.environ.get('HISTORY_PRUNE_PAUSE', 0.05))
+    HISTORY_ARCHIVE_DIR = os.environ.get('HISTORY_ARCHIVE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'archive'))
+    HISTORY_VACUUM_PAGES = int(os.environ.get('HISTORY_VACUUM_PAGES', 1000))
+    # History export/import: rows read per chunk and rows per import transaction
+    HISTORY_EXPORT_CHUNK = int(os.environ.get('HISTORY_EXPORT_CHUNK', 1000))
+    HISTORY_IMPORT_BATCH = int(os.environ.get('HISTORY_IMPORT_BATCH', 5000))
+    # Decode-result cache for repeated frames (TTL or size 0 disables) and
+    # the per-session window in which a repeated payload is not re-recorded
+    DECODE_CACHE_SIZE = int(os.environ.get('DECODE_CACHE_SIZE', 512))
+    DECODE_CACHE_TTL = float(os.environ.get('DECODE_CACHE_TTL', 5))
+    DECODE_CACHE_HASH_SIZE = int(os.environ.get('DECODE_CACHE_HASH_SIZE', 32))
+    DECODE_CACHE_MAX_DISTANCE = int(os.environ.get('DECODE_CACHE_MAX_DISTANCE', 8))
+    HISTORY_DEDUP_WINDOW = float(os.environ.get('HISTORY_DEDUP_WINDOW', 30))
+    # Streaming camera scans over /api/scan/stream: next-frame interval
+    # bounds (ms), dHash bits that count as a changed frame, how far past
+    # the last code position the tracked region extends (fraction of the
+    # code size) and how long an idle connection is kept open (seconds)
+    SCAN_STREAM_MIN_INTERVAL = int(os.environ.get('SCAN_STREAM_MIN_INTERVAL', 200))
+    SCAN_STREAM_INTERVAL = int(os.environ.get('SCAN_STREAM_INTERVAL', 500))
+    SCAN_STREAM_MAX_INTERVAL = int(os.environ.get('SCAN_STREAM_MAX_INTERVAL', 2000))
+    SCAN_STREAM_CHANGE_BITS = int(os.environ.get('SCAN_STREAM_CHANGE_BITS', 12))
+    SCAN_STREAM_ROI_MARGIN = float(os.environ.get('SCAN_STREAM_ROI_MARGIN', 0.5))
+    SCAN_STREAM_IDLE_TIMEOUT = float(os.environ.get('SCAN_STREAM_IDLE_TIMEOUT', 60))
+    # Open streams allowed per process under WSGI, where each one holds a
+    # worker thread for its lifetime; past it the handshake gets a 503 and
+    # the client falls back to /api/scan/raw (unlimited under ASGI)
+    SCAN_STREAM_MAX_SESSIONS = int(os.environ.get('SCAN_STREAM_MAX_SESSIONS', 2))
+    # ASGI entry point (app:asgi_app): threads per process running Flask
+    # views once their request body has been received on the event loop
+    ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 32))
+    # Debug fallback: spool uploads to UPLOAD_FOLDER and decode from disk
+    SCAN_UPLOAD_TO_DISK = os.environ.get('SCAN_UPLOAD_TO_DISK', 'false').lower() == 'true'
     
     @staticmethod
     def init_app(app):
@@ -0,0 +1,45 @@
+import os
+import shutil
+
+# Gunicorn settings and server hooks; bind, threads and timeout are set on the command line
+
+# Import the app once in the master and fork workers from it, so the
+# codec libraries warmed in when_ready are shared copy-on-write
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+def reset_prometheus_dir():
+    """Start with an empty Prometheus multiprocess directory.
+
+    Samples from a previous run would otherwise be summed into /metrics.
+    """
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+# Runs when the config is read: a preloaded app writes samples while importing
+reset_prometheus_dir()
+
+def child_exit(server, worker):
+    """Drop live-gauge samples of a worker that has exited"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+def when_ready(server):
+    """Warm the preloaded master before the first workers are forked.
+
+    Imports the codec libraries and sets up the history schema once, then
+    closes the master's connections; workers open their own.
+    """
+    if server.cfg.preload_app:
+        from utils.warmup import warm_codecs
+        from models.qr_history import qr_history
+        warm_codecs()
+        qr_history.init_db()
+        qr_history.db.close_all()
+
+def post_worker_init(worker):
+    """Start the per-worker warm-up that /ready waits for"""
+    from app import warm_up
+    warm_up()
@@ -0,0 +1,116 @@
+"""Load-test a local backend with a mixed-traffic scenario.
+
+Run from the backend directory:
+
+    python -m loadtest.run [--scenario mixed] [--url http://127.0.0.1:5000]
+        [--steps 5,10,20] [--duration 20] [--json results.json]
+
+Without --url, each server layout in the scenario is started under
+Gunicorn on a free port (see loadtest.server), warmed up, driven through
+the scenario's load steps and stopped, and a side-by-side summary is
+printed at the end. With --url an already running server is driven
+instead and the scenario's server layouts are ignored.
+
+Built-in scenarios are listed in loadtest.scenarios; --scenario also
+accepts a JSON file with the same keys. For each step and endpoint the
+report gives throughput, p50/p95/p99/p99.9 latency, error rate and shed
+(503) count, and each server gets a saturation point: the highest load
+step it sustained within the SLO.
+
+The generator runs in this process with one thread per client; run it on
+a different machine (or cores) than the server when the report shows
+generator lag.
+"""
+import argparse
+import json
+
+from loadtest import runner
+from loadtest.scenarios import SCENARIOS, TrafficMix, load_scenario
+from loadtest.server import LocalServer
+
+def warm_up(target, mix, seconds):
+    """Fill caches and start decode pools before measuring"""
+    if seconds > 0:
+        runner.run_closed(target, mix, clients=2, duration=seconds)
+
+def drive(url, mix, scenario, args, slow_mix=None):
+    target = runner.Target(url)
+    warm_up(target, mix, args.warmup)
+    steps = runner.run_steps(target, mix, scenario, seed=args.seed, max_clients=args.max_clients,
+                             slow_mix=slow_mix)
+    return {
+        'steps': steps,
+        'saturation': runner.find_saturation(steps, scenario['mode'], scenario['slo_ms'],
+                                             scenario['max_error_rate'])
+    }
+
+def format_comparison(scenario, results):
+    unit = 'req/s' if scenario['mode'] == 'open' else 'clients'
+    lines = [f"{'server':<12} {'sustained':>10} {'saturated':>10} {'reason':>11} {'max rps':>8}  "
+             + '  '.join(f'p99@{load}' for load in scenario['steps'])]
+    for label, result in results.items():
+        saturation = result['saturation']
+        p99 = {step['load']: step['endpoints']['all']['p99_ms'] for step in result['steps']}
+        lines.append(
+            f"{label:<12} {str(saturation['sustained']):>10} {str(saturation['saturated_at']):>10} "
+            f"{str(saturation['reason']):>11} {saturation['max_rps']:>8.1f}  "
+            + '  '.join(f"{p99[load]:>{len(f'p99@{load}')}.0f}" if p99.get(load) is not None
+                        else f"{'-':>{len(f'p99@{load}')}}" for load in scenario['steps'])
+        )
+    lines.append(f'(loads in {unit}, p99 in ms, SLO p99 <= {scenario["slo_ms"]} ms, '
+                 f'errors <= {scenario["max_error_rate"]:.1%})')
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', default='mixed',
+                        help=f'built-in name ({", ".join(SCENARIOS)}) or a JSON file')
+    parser.add_argument('--url', help='drive an already running server')
+    parser.add_argument('--servers', help='comma-separated subset of the scenario server labels')
+    parser.add_argument('--steps', help='override the load steps, e.g. 5,10,20')
+    parser.add_argument('--duration', type=float, help='override seconds per step')
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--max-clients', type=int, default=128,
+                        help='open loop: client threads available to send requests')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--json', help='write every step and summary as JSON')
+    args = parser.parse_args()
+
+    try:
+        scenario = load_scenario(args.scenario)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.steps:
+        scenario['steps'] = [float(value) if '.' in value else int(value) for value in args.steps.split(',')]
+    if args.duration:
+        scenario['duration'] = args.duration
+
+    print(f"Scenario {scenario['name']}: {scenario.get('description', '')}")
+    mix = TrafficMix(scenario['mix'], seed=args.seed)
+    slow_mix = TrafficMix({'slow_camera': 1}, seed=args.seed) if scenario['slow_clients'] else None
+
+    results = {}
+    if args.url:
+        print(f'== {args.url}')
+        results['target'] = drive(args.url, mix, scenario, args, slow_mix)
+    else:
+        labels = args.servers.split(',') if args.servers else list(scenario['servers'])
+        for label in labels:
+            server = scenario['servers'][label]
+            print(f"== {label}: {server['workers']} workers x {server['threads']} threads"
+                  + (f", {server['worker_class']} worker" if server.get('worker_class') else '')
+                  + (f", {server['app']}" if server.get('app') else '')
+                  + (f", env {server['env']}" if server['env'] else ''))
+            with LocalServer(server['workers'], server['threads'], server['env'],
+                             app=server.get('app', 'app:app'), worker_class=server.get('worker_class')) as local:
+                results[label] = drive(local.url, mix, scenario, args, slow_mix)
+
+    print()
+    print(format_comparison(scenario, results))
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump({'scenario': scenario, 'results': results}, handle, indent=2)
+
+if __name__ == '__main__':
+    main()
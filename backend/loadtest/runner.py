@@ -0,0 +1,258 @@
+"""Open- and closed-loop load generation and per-endpoint latency reports.
+
+Closed loop: N clients each send their next request as soon as the
+previous one completes, so the offered load adapts to the server.
+
+Open loop: requests arrive at a fixed average rate (Poisson arrivals)
+regardless of how fast the server answers. Each request's latency is
+measured from its scheduled arrival time, so time spent waiting for a
+free client thread is included; a server that falls behind shows a
+growing tail instead of silently lowering the offered rate.
+
+Only the standard library is used so the generator has no dependencies
+beyond those needed to build payloads.
+"""
+import http.client
+import math
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+PERCENTILES = (('p50_ms', 0.50), ('p95_ms', 0.95), ('p99_ms', 0.99), ('p999_ms', 0.999))
+
+class Target:
+    """Base URL of the server under test"""
+
+    def __init__(self, url, timeout=60):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+
+    def connect(self):
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+def send(connection, request):
+    """Send one request on a keep-alive connection; returns the HTTP status or None"""
+    try:
+        connection.request(request.method, request.path, body=request.body, headers=request.headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    except (OSError, http.client.HTTPException):
+        # Reconnect on the next request
+        connection.close()
+        return None
+
+def run_closed(target, mix, clients, duration, seed=0):
+    """Drive the target with `clients` back-to-back clients; returns (samples, elapsed)"""
+    samples = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        rng = random.Random(seed * 1000 + index)
+        connection = target.connect()
+        local = []
+        while time.perf_counter() < deadline:
+            request = mix.next(rng)
+            start = time.perf_counter()
+            status = send(connection, request)
+            local.append((request.endpoint, (time.perf_counter() - start) * 1000, status))
+        connection.close()
+        with lock:
+            samples.extend(local)
+
+    start = time.perf_counter()
+    _run_threads(client, clients)
+    return samples, time.perf_counter() - start
+
+def run_open(target, mix, rate, duration, seed=0, max_clients=128):
+    """Offer `rate` requests/s for duration seconds; returns (samples, elapsed, lag_ms).
+
+    Requests wait in a queue when all max_clients client threads are busy.
+    lag_ms is how far the dispatcher itself fell behind the schedule; a
+    large value means the generator, not the server, was the bottleneck.
+    """
+    samples = []
+    lock = threading.Lock()
+    pending = queue.Queue()
+    rng = random.Random(seed)
+    lag_ms = 0.0
+
+    def client(index):
+        connection = target.connect()
+        local = []
+        while True:
+            item = pending.get()
+            if item is None:
+                break
+            scheduled, request = item
+            status = send(connection, request)
+            local.append((request.endpoint, (time.perf_counter() - scheduled) * 1000, status))
+        connection.close()
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=client, args=(index,), daemon=True)
+               for index in range(max_clients)]
+    for thread in threads:
+        thread.start()
+
+    start = time.perf_counter()
+    scheduled = start
+    while True:
+        scheduled += rng.expovariate(rate)
+        if scheduled - start >= duration:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            lag_ms = max(lag_ms, -delay * 1000)
+        pending.put((scheduled, mix.next(rng)))
+
+    for _ in threads:
+        pending.put(None)
+    for thread in threads:
+        thread.join()
+    # The last arrival comes a little before the deadline; rates are per scheduled second
+    return samples, max(time.perf_counter() - start, duration), round(lag_ms, 1)
+
+def _run_threads(fn, count):
+    threads = [threading.Thread(target=fn, args=(index,), daemon=True) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def summarize(samples, elapsed):
+    """{'all': ..., endpoint: ...} with throughput, latency percentiles and errors.
+
+    Errors are connection failures and HTTP 4xx/5xx (304 is a success);
+    503 load-shedding responses are also counted on their own as 'shed'.
+    """
+    groups = {'all': samples}
+    for sample in samples:
+        groups.setdefault(sample[0], []).append(sample)
+
+    report = {}
+    for endpoint, group in groups.items():
+        latencies = sorted(latency for _, latency, _ in group)
+        errors = sum(1 for _, _, status in group if status is None or status >= 400)
+        summary = {
+            'requests': len(group),
+            'rps': round(len(group) / elapsed, 2) if elapsed else 0.0,
+            'errors': errors,
+            'shed': sum(1 for _, _, status in group if status == 503),
+            'error_rate': round(errors / len(group), 4) if group else 0.0
+        }
+        for name, fraction in PERCENTILES:
+            summary[name] = round(percentile(latencies, fraction), 2) if latencies else None
+        report[endpoint] = summary
+    return report
+
+def find_saturation(steps, mode, slo_ms, max_error_rate):
+    """Locate the first load step the server could not sustain.
+
+    A step is saturated when its error rate exceeds max_error_rate, its
+    p99 exceeds slo_ms, or throughput stops following load: below 90% of
+    the rate actually offered in open loop (the Poisson schedule makes
+    that differ from the nominal step rate), or less than 5% above the previous
+    step in closed loop (more clients only add queueing). Returns
+    {'sustained': last good load or None, 'saturated_at', 'reason',
+    'max_rps'}.
+    """
+    previous = None
+    for step in steps:
+        overall = step['endpoints']['all']
+        reason = None
+        if overall['error_rate'] > max_error_rate:
+            reason = 'errors'
+        elif overall['p99_ms'] is not None and overall['p99_ms'] > slo_ms:
+            reason = 'latency'
+        elif mode == 'open' and overall['rps'] < 0.9 * step.get('offered_rps', step['load']):
+            reason = 'throughput'
+        elif mode == 'closed' and previous and \
+                overall['rps'] < previous['endpoints']['all']['rps'] * 1.05:
+            reason = 'throughput'
+
+        if reason:
+            return {
+                'sustained': previous['load'] if previous else None,
+                'saturated_at': step['load'],
+                'reason': reason,
+                'max_rps': max(s['endpoints']['all']['rps'] for s in steps)
+            }
+        previous = step
+
+    return {
+        'sustained': previous['load'] if previous else None,
+        'saturated_at': None,
+        'reason': None,
+        'max_rps': max((s['endpoints']['all']['rps'] for s in steps), default=0.0)
+    }
+
+def run_steps(target, mix, scenario, seed=0, max_clients=128, log=print, slow_mix=None):
+    """Run the load steps of a scenario against one target.
+
+    With slow_mix, scenario['slow_clients'] closed-loop clients send it
+    for the length of every step; their endpoints are added to the step
+    report but not to 'all'. Stops after the first saturated step: beyond
+    it an open-loop run only queues more work and takes ever longer to
+    drain.
+    """
+    steps = []
+    background = ThreadPoolExecutor(max_workers=1)
+    for index, load in enumerate(scenario['steps']):
+        slow = None
+        if slow_mix is not None and scenario['slow_clients']:
+            slow = background.submit(run_closed, target, slow_mix, scenario['slow_clients'],
+                                     scenario['duration'], seed + index)
+
+        if scenario['mode'] == 'open':
+            samples, elapsed, lag_ms = run_open(target, mix, load, scenario['duration'],
+                                                seed + index, max_clients)
+        else:
+            samples, elapsed = run_closed(target, mix, load, scenario['duration'], seed + index)
+            lag_ms = None
+
+        step = {'load': load, 'elapsed': round(elapsed, 2), 'generator_lag_ms': lag_ms,
+                'endpoints': summarize(samples, elapsed)}
+        if slow is not None:
+            slow_report = summarize(*slow.result())
+            step['endpoints'].update((endpoint, summary) for endpoint, summary in slow_report.items()
+                                     if endpoint != 'all')
+        if scenario['mode'] == 'open':
+            # Every scheduled request is eventually sent, so this is the offered rate
+            step['offered_rps'] = round(len(samples) / scenario['duration'], 2)
+        steps.append(step)
+        log(format_step(step, scenario['mode']))
+
+        if find_saturation(steps, scenario['mode'], scenario['slo_ms'],
+                           scenario['max_error_rate'])['saturated_at'] is not None:
+            break
+    background.shutdown()
+    return steps
+
+def format_step(step, mode):
+    unit = 'req/s offered' if mode == 'open' else 'clients'
+    lines = [f"-- {step['load']} {unit} ({step['elapsed']}s)"
+             + (f", generator lag {step['generator_lag_ms']} ms" if step['generator_lag_ms'] else '')]
+    lines.append(f"   {'endpoint':<14} {'reqs':>7} {'rps':>8} {'p50':>8} {'p95':>8} "
+                 f"{'p99':>8} {'p99.9':>8} {'err%':>6} {'shed':>5}")
+    for endpoint, summary in sorted(step['endpoints'].items(), key=lambda item: (item[0] != 'all', item[0])):
+        lines.append(
+            f"   {endpoint:<14} {summary['requests']:>7} {summary['rps']:>8.1f} "
+            + ' '.join(f"{summary[name]:>8.1f}" if summary[name] is not None else f"{'-':>8}"
+                       for name, _ in PERCENTILES)
+            + f" {summary['error_rate'] * 100:>6.2f} {summary['shed']:>5}"
+        )
+    return '\n'.join(lines)
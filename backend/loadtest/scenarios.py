@@ -0,0 +1,263 @@
+"""Traffic mixes and reusable load-test scenarios.
+
+A scenario is a dict (built in below, or a JSON file with the same keys):
+
+  name, description
+  mix            - {request kind: relative weight}; kinds are in KINDS
+  mode           - 'open' (steps are arrival rates, requests/s) or
+                   'closed' (steps are concurrent users)
+  steps          - increasing load levels; each runs for duration seconds
+  duration       - seconds per step
+  slo_ms         - p99 above this marks the saturation point
+  max_error_rate - error fraction above this marks the saturation point
+  slow_clients   - slow camera clients (SLOW_UPLOAD_SECONDS per upload)
+                   kept busy alongside every step; reported as their own
+                   endpoint and left out of 'all' and the saturation point
+  servers        - {label: {'workers', 'threads', 'env'}}, optionally
+                   with 'worker_class' and 'app' (default app:app); every
+                   label is started in turn and driven with the same
+                   steps, so worker/thread layouts, entry points or
+                   feature flags (env) compare side by side
+
+Request payloads and the request sequence of each client thread come
+from a seed, so runs with the same seed send the same traffic.
+"""
+import base64
+import io
+import itertools
+import json
+import os
+import random
+import time
+from collections import namedtuple
+
+Request = namedtuple('Request', 'endpoint method path body headers')
+
+# Ranks of the /generate key space follow a Zipf law with this exponent:
+# a few labels are requested constantly, most rarely
+HOT_KEY_EXPONENT = 1.1
+HOT_KEYS = 1000
+FRAME_VARIANTS = 24
+CAMERA_SESSIONS = 16
+BOUNDARY = 'loadtestboundary5c2a'
+# A slow camera client sends each frame in SLOW_UPLOAD_PARTS pieces spread
+# over SLOW_UPLOAD_SECONDS, like a phone on a poor uplink
+SLOW_UPLOAD_SECONDS = 2.0
+SLOW_UPLOAD_PARTS = 8
+
+DEFAULT_SERVER = {'workers': 3, 'threads': 4, 'env': {}}
+
+SCENARIOS = {
+    'mixed': {
+        'description': 'Production-like mix at increasing arrival rates',
+        'mix': {'camera_frame': 45, 'file_upload': 5, 'generate': 35, 'history': 10, 'history_stats': 5},
+        'mode': 'open',
+        'steps': [5, 10, 20, 40, 80, 160],
+        'duration': 20
+    },
+    'mixed-closed': {
+        'description': 'Production-like mix with a growing number of busy clients',
+        'mix': {'camera_frame': 45, 'file_upload': 5, 'generate': 35, 'history': 10, 'history_stats': 5},
+        'mode': 'closed',
+        'steps': [1, 2, 4, 8, 16, 32],
+        'duration': 20
+    },
+    'camera': {
+        'description': 'Continuous camera scanning only',
+        'mix': {'camera_frame': 1},
+        'mode': 'open',
+        'steps': [5, 10, 20, 40, 80],
+        'duration': 20
+    },
+    'generate-hot': {
+        'description': 'QR generation with a hot-key distribution',
+        'mix': {'generate': 1},
+        'mode': 'open',
+        'steps': [25, 50, 100, 200, 400, 800],
+        'duration': 20
+    },
+    'workers': {
+        'description': 'Same mix against several Gunicorn worker/thread layouts',
+        'mix': {'camera_frame': 45, 'file_upload': 5, 'generate': 35, 'history': 10, 'history_stats': 5},
+        'mode': 'open',
+        'steps': [10, 20, 40, 80, 160],
+        'duration': 20,
+        'servers': {
+            'w1-t8': {'workers': 1, 'threads': 8},
+            'w2-t4': {'workers': 2, 'threads': 4},
+            'w3-t4': {'workers': 3, 'threads': 4},
+            'w4-t2': {'workers': 4, 'threads': 2}
+        }
+    },
+    'decoder-mode': {
+        'description': 'Camera scanning with decoder backends chained or raced',
+        'mix': {'camera_frame': 1},
+        'mode': 'open',
+        'steps': [5, 10, 20, 40, 80],
+        'duration': 20,
+        'servers': {
+            'chain': {'env': {'DECODER_MODE': 'chain'}},
+            'race': {'env': {'DECODER_MODE': 'race'}}
+        }
+    },
+    'asgi': {
+        'description': 'Threaded Gunicorn vs. the ASGI entry point with slow camera uploads alongside',
+        'mix': {'camera_frame': 45, 'generate': 40, 'history': 10, 'history_stats': 5},
+        'mode': 'open',
+        'steps': [10, 20, 40, 80, 160],
+        'duration': 20,
+        'slow_clients': 24,
+        'servers': {
+            'gthread': {'workers': 3, 'threads': 4},
+            'asgi': {'workers': 3, 'worker_class': 'asgi', 'app': 'app:asgi_app'}
+        }
+    }
+}
+
+def load_scenario(name_or_path):
+    """A built-in scenario by name, or one read from a JSON file, with defaults filled in"""
+    if name_or_path in SCENARIOS:
+        scenario = dict(SCENARIOS[name_or_path], name=name_or_path)
+    elif os.path.exists(name_or_path):
+        with open(name_or_path) as handle:
+            scenario = json.load(handle)
+        scenario.setdefault('name', os.path.splitext(os.path.basename(name_or_path))[0])
+    else:
+        raise ValueError(f'Unknown scenario: {name_or_path} (built in: {", ".join(SCENARIOS)})')
+
+    unknown = [kind for kind in scenario['mix'] if kind not in KINDS]
+    if unknown:
+        raise ValueError(f'Unknown request kind: {", ".join(unknown)}')
+    if scenario.get('mode', 'open') not in ('open', 'closed'):
+        raise ValueError(f"Unknown mode: {scenario['mode']}")
+
+    scenario.setdefault('mode', 'open')
+    scenario.setdefault('duration', 20)
+    scenario.setdefault('slo_ms', 1000)
+    scenario.setdefault('max_error_rate', 0.01)
+    scenario.setdefault('slow_clients', 0)
+    servers = scenario.get('servers') or {'default': {}}
+    scenario['servers'] = {
+        label: dict(DEFAULT_SERVER, **server)
+        for label, server in servers.items()
+    }
+    return scenario
+
+def qr_image(payload, side, rng, canvas=None, noise=0.0):
+    """Grayscale image with one code at a random spot on a canvas"""
+    import numpy as np
+    import qrcode
+    from PIL import Image
+
+    code = qrcode.make(payload, border=2).convert('L').resize((side, side), Image.Resampling.NEAREST)
+    width, height = canvas or (side + 40, side + 40)
+    image = Image.new('L', (width, height), 235)
+    image.paste(code, (rng.randrange(width - side + 1), rng.randrange(height - side + 1)))
+    if noise:
+        pixels = np.asarray(image, dtype=np.float32)
+        pixels += np.random.default_rng(rng.randrange(2 ** 32)).normal(0, noise, pixels.shape)
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    return image
+
+def encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
+
+class TrafficMix:
+    """Builds the requests of one scenario mix.
+
+    Camera frames are drawn from FRAME_VARIANTS 640x480 JPEG scenes, each
+    with the code in a different place, and sent as one of CAMERA_SESSIONS
+    scan sessions: a session that sees the same scene again within the
+    decode cache TTL gets a perceptual cache hit, like a code held steady
+    in front of a real camera. Uploads are larger PNG photos. Generation texts are drawn from HOT_KEYS keys by Zipf rank.
+
+    Each KINDS entry takes a seeded Random for building payloads and
+    returns a function that picks one request using the caller's Random.
+    """
+
+    def __init__(self, mix, seed=1234):
+        self.kinds = list(mix)
+        self.weights = list(itertools.accumulate(mix[kind] for kind in self.kinds))
+        rng = random.Random(seed)
+        self.builders = {kind: KINDS[kind](rng) for kind in self.kinds}
+
+    def next(self, rng):
+        kind = rng.choices(self.kinds, cum_weights=self.weights)[0]
+        return self.builders[kind](rng)
+
+def camera_frame(build_rng):
+    scenes = [
+        encode(qr_image(f'https://example.com/shelf/{index % 4}', 180, build_rng,
+                        canvas=(640, 480), noise=6), 'JPEG', quality=80)
+        for index in range(FRAME_VARIANTS)
+    ]
+    sequence = itertools.count()
+
+    def build(rng):
+        # Bytes after the JPEG end marker are ignored by decoders but make
+        # every frame unique, as real camera frames are
+        frame = rng.choice(scenes) + next(sequence).to_bytes(8, 'big')
+        body = b'{"image": "data:image/jpeg;base64,' + base64.b64encode(frame) + b'"}'
+        headers = {'Content-Type': 'application/json',
+                   'X-Scan-Session': f'loadtest-{rng.randrange(CAMERA_SESSIONS)}'}
+        return Request('scan_data', 'POST', '/api/scan/data', body, headers)
+    return build
+
+def slow_camera(build_rng):
+    frames = [
+        encode(qr_image(f'https://example.com/slow/{index}', 180, build_rng,
+                        canvas=(640, 480), noise=6), 'JPEG', quality=80)
+        for index in range(4)
+    ]
+    sequence = itertools.count()
+
+    def paced(frame):
+        part = -(-len(frame) // SLOW_UPLOAD_PARTS)
+        for offset in range(0, len(frame), part):
+            time.sleep(SLOW_UPLOAD_SECONDS / SLOW_UPLOAD_PARTS)
+            yield frame[offset:offset + part]
+
+    def build(rng):
+        frame = rng.choice(frames) + next(sequence).to_bytes(8, 'big')
+        headers = {'Content-Type': 'image/jpeg', 'Content-Length': str(len(frame)),
+                   'X-Scan-Session': f'loadtest-slow-{rng.randrange(CAMERA_SESSIONS)}'}
+        return Request('scan_raw_slow', 'POST', '/api/scan/raw', paced(frame), headers)
+    return build
+
+def file_upload(build_rng):
+    bodies = []
+    for index in range(4):
+        png = encode(qr_image(f'https://example.com/upload/{index}', 600, build_rng, canvas=(1600, 1200)), 'PNG')
+        bodies.append(
+            (f'--{BOUNDARY}\r\n'
+             f'Content-Disposition: form-data; name="file"; filename="photo{index}.png"\r\n'
+             'Content-Type: image/png\r\n\r\n').encode() + png + f'\r\n--{BOUNDARY}--\r\n'.encode()
+        )
+    headers = {'Content-Type': f'multipart/form-data; boundary={BOUNDARY}'}
+    return lambda rng: Request('scan_file', 'POST', '/api/scan/file', rng.choice(bodies), headers)
+
+def generate(build_rng):
+    ranks = list(range(1, HOT_KEYS + 1))
+    weights = list(itertools.accumulate(1 / rank ** HOT_KEY_EXPONENT for rank in ranks))
+
+    def build(rng):
+        rank = rng.choices(ranks, cum_weights=weights)[0]
+        return Request('generate', 'GET', f'/api/generate?text=label-{rank}&format=png', None, {})
+    return build
+
+def history(build_rng):
+    return lambda rng: Request('history', 'GET', '/api/history?limit=50', None, {})
+
+def history_stats(build_rng):
+    return lambda rng: Request('history_stats', 'GET', '/api/history/stats', None, {})
+
+KINDS = {
+    'camera_frame': camera_frame,
+    'slow_camera': slow_camera,
+    'file_upload': file_upload,
+    'generate': generate,
+    'history': history,
+    'history_stats': history_stats
+}
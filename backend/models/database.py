@@ -0,0 +1,133 @@
+import atexit
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from config import Config
+
+SYNCHRONOUS_LEVELS = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+
+class Database:
+    """Per-process SQLite connection manager.
+
+    Each thread gets one persistent connection, opened on first use and
+    tuned with WAL journaling, a busy timeout and the cache/mmap pragmas
+    from Config. Connections are in autocommit mode; writes go through
+    write(), which takes the write lock up front with BEGIN IMMEDIATE so a
+    busy database is waited on instead of failing mid-transaction.
+    Connections opened before a fork are never reused in the child.
+    """
+    
+    def __init__(self, path, setup=None):
+        self.path = path
+        self.setup = setup
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._setup_lock = threading.Lock()
+        self._pid = None
+        self._connections = []
+        self._ready = False
+        atexit.register(self.close_all)
+    
+    def connection(self):
+        """Return this thread's connection, opening it if needed"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: connections inherited from the parent are unusable
+                self._pid = os.getpid()
+                self._connections = []
+                self._ready = False
+        
+        conn = self._connect()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        with self._lock:
+            self._connections.append(conn)
+        
+        # Other threads wait here until the first one has set up the schema
+        if not self._ready:
+            with self._setup_lock:
+                if not self._ready:
+                    if self.setup is not None:
+                        self.setup(conn)
+                    self._ready = True
+        return conn
+    
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        conn = sqlite3.connect(
+            self.path,
+            timeout=Config.SQLITE_BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,
+            check_same_thread=False,  # Only close_all() crosses threads
+            cached_statements=Config.SQLITE_CACHED_STATEMENTS
+        )
+        conn.row_factory = sqlite3.Row
+        
+        synchronous = Config.SQLITE_SYNCHRONOUS
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            synchronous = 'NORMAL'
+        
+        # Only takes effect on a new file; existing ones need convert_auto_vacuum()
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute(f'PRAGMA synchronous = {synchronous}')
+        conn.execute(f'PRAGMA busy_timeout = {int(Config.SQLITE_BUSY_TIMEOUT_MS)}')
+        conn.execute(f'PRAGMA cache_size = -{int(Config.SQLITE_CACHE_SIZE_KB)}')
+        conn.execute(f'PRAGMA mmap_size = {int(Config.SQLITE_MMAP_SIZE)}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        return conn
+    
+    @contextmanager
+    def write(self):
+        """Run a write transaction; commits on success, rolls back on error"""
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+    
+    def convert_auto_vacuum(self):
+        """Switch an existing file to incremental auto-vacuum (one-off VACUUM).
+
+        Returns True if a conversion ran. VACUUM rewrites the whole file and
+        holds the write lock while it does.
+        """
+        conn = self.connection()
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            return False
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+        return True
+    
+    def incremental_vacuum(self, pages):
+        """Return up to pages free pages to the filesystem; returns pages freed"""
+        conn = self.connection()
+        before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if before:
+            # executescript steps the pragma to completion; execute() frees one page
+            conn.executescript(f'PRAGMA incremental_vacuum({int(pages)});')
+        return before - conn.execute('PRAGMA freelist_count').fetchone()[0]
+    
+    def close_all(self):
+        """Close every connection opened by this process"""
+        with self._lock:
+            connections = self._connections if self._pid == os.getpid() else []
+            self._connections = []
+            self._ready = False
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
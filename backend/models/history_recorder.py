@@ -0,0 +1,190 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from config import Config
+from utils.fork_safe import per_process
+from utils.stats import stats
+
+STATS_GROUP = 'history_recorder'
+
+logger = logging.getLogger(__name__)
+
+class _PendingWrite:
+    """Records queued by one caller, plus a completion signal for group mode"""
+    __slots__ = ('records', 'done', 'error')
+    
+    def __init__(self, records, wait):
+        self.records = records
+        self.done = threading.Event() if wait else None
+        self.error = None
+
+class HistoryRecorder:
+    """Write-behind front end for QRHistory inserts.
+
+    Modes (HISTORY_WRITE_MODE):
+      sync  - insert and commit on the caller's thread (one commit per call)
+      group - queue, then wait until the background flush that contains the
+              records has committed; concurrent requests share one commit
+      async - queue and return immediately (fire-and-forget); records
+              still in the queue are lost if the process is killed
+
+    The flusher thread commits a batch with executemany in one transaction
+    once HISTORY_FLUSH_BATCH records are queued or HISTORY_FLUSH_INTERVAL
+    seconds have passed; group-mode callers do not wait for the interval.
+    Pending records are drained at interpreter exit. If the queue is full,
+    async callers fall back to a synchronous write instead of dropping
+    records.
+    """
+    
+    MODES = ('sync', 'group', 'async')
+    
+    def __init__(self, history, mode='group', batch_size=256, flush_interval=0.05, max_queue=10000):
+        if mode not in self.MODES:
+            raise ValueError(f'Unknown history write mode: {mode}')
+        self.history = history
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._flusher = per_process(self._start_flusher)
+        self._stopping = False
+        atexit.register(self.close)
+    
+    @classmethod
+    def from_config(cls, history):
+        return cls(
+            history,
+            mode=Config.HISTORY_WRITE_MODE,
+            batch_size=Config.HISTORY_FLUSH_BATCH,
+            flush_interval=Config.HISTORY_FLUSH_INTERVAL,
+            max_queue=Config.HISTORY_QUEUE_SIZE
+        )
+    
+    def record(self, record_type, content, data=None):
+        """Record a single history entry"""
+        self.record_many([(record_type, content, data)])
+    
+    def record_many(self, records):
+        """Record (record_type, content, data) tuples as one unit"""
+        records = list(records)
+        if not records:
+            return
+        
+        if self.mode == 'sync' or self._stopping:
+            self._write(records)
+            return
+        
+        pending = _PendingWrite(records, wait=self.mode == 'group')
+        try:
+            self._flusher.get()[0].put_nowait(pending)
+        except queue.Full:
+            stats.incr(STATS_GROUP, 'queue_full_sync_writes')
+            self._write(records)
+            return
+        stats.incr(STATS_GROUP, 'queued', len(records))
+        
+        if pending.done is not None:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+    
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been committed"""
+        flusher = self._flusher.peek()
+        if flusher is None:
+            return
+        marker = _PendingWrite([], wait=True)
+        flusher[0].put(marker)
+        marker.done.wait(timeout)
+    
+    def close(self):
+        """Stop the flusher after draining the queue"""
+        with self._lock:
+            flusher = self._flusher.peek()
+            self._stopping = True
+        if flusher is not None:
+            q, thread = flusher
+            q.put(None)
+            thread.join(timeout=10)
+    
+    def _start_flusher(self):
+        """This process's (queue, flusher thread)"""
+        q = queue.Queue(maxsize=self.max_queue)
+        self._stopping = False
+        thread = threading.Thread(target=self._run, args=(q,), name='history-recorder', daemon=True)
+        thread.start()
+        return q, thread
+    
+    def _write(self, records):
+        start = time.perf_counter()
+        self.history.add_records(records)
+        stats.incr(STATS_GROUP, 'commits')
+        stats.incr(STATS_GROUP, 'written', len(records))
+        stats.incr(STATS_GROUP, 'commit_ms_total', (time.perf_counter() - start) * 1000)
+    
+    def _run(self, q):
+        stop = False
+        while not stop:
+            try:
+                first = q.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            
+            batch = [first]
+            count = len(first.records) if first is not None else 0
+            deadline = time.monotonic() + self.flush_interval
+            
+            # Collect until the batch is full or the interval has elapsed.
+            # Waiting callers are committed as soon as the queue is empty:
+            # the commit itself is the window that groups the next callers.
+            while count < self.batch_size:
+                waiting = any(item is None or item.done is not None for item in batch)
+                remaining = 0 if waiting else deadline - time.monotonic()
+                try:
+                    item = q.get_nowait() if remaining <= 0 else q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                if item is not None:
+                    count += len(item.records)
+            
+            if None in batch:
+                stop = True
+                batch = [item for item in batch if item is not None]
+                # Drain whatever is left before exiting
+                while True:
+                    try:
+                        item = q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not None:
+                        batch.append(item)
+            
+            self._commit(batch)
+    
+    def _commit(self, batch):
+        records = [record for pending in batch for record in pending.records]
+        error = None
+        if records:
+            try:
+                self._write(records)
+            except Exception as e:
+                stats.incr(STATS_GROUP, 'failed', len(records))
+                logger.exception('Error writing %d history records', len(records))
+                error = e
+        
+        for pending in batch:
+            if pending.done is not None:
+                pending.error = error
+                pending.done.set()
+    
+    def gauges(self):
+        """Current queue depth for this worker"""
+        flusher = self._flusher.peek()
+        return {
+            'mode': self.mode,
+            'queue_depth': flusher[0].qsize() if flusher is not None else 0
+        }
@@ -0,0 +1,214 @@
+import fcntl
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from config import Config
+from utils.stats import stats
+
+STATS_GROUP = 'history_retention'
+
+logger = logging.getLogger(__name__)
+
+class HistoryArchive:
+    """Writes expired history rows to gzip NDJSON segment files.
+
+    Segments are partitioned by the record's UTC day:
+    <root>/YYYY/MM/DD/history-<first id>-<last id>.ndjson.gz. Each pruned
+    chunk becomes new immutable segments, written to a temporary name and
+    renamed into place, so readers never see a partial file.
+    """
+    
+    def __init__(self, root):
+        self.root = root
+    
+    def write(self, records):
+        """Archive records; returns the segment paths written"""
+        by_day = defaultdict(list)
+        for record in records:
+            by_day[record['timestamp'][:10]].append(record)
+        
+        paths = []
+        for day, rows in sorted(by_day.items()):
+            directory = os.path.join(self.root, *day.split('-'))
+            os.makedirs(directory, exist_ok=True)
+            
+            name = f"history-{rows[0]['id']}-{rows[-1]['id']}.ndjson.gz"
+            path = os.path.join(directory, name)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps({
+                        'id': row['id'],
+                        'type': row['type'],
+                        'content': row['content'],
+                        'data': json.loads(row['data']) if row['data'] else None,
+                        'timestamp': row['timestamp']
+                    }) + '\n')
+            os.replace(tmp_path, path)
+            paths.append(path)
+        
+        return paths
+
+class HistoryPruner:
+    """Background retention for qr_history.
+
+    Rows older than HISTORY_RETENTION_DAYS, and the oldest rows beyond
+    HISTORY_MAX_ROWS, are archived (when HISTORY_ARCHIVE_DIR is set) and
+    deleted HISTORY_PRUNE_CHUNK rows per transaction, pausing between
+    chunks so request writes are not starved. Freed pages are then handed
+    back to the filesystem with incremental vacuum. Only one process per
+    database prunes at a time (an flock on <database>.prune.lock).
+
+    Archival is at-least-once: a crash between writing a segment and
+    committing the delete archives those rows again on the next run.
+    """
+    
+    def __init__(self, history, retention_days=0, max_rows=0, chunk_size=500,
+                 interval=300, pause=0.05, archive_dir='', vacuum_pages=1000):
+        self.history = history
+        self.retention_days = retention_days
+        self.max_rows = max_rows
+        self.chunk_size = chunk_size
+        self.interval = interval
+        self.pause = pause
+        self.archive = HistoryArchive(archive_dir) if archive_dir else None
+        self.vacuum_pages = vacuum_pages
+        self._stop = threading.Event()
+        self._thread = None
+        self._vacuum_checked = False
+    
+    @classmethod
+    def from_config(cls, history):
+        return cls(
+            history,
+            retention_days=Config.HISTORY_RETENTION_DAYS,
+            max_rows=Config.HISTORY_MAX_ROWS,
+            chunk_size=Config.HISTORY_PRUNE_CHUNK,
+            interval=Config.HISTORY_PRUNE_INTERVAL,
+            pause=Config.HISTORY_PRUNE_PAUSE,
+            archive_dir=Config.HISTORY_ARCHIVE_DIR,
+            vacuum_pages=Config.HISTORY_VACUUM_PAGES
+        )
+    
+    @property
+    def enabled(self):
+        return self.interval > 0 and (self.retention_days > 0 or self.max_rows > 0)
+    
+    def start(self):
+        """Start the pruning thread for this process, if retention is enabled"""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='history-pruner', daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout=10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                with self._exclusive() as acquired:
+                    if acquired:
+                        self.run_once()
+            except Exception:
+                stats.incr(STATS_GROUP, 'errors')
+                logger.exception('Error pruning history')
+    
+    @contextmanager
+    def _exclusive(self):
+        """Non-blocking cross-process lock; yields whether it was acquired"""
+        with open(f'{self.history.db_path}.prune.lock', 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def run_once(self):
+        """Apply every policy once, then vacuum; returns counts per step"""
+        result = {'expired': 0, 'excess': 0, 'archived_segments': 0, 'vacuumed_pages': 0}
+        
+        if not self._vacuum_checked:
+            # Databases created before incremental auto-vacuum need one full VACUUM
+            if self.history.db.convert_auto_vacuum():
+                logger.info('Converted history database to incremental auto-vacuum')
+            self._vacuum_checked = True
+        
+        if self.retention_days > 0:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+            before = cutoff.strftime('%Y-%m-%d %H:%M:%S')
+            result['expired'], segments = self._prune(before=before)
+            result['archived_segments'] += segments
+        
+        if self.max_rows > 0:
+            excess = self.history.count() - self.max_rows
+            if excess > 0:
+                result['excess'], segments = self._prune(limit=excess)
+                result['archived_segments'] += segments
+        
+        if result['expired'] or result['excess']:
+            with self.history.db.write() as conn:
+                conn.execute('DELETE FROM qr_history_stats WHERE count <= 0')
+        
+        result['vacuumed_pages'] = self.vacuum()
+        return result
+    
+    def clear(self):
+        """Archive and delete every row, then vacuum; returns rows deleted"""
+        deleted, _ = self._prune()
+        with self.history.db.write() as conn:
+            conn.execute('DELETE FROM qr_history_stats WHERE count <= 0')
+        self.vacuum()
+        return deleted
+    
+    def _prune(self, before=None, limit=None):
+        """Archive and delete the oldest rows chunk by chunk"""
+        deleted = 0
+        segments = 0
+        while not self._stop.is_set():
+            size = self.chunk_size if limit is None else min(self.chunk_size, limit - deleted)
+            if size <= 0:
+                break
+            
+            records = self.history.oldest_records(size, before=before)
+            if not records:
+                break
+            
+            # Archive before deleting so a failed write keeps the rows
+            if self.archive is not None:
+                written = len(self.archive.write(records))
+                segments += written
+                stats.incr(STATS_GROUP, 'archived_segments', written)
+            deleted += self.history.delete_records(record['id'] for record in records)
+            stats.incr(STATS_GROUP, 'deleted', len(records))
+            
+            if len(records) < size:
+                break
+            time.sleep(self.pause)
+        
+        return deleted, segments
+    
+    def vacuum(self):
+        """Release free pages in small steps; returns pages released"""
+        released = 0
+        while not self._stop.is_set():
+            freed = self.history.db.incremental_vacuum(self.vacuum_pages)
+            released += freed
+            if freed < self.vacuum_pages:
+                break
+            time.sleep(self.pause)
+        stats.incr(STATS_GROUP, 'vacuumed_pages', released)
+        return released
@@ -1,73 +1,539 @@
-import sqlite3
+import base64
+import html
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 from config import Config
+from models.database import Database
+from models.history_retention import HistoryPruner
+from utils.metrics import sqlite_timer
+
+# Rows backfilled per statement when migrating an existing database
+MIGRATION_CHUNK = 10000
+
+SEARCH_SORTS = ('rank', 'recent')
+
+IMPORT_SQL = '''
+    INSERT INTO qr_history (type, content, data, method, content_type, timestamp)
+    VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+'''
+
+INSERT_SQL = '''
+    INSERT INTO qr_history (type, content, data, method, content_type)
+    VALUES (?, ?, ?, ?, ?)
+'''
 
 class QRHistory:
-    def __init__(self):
-        self.db_path = Config.DATABASE_PATH
-        self.init_db()
+    def __init__(self, db_path=None):
+        self.db_path = db_path or Config.DATABASE_PATH
+        # Schema is created lazily, once per process, on first connection
+        self.db = Database(self.db_path, setup=self._create_schema)
     
     def init_db(self):
         """Initialize the database with required tables"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS qr_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    type TEXT NOT NULL,  -- 'scan' or 'generate'
-                    content TEXT NOT NULL,
-                    data TEXT,  -- JSON string for additional data
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            conn.commit()
+        self.db.connection()
+    
+    def _create_schema(self, conn):
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS qr_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                type TEXT NOT NULL,  -- 'scan' or 'generate'
+                content TEXT NOT NULL,
+                data TEXT,  -- JSON string for additional data
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self._migrate(conn)
     
+    def _migrate(self, conn):
+        """Apply schema migrations newer than PRAGMA user_version"""
+        # Hold the write lock so workers starting together migrate once
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            for target, migration in enumerate(MIGRATIONS, start=1):
+                if version < target:
+                    migration(conn)
+                    conn.execute(f'PRAGMA user_version = {target}')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+    
+    @staticmethod
+    def _row_values(record_type, content, data):
+        """Build insert parameters, denormalizing filterable fields from data"""
+        method = content_type = None
+        if data:
+            method = data.get('method')
+            content_type = (data.get('qr_info') or {}).get('type')
+        return (record_type, content, json.dumps(data) if data else None, method, content_type)
+    
+    @sqlite_timer('add_record')
     def add_record(self, record_type, content, data=None):
         """Add a new record to history"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO qr_history (type, content, data)
-                VALUES (?, ?, ?)
-            ''', (record_type, content, json.dumps(data) if data else None))
-            conn.commit()
+        with self.db.write() as conn:
+            cursor = conn.execute(INSERT_SQL, self._row_values(record_type, content, data))
             return cursor.lastrowid
     
+    @sqlite_timer('add_records')
+    def add_records(self, records):
+        """Add many records in a single transaction.
+
+        records is an iterable of (record_type, content, data) tuples.
+        """
+        with self.db.write() as conn:
+            cursor = conn.executemany(INSERT_SQL, (
+                self._row_values(record_type, content, data)
+                for record_type, content, data in records
+            ))
+            return cursor.rowcount
+    
     def get_history(self, limit=50):
         """Get recent history records"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM qr_history 
-                ORDER BY timestamp DESC 
-                LIMIT ?
-            ''', (limit,))
-            records = cursor.fetchall()
-            
-            # Convert to list of dictionaries
-            history = []
-            for record in records:
-                item = dict(record)
-                if item['data']:
-                    item['data'] = json.loads(item['data'])
-                history.append(item)
-            
-            return history
+        history, _ = self.get_page(limit)
+        return history
     
+    @sqlite_timer('get_page')
+    def get_page(self, limit=50, cursor=None, record_type=None, method=None,
+                 content_type=None, since=None, until=None):
+        """Get one page of history, newest first.
+
+        Pages are keyed on (timestamp, id): pass the returned next_cursor to
+        fetch the following page. next_cursor is None on the last page.
+        Raises ValueError for a malformed cursor or time bound.
+        """
+        clauses, params = self._filter_clauses(record_type, method, content_type, since, until)
+        if cursor:
+            clauses.append('(timestamp, id) < (?, ?)')
+            params.extend(self.decode_cursor(cursor, str, int))
+        
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        params.append(limit + 1)
+        
+        rows = self.db.connection().execute(f'''
+            SELECT id, type, content, data, timestamp FROM qr_history
+            {where}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+        ''', params).fetchall()
+        
+        # Convert to list of dictionaries
+        history = []
+        for record in rows[:limit]:
+            item = dict(record)
+            if item['data']:
+                item['data'] = json.loads(item['data'])
+            history.append(item)
+        
+        next_cursor = None
+        if len(rows) > limit:
+            last = history[-1]
+            next_cursor = self.encode_cursor(last['timestamp'], last['id'])
+        
+        return history, next_cursor
+    
+    def iter_records(self, chunk_size=1000, record_type=None, method=None,
+                     content_type=None, since=None, until=None):
+        """Yield every matching record, oldest first, with data as raw JSON.
+
+        Rows are read in keyset chunks, each its own short read, so an
+        export of any size holds one chunk in memory and never pins a WAL
+        snapshot for the whole stream. Raises ValueError for a bad time bound
+        before the first row is read.
+        """
+        clauses, params = self._filter_clauses(record_type, method, content_type, since, until)
+        
+        def chunks():
+            position = None
+            while True:
+                where = list(clauses)
+                values = list(params)
+                if position is not None:
+                    where.append('(timestamp, id) > (?, ?)')
+                    values.extend(position)
+                values.append(chunk_size)
+                
+                with sqlite_timer('iter_records'):
+                    rows = self.db.connection().execute(f'''
+                        SELECT id, type, content, data, timestamp FROM qr_history
+                        {'WHERE ' + ' AND '.join(where) if where else ''}
+                        ORDER BY timestamp, id
+                        LIMIT ?
+                    ''', values).fetchall()
+                
+                yield from (dict(row) for row in rows)
+                if len(rows) < chunk_size:
+                    return
+                position = (rows[-1]['timestamp'], rows[-1]['id'])
+        
+        return chunks()
+    
+    @sqlite_timer('import_records')
+    def import_records(self, records, batch_size=None):
+        """Bulk insert (record_type, content, data, timestamp) tuples.
+
+        Each batch of HISTORY_IMPORT_BATCH rows is one executemany in one
+        transaction; a missing timestamp means now. Returns rows inserted.
+        """
+        batch_size = batch_size or Config.HISTORY_IMPORT_BATCH
+        total = 0
+        batch = []
+        
+        def flush():
+            with self.db.write() as conn:
+                conn.executemany(IMPORT_SQL, batch)
+            return len(batch)
+        
+        for record_type, content, data, timestamp in records:
+            batch.append(self._row_values(record_type, content, data) + (timestamp,))
+            if len(batch) >= batch_size:
+                total += flush()
+                batch = []
+        if batch:
+            total += flush()
+        return total
+    
+    def _filter_clauses(self, record_type, method, content_type, since, until):
+        """Build WHERE clauses shared by listing and export"""
+        clauses = []
+        params = []
+        
+        for column, value in (('type', record_type), ('method', method), ('content_type', content_type)):
+            if value:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if since:
+            clauses.append('timestamp >= ?')
+            params.append(self.normalize_time(since))
+        if until:
+            clauses.append('timestamp < ?')
+            params.append(self.normalize_time(until))
+        return clauses, params
+    
+    @staticmethod
+    def encode_cursor(*position):
+        """Encode a page position, e.g. (timestamp, id), as an opaque cursor"""
+        raw = json.dumps(position, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor, *types):
+        """Decode a cursor back to a position whose values match types"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded))
+        except (ValueError, TypeError):
+            raise ValueError('Invalid cursor')
+        if not isinstance(position, list) or len(position) != len(types):
+            raise ValueError('Invalid cursor')
+        
+        values = []
+        for value, expected in zip(position, types):
+            # JSON has one number type; accept ints where floats are expected
+            if expected is float and isinstance(value, int) and not isinstance(value, bool):
+                value = float(value)
+            if not isinstance(value, expected) or isinstance(value, bool):
+                raise ValueError('Invalid cursor')
+            values.append(value)
+        return values
+    
+    @sqlite_timer('search')
+    def search(self, query, limit=20, cursor=None, record_type=None, sort='rank'):
+        """Full-text search over record content.
+
+        All whitespace-separated terms must match; the last one is matched
+        as a prefix unless it is wrapped in double quotes. sort='rank'
+        orders by bm25 relevance, which scores every match, so
+        sort='recent' (newest first) is cheaper for broad queries. Either
+        way pages continue from next_cursor. Results carry an HTML-escaped
+        'snippet' with matches wrapped in <mark>. Raises ValueError for an
+        empty query, bad sort or malformed cursor.
+        """
+        if sort not in SEARCH_SORTS:
+            raise ValueError(f'Invalid sort: {sort}')
+        
+        clauses = ['qr_history_fts MATCH ?']
+        params = [self._fts_query(query)]
+        
+        if record_type:
+            clauses.append('h.type = ?')
+            params.append(record_type)
+        if cursor:
+            if sort == 'rank':
+                rank, record_id = self.decode_cursor(cursor, float, int)
+                clauses.append('(rank > ? OR (rank = ? AND qr_history_fts.rowid > ?))')
+                params.extend((rank, rank, record_id))
+            else:
+                record_id, = self.decode_cursor(cursor, int)
+                clauses.append('qr_history_fts.rowid < ?')
+                params.append(record_id)
+        
+        # bm25 needs document counts for every term, so only rank when asked
+        if sort == 'rank':
+            score, order = 'rank', 'rank, qr_history_fts.rowid'
+        else:
+            score, order = 'NULL AS rank', 'qr_history_fts.rowid DESC'
+        params.append(limit + 1)
+        
+        rows = self.db.connection().execute(f'''
+            SELECT h.id, h.type, h.content, h.data, h.timestamp, {score},
+                   snippet(qr_history_fts, 0, char(2), char(3), '…', 16) AS snippet
+            FROM qr_history_fts
+            JOIN qr_history h ON h.id = qr_history_fts.rowid
+            WHERE {' AND '.join(clauses)}
+            ORDER BY {order}
+            LIMIT ?
+        ''', params).fetchall()
+        
+        results = []
+        for record in rows[:limit]:
+            item = dict(record)
+            if item['data']:
+                item['data'] = json.loads(item['data'])
+            item['snippet'] = html.escape(item['snippet']).replace('\x02', '<mark>').replace('\x03', '</mark>')
+            results.append(item)
+        
+        next_cursor = None
+        if len(rows) > limit:
+            last = results[-1]
+            if sort == 'rank':
+                next_cursor = self.encode_cursor(last['rank'], last['id'])
+            else:
+                next_cursor = self.encode_cursor(last['id'])
+        
+        return results, next_cursor
+    
+    @staticmethod
+    def _fts_query(text):
+        """Turn user input into an FTS5 query of quoted prefix terms"""
+        terms = [term for term in (text or '').split() if any(c.isalnum() for c in term)]
+        if not terms:
+            raise ValueError('Search query is empty')
+        
+        quoted = []
+        for term in terms:
+            exact = len(term) > 2 and term.startswith('"') and term.endswith('"')
+            quoted.append('"' + term.strip('"').replace('"', '""') + '"')
+        
+        # Only an unquoted last term is a prefix: FTS5 merges the doclist of
+        # every matching token for a prefix, which is costly for common words
+        if not exact:
+            quoted[-1] += '*'
+        return ' '.join(quoted)
+    
+    @staticmethod
+    def normalize_time(value):
+        """Normalize an ISO 8601 time bound to the stored timestamp format"""
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError(f'Invalid time: {value}')
+        if parsed.tzinfo is not None:
+            # Stored timestamps are UTC without an offset
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed.strftime('%Y-%m-%d %H:%M:%S')
+    
+    @sqlite_timer('delete_record')
     def delete_record(self, record_id):
         """Delete a specific record"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM qr_history WHERE id = ?', (record_id,))
-            conn.commit()
+        with self.db.write() as conn:
+            cursor = conn.execute('DELETE FROM qr_history WHERE id = ?', (record_id,))
             return cursor.rowcount > 0
     
-    def clear_history(self):
-        """Clear all history records"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM qr_history')
-            conn.commit()
-            return cursor.rowcount
\ No newline at end of file
+    @sqlite_timer('delete_records')
+    def delete_records(self, record_ids):
+        """Delete many records by id in one transaction"""
+        with self.db.write() as conn:
+            cursor = conn.executemany(
+                'DELETE FROM qr_history WHERE id = ?',
+                ((record_id,) for record_id in record_ids)
+            )
+            return cursor.rowcount
+    
+    @sqlite_timer('oldest_records')
+    def oldest_records(self, limit, before=None):
+        """Get the oldest records, optionally only those older than before.
+
+        Rows are returned as stored (data is the raw JSON string) for
+        archival; before is a stored-format timestamp string.
+        """
+        where = 'WHERE timestamp < ?' if before else ''
+        params = [before, limit] if before else [limit]
+        rows = self.db.connection().execute(f'''
+            SELECT id, type, content, data, timestamp FROM qr_history
+            {where}
+            ORDER BY timestamp, id
+            LIMIT ?
+        ''', params).fetchall()
+        return [dict(row) for row in rows]
+    
+    @sqlite_timer('count')
+    def count(self):
+        """Total number of records, from the summary table"""
+        row = self.db.connection().execute('''
+            SELECT count FROM qr_history_stats WHERE dimension = 'total' AND key = ''
+        ''').fetchone()
+        return row[0] if row else 0
+    
+    @sqlite_timer('clear_history')
+    def clear_history(self, chunk_size=None):
+        """Clear all history records.
+
+        Goes through the retention pruner, so rows are archived (when
+        HISTORY_ARCHIVE_DIR is set) and deleted HISTORY_PRUNE_CHUNK rows per
+        transaction, and the freed pages are vacuumed afterwards.
+        """
+        pruner = HistoryPruner.from_config(self)
+        if chunk_size:
+            pruner.chunk_size = chunk_size
+        return pruner.clear()
+    
+    @sqlite_timer('get_stats')
+    def get_stats(self):
+        """Get exact counts over the whole table from the summary table"""
+        rows = self.db.connection().execute('''
+            SELECT dimension, key, count FROM qr_history_stats WHERE count > 0
+        ''').fetchall()
+        
+        stats = {
+            'total_records': 0,
+            'scans': 0,
+            'generations': 0,
+            'methods': {},
+            'content_types': {},
+            'days': {}
+        }
+        groups = {'method': 'methods', 'content_type': 'content_types', 'day': 'days'}
+        
+        for dimension, key, count in rows:
+            if dimension == 'total':
+                stats['total_records'] = count
+            elif dimension == 'type':
+                if key == 'scan':
+                    stats['scans'] = count
+                elif key == 'generate':
+                    stats['generations'] = count
+            elif dimension in groups:
+                stats[groups[dimension]][key] = count
+        
+        return stats
+
+def _migration_filter_columns(conn):
+    """v1: denormalized method/content_type columns and keyset indexes"""
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(qr_history)')}
+    if 'method' not in columns:
+        conn.execute('ALTER TABLE qr_history ADD COLUMN method TEXT')
+    if 'content_type' not in columns:
+        conn.execute('ALTER TABLE qr_history ADD COLUMN content_type TEXT')
+    
+    # Backfill from the JSON blob in id ranges to bound statement size
+    max_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM qr_history').fetchone()[0]
+    for start in range(0, max_id, MIGRATION_CHUNK):
+        conn.execute('''
+            UPDATE qr_history
+            SET method = json_extract(data, '$.method'),
+                content_type = json_extract(data, '$.qr_info.type')
+            WHERE id > ? AND id <= ? AND data IS NOT NULL
+        ''', (start, start + MIGRATION_CHUNK))
+    
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_history_timestamp
+        ON qr_history (timestamp, id)
+    ''')
+    for column in ('type', 'method', 'content_type'):
+        conn.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_history_{column}_timestamp
+            ON qr_history ({column}, timestamp, id)
+        ''')
+
+def _migration_stats_summary(conn):
+    """v2: per-dimension counters maintained by triggers"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS qr_history_stats (
+            dimension TEXT NOT NULL,  -- 'total', 'type', 'method', 'content_type' or 'day'
+            key TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (dimension, key)
+        ) WITHOUT ROWID
+    ''')
+    
+    # Rebuild from the table, so re-running the migration stays exact
+    conn.execute('DELETE FROM qr_history_stats')
+    conn.execute('''
+        INSERT INTO qr_history_stats (dimension, key, count)
+        SELECT 'total', '', COUNT(*) FROM qr_history
+        UNION ALL
+        SELECT 'type', type, COUNT(*) FROM qr_history GROUP BY type
+        UNION ALL
+        SELECT 'method', method, COUNT(*) FROM qr_history
+        WHERE method IS NOT NULL GROUP BY method
+        UNION ALL
+        SELECT 'content_type', content_type, COUNT(*) FROM qr_history
+        WHERE content_type IS NOT NULL GROUP BY content_type
+        UNION ALL
+        SELECT 'day', date(timestamp), COUNT(*) FROM qr_history GROUP BY date(timestamp)
+    ''')
+    
+    # Triggers run inside the inserting/deleting transaction
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS qr_history_stats_insert
+        AFTER INSERT ON qr_history
+        BEGIN
+            INSERT INTO qr_history_stats (dimension, key, count)
+            SELECT column1, column2, 1 FROM (VALUES
+                ('total', ''), ('type', new.type), ('day', date(new.timestamp)),
+                ('method', new.method), ('content_type', new.content_type)
+            )
+            WHERE column2 IS NOT NULL
+            ON CONFLICT (dimension, key) DO UPDATE SET count = count + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS qr_history_stats_delete
+        AFTER DELETE ON qr_history
+        BEGIN
+            UPDATE qr_history_stats SET count = count - 1 WHERE dimension = 'total' AND key = '';
+            UPDATE qr_history_stats SET count = count - 1 WHERE dimension = 'type' AND key = old.type;
+            UPDATE qr_history_stats SET count = count - 1 WHERE dimension = 'day' AND key = date(old.timestamp);
+            UPDATE qr_history_stats SET count = count - 1 WHERE dimension = 'method' AND key = old.method;
+            UPDATE qr_history_stats SET count = count - 1 WHERE dimension = 'content_type' AND key = old.content_type;
+        END
+    ''')
+
+def _migration_search_index(conn):
+    """v3: FTS5 index over content, kept in sync by triggers"""
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS qr_history_fts USING fts5(
+            content,
+            content='qr_history',
+            content_rowid='id',
+            prefix='2 3'
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS qr_history_fts_insert
+        AFTER INSERT ON qr_history
+        BEGIN
+            INSERT INTO qr_history_fts (rowid, content) VALUES (new.id, new.content);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS qr_history_fts_delete
+        AFTER DELETE ON qr_history
+        BEGIN
+            INSERT INTO qr_history_fts (qr_history_fts, rowid, content)
+            VALUES ('delete', old.id, old.content);
+        END
+    ''')
+    # Index rows written before the migration
+    conn.execute("INSERT INTO qr_history_fts (qr_history_fts) VALUES ('rebuild')")
+
+# Applied in order; the list position (1-based) is the schema version
+MIGRATIONS = [
+    _migration_filter_columns,
+    _migration_stats_summary,
+    _migration_search_index
+]
+
+# One instance per worker process, shared by all routes
+qr_history = QRHistory()
@@ -1,22 +1,135 @@
-from flask import Blueprint, request, jsonify
-from models.qr_history import QRHistory
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from config import Config
+from models.qr_history import qr_history
+from models.history_retention import HistoryPruner
+from utils.history_io import (
+    EXPORT_FORMATS, batch_text_chunks, export_lines, gzip_chunks,
+    iter_import_records, open_import_stream
+)
 
 history_bp = Blueprint('history', __name__)
-qr_history = QRHistory()
+history_pruner = HistoryPruner.from_config(qr_history)
 
 @history_bp.route('/history', methods=['GET'])
 def get_history():
-    """Get QR code history"""
+    """Get QR code history, one keyset page at a time"""
     try:
         limit = request.args.get('limit', 50, type=int)
         limit = min(max(limit, 1), 200)  # Limit between 1 and 200
         
-        history = qr_history.get_history(limit)
+        try:
+            history, next_cursor = qr_history.get_page(
+                limit,
+                cursor=request.args.get('cursor'),
+                record_type=request.args.get('type'),
+                method=request.args.get('method'),
+                content_type=request.args.get('content_type'),
+                since=request.args.get('since'),
+                until=request.args.get('until')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         return jsonify({
             'success': True,
             'history': history,
-            'count': len(history)
+            'count': len(history),
+            'next_cursor': next_cursor
+        })
+    
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@history_bp.route('/history/search', methods=['GET'])
+def search_history():
+    """Full-text search over history content"""
+    try:
+        limit = request.args.get('limit', 20, type=int)
+        limit = min(max(limit, 1), 200)  # Limit between 1 and 200
+        
+        try:
+            results, next_cursor = qr_history.search(
+                request.args.get('q', ''),
+                limit,
+                cursor=request.args.get('cursor'),
+                record_type=request.args.get('type'),
+                sort=request.args.get('sort', 'rank')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'count': len(results),
+            'next_cursor': next_cursor
+        })
+    
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@history_bp.route('/history/export', methods=['GET'])
+def export_history():
+    """Stream history as NDJSON or CSV, optionally gzipped"""
+    try:
+        output = request.args.get('format', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return jsonify({'error': f'Unsupported export format: {output}'}), 400
+        compress = request.args.get('gzip', 'false').lower() in ('1', 'true')
+        
+        try:
+            records = qr_history.iter_records(
+                Config.HISTORY_EXPORT_CHUNK,
+                record_type=request.args.get('type'),
+                method=request.args.get('method'),
+                content_type=request.args.get('content_type'),
+                since=request.args.get('since'),
+                until=request.args.get('until')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        chunks = batch_text_chunks(export_lines(records, output))
+        filename = f'qr-history.{output}'
+        if compress:
+            body = gzip_chunks(chunks)
+            mimetype = 'application/gzip'
+            filename += '.gz'
+        else:
+            body = (chunk.encode('utf-8') for chunk in chunks)
+            mimetype = EXPORT_FORMATS[output]
+        
+        response = Response(stream_with_context(body), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@history_bp.route('/history/import', methods=['POST'])
+def import_history():
+    """Bulk import an NDJSON or CSV export (optionally gzipped)"""
+    try:
+        input_format = request.args.get('format')
+        if input_format is None:
+            input_format = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+        if input_format not in EXPORT_FORMATS:
+            return jsonify({'error': f'Unsupported import format: {input_format}'}), 400
+        
+        text_stream = open_import_stream(
+            request.stream,
+            compressed=request.headers.get('Content-Encoding') == 'gzip'
+        )
+        report = {'skipped': 0, 'errors': []}
+        imported = qr_history.import_records(
+            iter_import_records(text_stream, input_format, report)
+        )
+        
+        return jsonify({
+            'success': True,
+            'imported': imported,
+            **report
         })
     
     except Exception as e:
@@ -54,26 +167,7 @@ def clear_history():
 def get_history_stats():
     """Get history statistics"""
     try:
-        history = qr_history.get_history(1000)  # Get more records for stats
-        
-        stats = {
-            'total_records': len(history),
-            'scans': len([h for h in history if h['type'] == 'scan']),
-            'generations': len([h for h in history if h['type'] == 'generate']),
-            'methods': {},
-            'content_types': {}
-        }
-        
-        for record in history:
-            # Count methods
-            if record['data'] and 'method' in record['data']:
-                method = record['data']['method']
-                stats['methods'][method] = stats['methods'].get(method, 0) + 1
-            
-            # Count content types
-            if record['data'] and 'qr_info' in record['data']:
-                content_type = record['data']['qr_info'].get('type', 'unknown')
-                stats['content_types'][content_type] = stats['content_types'].get(content_type, 0) + 1
+        stats = qr_history.get_stats()
         
         return jsonify({
             'success': True,
@@ -1,107 +1,377 @@
-from flask import Blueprint, request, jsonify
-from utils.qr_processor import QRProcessor
+import json
+import time
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from werkzeug.utils import secure_filename
+from config import Config
+from utils.qr_processor import QRProcessor, OUTPUT_MIMETYPES
+from utils.qr_renderer import QRRenderer
 from utils.file_handler import FileHandler
-from models.qr_history import QRHistory
+from utils.qr_batch import BATCH_OUTPUTS, iter_uploaded_items, make_writer, normalize_item, render_chunk
+from utils.decode_executor import decode_executor, ExecutorSaturated, DecodeTimeout
+from models.qr_history import qr_history
+from models.history_recorder import HistoryRecorder, STATS_GROUP as HISTORY_STATS_GROUP
+from utils.stats import stats
+from utils.scan_cache import decode_result_cache, recent_scans
+from utils.frame_decode import frame_limits
+from utils.metrics import CODES_PER_IMAGE, stage_timer
 
 qr_bp = Blueprint('qr', __name__)
-qr_history = QRHistory()
+history_recorder = HistoryRecorder.from_config(qr_history)
+stats.register(HISTORY_STATS_GROUP, history_recorder.gauges)
+
+# /generate 'format' values: JSON with a data URI, or a raw image body
+GENERATE_FORMATS = {
+    'json': 'data_uri',
+    'png': 'png',
+    'svg': 'svg'
+}
+
+# Rendered and decoded once per worker before it reports ready
+WARMUP_TEXT = 'qr-scanner warm-up'
+
+RAW_SCAN_MIMETYPES = {
+    'application/octet-stream',
+    'image/jpeg',
+    'image/png',
+    'image/webp'
+}
 
 @qr_bp.route('/scan/file', methods=['POST'])
 def scan_qr_from_file():
     """Scan QR code from uploaded file"""
     try:
-        if 'file' not in request.files:
+        with stage_timer('request_parse'):
+            files = request.files
+        if 'file' not in files:
             return jsonify({'error': 'No file provided'}), 400
         
-        file = request.files['file']
+        file = files['file']
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
         if not FileHandler.allowed_file(file.filename):
             return jsonify({'error': 'File type not allowed'}), 400
         
-        # Save uploaded file
-        file_path, filename = FileHandler.save_uploaded_file(file)
-        if not file_path:
-            return jsonify({'error': 'Failed to save file'}), 500
+        if Config.SCAN_UPLOAD_TO_DISK:
+            return _scan_uploaded_file_from_disk(file)
         
-        try:
-            # Process QR code
-            results, error = QRProcessor.decode_qr_from_image(file_path)
-            
-            if error:
-                return jsonify({'error': error}), 400
-            
-            # Save to history
-            for result in results:
-                qr_info = QRProcessor.get_qr_info(result['data'])
-                qr_history.add_record(
-                    'scan',
-                    result['data'],
-                    {
-                        'method': 'file_upload',
-                        'filename': filename,
-                        'qr_info': qr_info,
-                        'position': result['position']
-                    }
-                )
-            
-            return jsonify({
-                'success': True,
-                'results': results,
-                'count': len(results)
-            })
+        # Decode straight from the in-memory upload buffer
+        filename = secure_filename(file.filename)
+        with FileHandler.upload_buffer(file) as buffer:
+            results, error, details = _decode_scan(buffer)
         
-        finally:
-            # Clean up uploaded file
-            FileHandler.delete_file(file_path)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        _record_file_scan(results, filename)
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'count': len(results),
+            **details
+        })
+    
+    except ExecutorSaturated as e:
+        return _decoder_busy_response(e)
+    
+    except DecodeTimeout as e:
+        return jsonify({'error': str(e)}), 504
     
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+def _decode_scan(buffer, camera=False):
+    """Decode a scanned image as the request asks; returns (results, error, details).
+    
+    ?tiled=1 splits a large multi-code image into overlapping tiles decoded
+    in parallel (?module_size= gives the expected module size in pixels);
+    details then lists every tile's code count and decode time.
+    """
+    if request.args.get('tiled') in ('1', 'true'):
+        module_size = request.args.get('module_size', Config.DECODE_TILE_MODULE_SIZE, type=float)
+        module_size = max(1.0, module_size or Config.DECODE_TILE_MODULE_SIZE)
+        results, error, tiles = decode_executor.run(QRProcessor.decode_qr_tiled, buffer, module_size)
+        CODES_PER_IMAGE.labels(request.endpoint).observe(len(results or []))
+        return results, error, {'tiles': tiles}
+    
+    results, error = _decode_image(buffer, camera)
+    CODES_PER_IMAGE.labels(request.endpoint).observe(len(results or []))
+    return results, error, {}
+
+def _decode_image(buffer, camera=False):
+    """Decode an encoded image, reusing a cached result for repeated images.
+    
+    Camera frames also match near-identical earlier frames from the same
+    scan session by perceptual hash. Only decodes that found codes are
+    cached. Pass ?cache=0 to force a fresh decode.
+    """
+    args = _decode_args(buffer)
+    if not decode_result_cache.enabled or request.args.get('cache') == '0':
+        return decode_executor.run(QRProcessor.decode_qr_from_bytes, *args)
+    
+    # Results depend on the frame limits as well as the image
+    key = (decode_result_cache.content_key(buffer),) + args[1:]
+    session = _scan_session() if camera else None
+    phash = decode_result_cache.perceptual_hash(buffer) if camera else None
+    cached = decode_result_cache.get(key, phash, session, variant=args[1:])
+    if cached is not None:
+        return cached
+    
+    start = time.perf_counter()
+    results, error = decode_executor.run(QRProcessor.decode_qr_from_bytes, *args)
+    if results:
+        decode_result_cache.put(key, phash, (results, error), (time.perf_counter() - start) * 1000,
+                                session, variant=args[1:])
+    return results, error
+
+def warm_decoder():
+    """Render a code and decode it through the decode pool once"""
+    png = QRRenderer.render_png(QRRenderer.build_matrix(WARMUP_TEXT), (200, 200))
+    results, error = decode_executor.run(QRProcessor.decode_qr_from_bytes, png)
+    if error or not any(result['data'] == WARMUP_TEXT for result in results):
+        raise RuntimeError(error or 'Warm-up code was not decoded')
+
+def _decode_args(buffer):
+    """Decode job arguments, with frame limits when the request sets any"""
+    limits = _frame_limits()
+    return (buffer,) if limits is None else (buffer, limits)
+
+def _frame_limits():
+    """Per-request bounds for animated and multi-page images, or None.
+    
+    ?max_frames=, ?max_pixels= and ?max_codes= may only lower the
+    configured caps; max_codes stops decoding once that many are found.
+    """
+    requested = [request.args.get(name, type=int) for name in ('max_frames', 'max_pixels', 'max_codes')]
+    return frame_limits(*requested) if any(requested) else None
+
+def _scan_session():
+    """Identify the scanning client for history dedup"""
+    return request.headers.get('X-Scan-Session') or \
+        f"{request.remote_addr}|{request.headers.get('User-Agent', '')}"
+
+def _decoder_busy_response(error):
+    """Shed load quickly when the decode queue is full"""
+    response = jsonify({'error': str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def _scan_uploaded_file_from_disk(file):
+    """Scan an upload by round-tripping it through UPLOAD_FOLDER (debug only)"""
+    # Save uploaded file
+    file_path, filename = FileHandler.save_uploaded_file(file)
+    if not file_path:
+        return jsonify({'error': 'Failed to save file'}), 500
+    
+    try:
+        # Process QR code
+        results, error = decode_executor.run(QRProcessor.decode_qr_from_image, file_path, _frame_limits())
+        
+        if error:
+            return jsonify({'error': error}), 400
+        
+        _record_file_scan(results, filename)
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'count': len(results)
+        })
+    
+    finally:
+        # Clean up uploaded file
+        FileHandler.delete_file(file_path)
+
+def _record_file_scan(results, filename):
+    """Save uploaded-file scan results to history"""
+    history_recorder.record_many(
+        ('scan', result['data'], {
+            'method': 'file_upload',
+            'filename': filename,
+            'qr_info': QRProcessor.get_qr_info(result['data']),
+            'position': result['position']
+        })
+        for result in results
+    )
+
 @qr_bp.route('/scan/data', methods=['POST'])
 def scan_qr_from_data():
     """Scan QR code from base64 image data"""
     try:
-        data = request.get_json()
+        with stage_timer('request_parse'):
+            data = request.get_json()
         if not data or 'image' not in data:
             return jsonify({'error': 'No image data provided'}), 400
         
-        image_data = data['image']
+        image_bytes, error = QRProcessor.base64_to_bytes(data['image'])
+        if error:
+            return jsonify({'error': error}), 400
         
         # Process QR code
-        results, error = QRProcessor.decode_qr_from_base64(image_data)
+        results, error, details = _decode_scan(image_bytes, camera=True)
         
         if error:
             return jsonify({'error': error}), 400
         
-        # Save to history
-        for result in results:
-            qr_info = QRProcessor.get_qr_info(result['data'])
-            qr_history.add_record(
-                'scan',
-                result['data'],
-                {
-                    'method': 'camera_capture',
-                    'qr_info': qr_info,
-                    'position': result['position']
-                }
-            )
+        _record_camera_scan(results)
         
         return jsonify({
             'success': True,
             'results': results,
-            'count': len(results)
+            'count': len(results),
+            **details
         })
     
+    except ExecutorSaturated as e:
+        return _decoder_busy_response(e)
+    
+    except DecodeTimeout as e:
+        return jsonify({'error': str(e)}), 504
+    
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
-@qr_bp.route('/generate', methods=['POST'])
+@qr_bp.route('/scan/raw', methods=['POST'])
+def scan_qr_from_raw():
+    """Scan QR code from a raw binary image body (camera frames)"""
+    try:
+        if request.mimetype not in RAW_SCAN_MIMETYPES:
+            return jsonify({'error': 'Unsupported content type'}), 415
+        
+        # Body is read once; decoding works on a view of these bytes
+        with stage_timer('request_parse'):
+            image_bytes = request.get_data(cache=False)
+        if not image_bytes:
+            return jsonify({'error': 'No image data provided'}), 400
+        
+        results, error, details = _decode_scan(image_bytes, camera=True)
+        
+        if error:
+            return jsonify({'error': error}), 400
+        
+        _record_camera_scan(results)
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'count': len(results),
+            **details
+        })
+    
+    except ExecutorSaturated as e:
+        return _decoder_busy_response(e)
+    
+    except DecodeTimeout as e:
+        return jsonify({'error': str(e)}), 504
+    
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@qr_bp.route('/scan/batch', methods=['POST'])
+def scan_qr_batch():
+    """Scan many images (files or zip/tar archives) and stream NDJSON results"""
+    try:
+        files = [
+            f for f in request.files.getlist('files') + request.files.getlist('file')
+            if f.filename
+        ]
+        if not files:
+            return jsonify({'error': 'No files provided'}), 400
+    
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    def generate():
+        # Validation errors found while reading the batch are reported
+        # alongside decode results; NDJSON lines are in completion order
+        rejected = []
+        records = []
+        summary = {'done': True, 'total': 0, 'succeeded': 0, 'failed': 0, 'codes': 0}
+        
+        def jobs():
+            for index, (name, data, error) in enumerate(FileHandler.iter_batch_images(files)):
+                summary['total'] += 1
+                if error:
+                    rejected.append(_batch_line(index, name, error=error))
+                else:
+                    yield (index, name), (data,)
+        
+        def drain_rejected():
+            while rejected:
+                summary['failed'] += 1
+                yield json.dumps(rejected.pop(0)) + '\n'
+        
+        try:
+            decoded = decode_executor.imap_unordered(QRProcessor.decode_qr_from_bytes, jobs())
+            for (index, name), outcome, exc in decoded:
+                yield from drain_rejected()
+                
+                results, error = outcome if outcome else (None, str(exc))
+                CODES_PER_IMAGE.labels('qr.scan_qr_batch').observe(len(results or []))
+                if error:
+                    summary['failed'] += 1
+                    yield json.dumps(_batch_line(index, name, error=error)) + '\n'
+                    continue
+                
+                summary['succeeded'] += 1
+                summary['codes'] += len(results)
+                for result in results:
+                    records.append(('scan', result['data'], {
+                        'method': 'batch_upload',
+                        'filename': name,
+                        'qr_info': QRProcessor.get_qr_info(result['data']),
+                        'position': result['position']
+                    }))
+                yield json.dumps(_batch_line(index, name, results=results)) + '\n'
+            
+            yield from drain_rejected()
+            
+            # Save the whole batch to history in one transaction
+            history_recorder.record_many(records)
+            summary['recorded'] = len(records)
+        
+        except Exception as e:
+            summary['error'] = f'Server error: {str(e)}'
+        
+        yield json.dumps(summary) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def _batch_line(index, filename, results=None, error=None):
+    """Build one NDJSON result line for a batch scan"""
+    if error:
+        return {'index': index, 'filename': filename, 'success': False, 'error': error}
+    return {
+        'index': index,
+        'filename': filename,
+        'success': True,
+        'results': results,
+        'count': len(results)
+    }
+
+def _record_camera_scan(results, session=None):
+    """Save camera scan results to history, once per payload per dedup window"""
+    session = session or _scan_session()
+    history_recorder.record_many(
+        ('scan', result['data'], {
+            'method': 'camera_capture',
+            'qr_info': QRProcessor.get_qr_info(result['data']),
+            'position': result['position']
+        })
+        for result in results
+        if recent_scans.should_record(session, result['data'])
+    )
+
+@qr_bp.route('/generate', methods=['GET', 'POST'])
 def generate_qr_code():
     """Generate QR code from text data"""
     try:
-        data = request.get_json()
+        if request.method == 'GET':
+            data = _generate_params_from_query(request.args)
+        else:
+            data = request.get_json()
         if not data or 'text' not in data:
             return jsonify({'error': 'No text data provided'}), 400
         
@@ -119,35 +389,175 @@ def generate_qr_code():
         border = data.get('border', 4)
         error_correction = data.get('errorCorrection', 'M')
         
-        # Generate QR code
-        result, error = QRProcessor.generate_qr_code(
-            text, size, border, error_correction
-        )
+        output_format = GENERATE_FORMATS.get(data.get('format', 'json'))
+        if output_format is None:
+            return jsonify({'error': 'Unsupported output format'}), 400
         
-        if error:
-            return jsonify({'error': error}), 400
+        # Identical parameters always produce identical output, so the
+        # cache key doubles as a strong ETag
+        etag = QRProcessor.cache_key(text, size, border, error_correction, output_format)
+        if request.if_none_match.contains(etag):
+            # A revalidation generates nothing, so it is not recorded
+            response = Response(status=304)
+        else:
+            # Generate QR code
+            result, error = QRProcessor.generate_qr_code(
+                text, size, border, error_correction, output_format
+            )
+            
+            if error:
+                return jsonify({'error': error}), 400
+            
+            _record_generation(text, size, border, error_correction)
+            
+            if output_format == 'data_uri':
+                response = jsonify({
+                    'success': True,
+                    'qr_code': result
+                })
+            else:
+                response = Response(result['image'], mimetype=OUTPUT_MIMETYPES[output_format])
         
-        # Save to history
-        qr_info = QRProcessor.get_qr_info(text)
-        qr_history.add_record(
-            'generate',
-            text,
-            {
-                'method': 'text_input',
-                'qr_info': qr_info,
-                'size': size,
-                'border': border,
-                'error_correction': error_correction
-            }
-        )
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@qr_bp.route('/generate/batch', methods=['POST'])
+def generate_qr_batch():
+    """Generate many QR codes and stream them back as a ZIP or PDF"""
+    try:
+        if 'file' in request.files:
+            # CSV/NDJSON upload; shared options come from form fields
+            options = request.form.to_dict()
+            defaults = dict(options)
+            if 'size' in defaults:
+                defaults['size'] = defaults['size'].lower().split('x')
+            items = iter_uploaded_items(request.files['file'])
+        else:
+            options = request.get_json()
+            if not options or not isinstance(options.get('items'), list):
+                return jsonify({'error': 'No items provided'}), 400
+            defaults = options.get('defaults') or {}
+            items = options['items']
         
-        return jsonify({
-            'success': True,
-            'qr_code': result
-        })
+        output = options.get('output', 'zip')
+        if output not in BATCH_OUTPUTS:
+            return jsonify({'error': 'Unsupported batch output'}), 400
+        
+        writer = make_writer(output, options)
     
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    def specs():
+        filenames = set()
+        for index, item in enumerate(items):
+            if index >= Config.GENERATE_BATCH_MAX_ITEMS:
+                yield {'index': index, 'error': f'Batch limit of {Config.GENERATE_BATCH_MAX_ITEMS} items reached'}
+                return
+            try:
+                yield normalize_item(item, defaults, index, filenames)
+            except (TypeError, ValueError) as e:
+                yield {'index': index, 'error': f'Invalid item: {str(e)}'}
+    
+    def chunks():
+        chunk = []
+        chunk_index = 0
+        for spec in specs():
+            chunk.append(spec)
+            if len(chunk) == Config.GENERATE_BATCH_CHUNK:
+                yield chunk_index, (chunk, output)
+                chunk, chunk_index = [], chunk_index + 1
+        if chunk:
+            yield chunk_index, (chunk, output)
+    
+    def generate():
+        records = []
+        errors = []
+        # Chunks finish out of order; hold them until their turn so the
+        # archive/PDF keeps input order. At most one pool window is held.
+        finished = {}
+        next_chunk = 0
+        
+        try:
+            for chunk_index, rendered, exc in decode_executor.imap_unordered(render_chunk, chunks()):
+                if exc:
+                    errors.append({'chunk': chunk_index, 'error': str(exc)})
+                finished[chunk_index] = rendered or []
+                
+                while next_chunk in finished:
+                    for spec, payload, error in finished.pop(next_chunk):
+                        if error:
+                            errors.append({'index': spec['index'], 'error': error})
+                            continue
+                        yield writer.add(spec, payload)
+                        records.append((spec['text'], spec['size'], spec['border'], spec['error_correction']))
+                    next_chunk += 1
+            
+            yield writer.add_errors(errors)
+            yield writer.close()
+        
+        except Exception:
+            # Re-raised so the server drops the connection: the client sees a
+            # broken transfer rather than a valid-looking, truncated archive
+            current_app.logger.exception('Generate batch stream failed')
+            raise
+        
+        finally:
+            # Save the items written so far to history as one unit
+            if records:
+                history_recorder.record_many(
+                    ('generate', text, {
+                        'method': 'batch_input',
+                        'qr_info': QRProcessor.get_qr_info(text),
+                        'size': size,
+                        'border': border,
+                        'error_correction': error_correction
+                    })
+                    for text, size, border, error_correction in records
+                )
+    
+    response = Response(stream_with_context(generate()), mimetype=BATCH_OUTPUTS[output])
+    response.headers['Content-Disposition'] = f'attachment; filename=qr-codes.{output}'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def _generate_params_from_query(args):
+    """Read /generate parameters from a GET query string"""
+    if 'text' not in args:
+        return None
+    
+    params = {'text': args['text']}
+    if 'size' in args:
+        try:
+            params['size'] = [int(v) for v in args['size'].split(',')]
+        except ValueError:
+            pass
+    if 'border' in args:
+        params['border'] = args.get('border', type=int)
+    if 'errorCorrection' in args:
+        params['errorCorrection'] = args['errorCorrection']
+    if 'format' in args:
+        params['format'] = args['format']
+    return params
+
+def _record_generation(text, size, border, error_correction):
+    """Save a generated QR code to history"""
+    qr_info = QRProcessor.get_qr_info(text)
+    history_recorder.record(
+        'generate',
+        text,
+        {
+            'method': 'text_input',
+            'qr_info': qr_info,
+            'size': size,
+            'border': border,
+            'error_correction': error_correction
+        }
+    )
 
 @qr_bp.route('/info', methods=['POST'])
 def get_qr_info():
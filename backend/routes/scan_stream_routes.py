@@ -0,0 +1,109 @@
+import json
+import threading
+from flask import Blueprint, g, jsonify, request
+from flask_sock import Sock
+from config import Config
+from utils.qr_processor import QRProcessor
+from utils.decode_executor import decode_executor, ExecutorSaturated, DecodeTimeout
+from utils.scan_cache import decode_result_cache
+from utils.scan_session import ScanSession, STATS_GROUP
+from utils.stats import stats
+from utils.metrics import CODES_PER_IMAGE
+from routes.qr_routes import _record_camera_scan, _scan_session
+
+sock = Sock()
+scan_stream_bp = Blueprint('scan_stream', __name__)
+
+# Each open stream holds a worker thread; leave the rest for /health,
+# /ready and HTTP scans
+stream_slots = threading.BoundedSemaphore(max(Config.SCAN_STREAM_MAX_SESSIONS, 1))
+
+@scan_stream_bp.before_request
+def acquire_stream_slot():
+    """Refuse the handshake quickly once this worker's streams are taken"""
+    if request.endpoint != 'scan_stream.scan_stream':
+        return None
+    if Config.SCAN_STREAM_MAX_SESSIONS <= 0 or not stream_slots.acquire(blocking=False):
+        stats.incr(STATS_GROUP, 'rejected')
+        response = jsonify({'error': 'Too many open scan streams; use /api/scan/raw'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(int(Config.SCAN_STREAM_IDLE_TIMEOUT))
+        return response
+    g.stream_slot = True
+    return None
+
+@scan_stream_bp.teardown_request
+def release_stream_slot(exc=None):
+    if g.pop('stream_slot', False):
+        stream_slots.release()
+
+@sock.route('/scan/stream', bp=scan_stream_bp)
+def scan_stream(ws):
+    """Continuous camera scanning over one WebSocket connection.
+
+    The client sends each frame as a binary message (JPEG/PNG/WebP) and
+    gets one JSON reply per frame, including next_interval_ms. Browsers
+    cannot set headers on a WebSocket, so the scan session comes from the
+    'session' query argument.
+    """
+    session = ScanSession.from_config(request.args.get('session') or _scan_session())
+    
+    while True:
+        frame = ws.receive(timeout=Config.SCAN_STREAM_IDLE_TIMEOUT)
+        if frame is None:
+            break
+        
+        if isinstance(frame, str):
+            # Text messages are keep-alives
+            ws.send(json.dumps({'type': 'pong'}))
+            continue
+        
+        ws.send(json.dumps(_scan_frame(session, frame)))
+
+async def scan_stream_async(ws, run):
+    """scan_stream for the ASGI entry point (utils.asgi).
+
+    Same protocol, but an open connection is a coroutine rather than a
+    worker thread; each frame is decoded on the thread pool via run().
+    """
+    session = ScanSession.from_config(
+        ws.args.get('session') or ws.headers.get('x-scan-session')
+        or f"{ws.remote_addr}|{ws.headers.get('user-agent', '')}"
+    )
+    
+    while True:
+        frame = await ws.receive(timeout=Config.SCAN_STREAM_IDLE_TIMEOUT)
+        if frame is None:
+            break
+        
+        if isinstance(frame, str):
+            # Text messages are keep-alives
+            await ws.send(json.dumps({'type': 'pong'}))
+            continue
+        
+        await ws.send(json.dumps(await run(_scan_frame, session, frame)))
+
+def _scan_frame(session, frame):
+    """Decode one streamed frame and record any new codes"""
+    try:
+        if len(frame) > Config.MAX_CONTENT_LENGTH:
+            return {'error': 'File too large', 'next_interval_ms': session.interval}
+        
+        phash = decode_result_cache.perceptual_hash(frame)
+        reply = session.process(frame, phash, _decode_frame)
+        if not reply['skipped']:
+            CODES_PER_IMAGE.labels('scan_stream.scan_stream').observe(reply['count'])
+            _record_camera_scan(reply['results'], session.session_id)
+        return reply
+    
+    except ExecutorSaturated as e:
+        return {'error': str(e), 'next_interval_ms': e.retry_after * 1000}
+    
+    except DecodeTimeout as e:
+        return {'error': str(e), 'next_interval_ms': session.max_interval}
+    
+    except Exception as e:
+        return {'error': f'Server error: {str(e)}', 'next_interval_ms': session.max_interval}
+
+def _decode_frame(frame, region):
+    return decode_executor.run(QRProcessor.decode_qr_in_region, frame, region)
@@ -0,0 +1,16 @@
+from flask import Blueprint, jsonify
+from utils.stats import stats
+
+stats_bp = Blueprint('stats', __name__)
+
+@stats_bp.route('/stats', methods=['GET'])
+def get_stats():
+    """Get runtime counters for this worker process"""
+    try:
+        return jsonify({
+            'success': True,
+            'stats': stats.snapshot()
+        })
+    
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
@@ -1,4 +1,5 @@
 import pytest
+import sqlite3
 import sys
 import os
 from unittest.mock import MagicMock, patch
@@ -12,6 +13,22 @@ sys.modules['pyzbar.pyzbar'].decode = MagicMock(return_value=[MagicMock(data=b't
 sys.modules['cv2'] = MagicMock()
 sys.modules['numpy'] = MagicMock()
 
+# Decode inline in tests; mocked callables cannot be sent to a process pool.
+os.environ.setdefault('DECODE_WORKERS', '0')
+# Keep the generated-image cache in memory only.
+os.environ.setdefault('QR_CACHE_DIR', '')
+# Write history on the request thread so the mocked connection sees it.
+os.environ.setdefault('HISTORY_WRITE_MODE', 'sync')
+# No background pruning against the mocked database.
+os.environ.setdefault('HISTORY_PRUNE_INTERVAL', '0')
+# Clearing history archives rows; tests opt in with their own directory.
+os.environ.setdefault('HISTORY_ARCHIVE_DIR', '')
+# Tests reuse image bytes with different mocked decoders; decode every time.
+os.environ.setdefault('DECODE_CACHE_TTL', '0')
+
+# Captured at import, before setup_test_environment mocks sqlite3.connect
+REAL_CONNECT = sqlite3.connect
+
 @pytest.fixture(scope='session', autouse=True)
 def setup_test_environment():
     """
@@ -26,13 +43,18 @@ def setup_test_environment():
     with patch('sqlite3.connect') as mock_db:
         mock_conn = MagicMock()
         mock_db.return_value = mock_conn
-        mock_conn.execute.return_value = None
+        # Queries see an empty database (PRAGMA user_version, MAX(id) -> 0)
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = (0,)
+        mock_cursor.fetchall.return_value = []
+        mock_conn.execute.return_value = mock_cursor
         mock_conn.commit.return_value = None
         
         # --- Context-Specific Mocks ---
         # Mock the specific modules as they are used within the 'utils.qr_processor' file.
-        with patch('utils.qr_processor.pyzbar', MagicMock()), \
-             patch('utils.qr_processor.cv2', MagicMock()), \
+        with patch('utils.decoders.pyzbar', MagicMock()), \
+             patch('utils.decoders.cv2', MagicMock()), \
+             patch('utils.decode_pipeline.cv2', MagicMock()), \
              patch('utils.qr_processor.np', MagicMock()): # FIXED: Patched 'np' instead of 'numpy'
             
             # Import the app *after* all the mocks are in place.
@@ -42,6 +64,15 @@ def setup_test_environment():
             app.config['WTF_CSRF_ENABLED'] = False
             yield app
 
+@pytest.fixture
+def real_db(setup_test_environment):
+    """
+    Restores the real sqlite3.connect for tests that use an actual database file.
+    Yields the real connect function for opening one directly.
+    """
+    with patch('sqlite3.connect', REAL_CONNECT):
+        yield REAL_CONNECT
+
 @pytest.fixture
 def client(setup_test_environment):
     """
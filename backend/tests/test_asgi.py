@@ -0,0 +1,107 @@
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+from utils.asgi import BUFFERED_RESPONSE_BYTES, AsgiApp
+
+def http_scope(method, path, query=b'', headers=()):
+    return {'type': 'http', 'method': method, 'path': path, 'query_string': query, 'root_path': '',
+            'headers': list(headers), 'http_version': '1.1', 'scheme': 'http',
+            'client': ('10.0.0.1', 5555), 'server': ('testserver', 80)}
+
+def call(asgi_app, scope, messages):
+    """Run one ASGI connection; returns everything the app sent"""
+    sent = []
+    
+    async def receive():
+        return messages.pop(0)
+    
+    async def send(message):
+        sent.append(message)
+    
+    asyncio.run(asgi_app(scope, receive, send))
+    return sent
+
+def response(sent):
+    body = b''.join(message.get('body', b'') for message in sent if message['type'] == 'http.response.body')
+    return sent[0]['status'], dict(sent[0]['headers']), body
+
+def test_http_requests_reach_flask_with_the_streamed_body(setup_test_environment):
+    """Test chunked bodies, query strings and headers reach the Flask views unchanged"""
+    asgi_app = AsgiApp(setup_test_environment, threads=2)
+    result = [{'data': 'frame', 'type': 'QRCODE', 'position': {'x': 0, 'y': 0, 'width': 10, 'height': 10}}]
+    
+    with patch('routes.qr_routes.QRProcessor') as mock_processor, \
+         patch('routes.qr_routes.history_recorder'):
+        mock_processor.decode_qr_from_bytes.return_value = (result, None)
+        sent = call(asgi_app, http_scope('POST', '/api/scan/raw', b'cache=0', [(b'content-type', b'image/jpeg')]),
+                    [{'type': 'http.request', 'body': b'fra', 'more_body': True},
+                     {'type': 'http.request', 'body': b'me'}])
+    
+    status, headers, body = response(sent)
+    assert status == 200 and headers[b'content-type'] == b'application/json'
+    assert json.loads(body) == {'success': True, 'results': result, 'count': 1}
+    assert bytes(mock_processor.decode_qr_from_bytes.call_args.args[0]) == b'frame'
+    
+    status, _, body = response(call(asgi_app, http_scope('GET', '/health'), [{'type': 'http.request', 'body': b''}]))
+    assert status == 200 and json.loads(body)['status'] == 'healthy'
+    
+    # Rejected from the declared length, before any body is received
+    small = AsgiApp(setup_test_environment, max_body=4)
+    sent = call(small, http_scope('POST', '/api/scan/raw', headers=[(b'content-length', b'5')]), [])
+    assert response(sent)[0] == 413 and json.loads(response(sent)[2]) == {'error': 'File too large'}
+
+def test_body_limit_follows_the_endpoint(setup_test_environment):
+    """Test batch endpoints get the batch limit and every other path the upload limit"""
+    from app import create_asgi_app
+    asgi_app = create_asgi_app(setup_test_environment)
+    
+    with patch('app.Config.MAX_CONTENT_LENGTH', 4), patch('app.Config.BATCH_MAX_CONTENT_LENGTH', 8):
+        # Declared too large for a single scan, before any body is received
+        sent = call(asgi_app, http_scope('POST', '/api/scan/raw', headers=[(b'content-length', b'6')]), [])
+        assert response(sent)[0] == 413
+        
+        # No Content-Length: stopped once the received body passes the limit
+        sent = call(asgi_app, http_scope('POST', '/api/scan/raw'),
+                    [{'type': 'http.request', 'body': b'abc', 'more_body': True},
+                     {'type': 'http.request', 'body': b'def', 'more_body': True}])
+        assert response(sent)[0] == 413
+        
+        sent = call(asgi_app, http_scope('POST', '/api/history/import', headers=[(b'content-length', b'9')]), [])
+        assert response(sent)[0] == 413
+        
+        with patch.object(asgi_app, '_call_wsgi', return_value=None) as mock_call:
+            call(asgi_app, http_scope('POST', '/api/history/import', headers=[(b'content-length', b'6')]),
+                 [{'type': 'http.request', 'body': b'abcdef'}])
+        assert mock_call.call_args.args[0]['CONTENT_LENGTH'] == '6'
+
+def test_large_responses_stream_and_lifespan_and_websockets():
+    """Test streamed WSGI bodies, lifespan startup and WebSocket routing"""
+    chunk = b'x' * (BUFFERED_RESPONSE_BYTES // 2)
+    
+    def wsgi_app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return iter([chunk] * 4)
+    
+    on_startup = MagicMock()
+    
+    async def echo(ws, run):
+        message = await ws.receive(timeout=1)
+        await ws.send(await run(str.upper, message))
+    
+    asgi_app = AsgiApp(wsgi_app, websockets={'/echo': echo}, on_startup=on_startup)
+    
+    sent = call(asgi_app, http_scope('GET', '/'), [{'type': 'http.request', 'body': b''}])
+    assert response(sent)[2] == chunk * 4
+    assert sum(message.get('more_body', False) for message in sent) == 4
+    
+    sent = call(asgi_app, {'type': 'lifespan'}, [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+    assert [message['type'] for message in sent] == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+    on_startup.assert_called_once()
+    
+    scope = {'type': 'websocket', 'path': '/echo', 'query_string': b'session=a', 'headers': [], 'client': None}
+    sent = call(asgi_app, scope, [{'type': 'websocket.connect'}, {'type': 'websocket.receive', 'text': 'ping'}])
+    assert sent == [{'type': 'websocket.accept'}, {'type': 'websocket.send', 'text': 'PING'},
+                    {'type': 'websocket.close', 'code': 1000}]
+    
+    sent = call(asgi_app, dict(scope, path='/other'), [{'type': 'websocket.connect'}])
+    assert sent == [{'type': 'websocket.close', 'code': 1008}]
@@ -0,0 +1,54 @@
+import csv
+from benchmarks import harness
+
+def timing(median):
+    return harness.summarize([median])
+
+def test_compare_flags_slowdowns_lost_decodes_and_changed_sets():
+    """Test baseline comparison statuses, the noise floor and the ratio"""
+    baseline = [
+        dict(name='decode/blur-2.0', group='decode', decoded=1, **timing(10.0)),
+        dict(name='decode/noise-40', group='decode', decoded=1, **timing(40.0)),
+        dict(name='history/count@10000', group='history', **timing(0.01)),
+        dict(name='info/url', group='info', **timing(2.0)),
+        dict(name='info/text', group='info', **timing(2.0))
+    ]
+    results = [
+        dict(name='decode/blur-2.0', group='decode', decoded=1, **timing(14.0)),
+        dict(name='decode/noise-40', group='decode', decoded=0, **timing(30.0)),
+        dict(name='history/count@10000', group='history', **timing(0.03)),
+        dict(name='info/url', group='info', **timing(1.0)),
+        dict(name='info/email', group='info', **timing(1.0))
+    ]
+
+    rows = {row['name']: row for row in harness.compare(results, baseline, threshold=0.25)}
+
+    assert rows['decode/blur-2.0']['status'] == 'regression'
+    assert rows['decode/blur-2.0']['ratio'] == 1.4
+    # Faster, but one expected code was lost
+    assert rows['decode/noise-40']['status'] == 'regression'
+    # 3x slower, but only 20 microseconds
+    assert rows['history/count@10000']['status'] == 'ok'
+    assert rows['info/url']['status'] == 'improved'
+    assert rows['info/email']['status'] == 'new'
+    assert rows['info/text']['status'] == 'missing'
+
+def test_results_round_trip_through_json_and_csv(tmp_path):
+    """Test result files keep every field and summarize reports nearest-rank p95"""
+    summary = harness.summarize([float(n) for n in range(1, 21)])
+    assert summary['median_ms'] == 10.5 and summary['p95_ms'] == 19.0
+
+    results = [
+        dict(name='decode/multi-4', group='decode', params={'multi': 4}, decoded=4, **summary),
+        dict(name='history/get_page@10000', group='history', rows=10000, **summary)
+    ]
+    harness.write_json(tmp_path / 'results.json', results, {'seed': 1234})
+    harness.write_csv(tmp_path / 'results.csv', results)
+
+    meta, loaded = harness.load_results(tmp_path / 'results.json')
+    assert meta == {'seed': 1234} and loaded == results
+
+    with open(tmp_path / 'results.csv') as handle:
+        rows = list(csv.DictReader(handle))
+    assert rows[0]['params'] == '{"multi": 4}' and rows[0]['rows'] == ''
+    assert rows[1]['rows'] == '10000' and rows[1]['median_ms'] == '10.5'
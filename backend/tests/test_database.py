@@ -0,0 +1,171 @@
+import pytest
+import sqlite3
+import threading
+from models.qr_history import QRHistory
+
+def test_connections_are_tuned_and_per_thread(real_db, tmp_path):
+    """Test each thread reuses its own WAL-mode connection"""
+    history = QRHistory(str(tmp_path / 'history.db'))
+    conn = history.db.connection()
+    
+    assert history.db.connection() is conn
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn.execute('PRAGMA temp_store').fetchone()[0] == 2
+    
+    other = []
+    thread = threading.Thread(target=lambda: other.append(history.db.connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+    
+    history.db.close_all()
+
+def test_concurrent_writers_share_one_instance(real_db, tmp_path):
+    """Test writes from many threads all land without lock errors"""
+    history = QRHistory(str(tmp_path / 'history.db'))
+    errors = []
+    
+    def writer(index):
+        try:
+            for i in range(25):
+                history.add_record('scan', f'{index}-{i}', {'method': 'camera_capture'})
+        except sqlite3.Error as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert errors == []
+    assert len(history.get_history(500)) == 200
+    assert history.get_history(1)[0]['data'] == {'method': 'camera_capture'}
+    assert history.delete_record(1) is True
+    assert history.clear_history() == 199
+    
+    history.db.close_all()
+
+def test_keyset_pages_and_filters(real_db, tmp_path):
+    """Test cursor pages cover every row once and filters use the new columns"""
+    history = QRHistory(str(tmp_path / 'history.db'))
+    history.add_records(
+        ('scan' if i % 2 else 'generate', f'item-{i}', {
+            'method': 'camera_capture' if i % 2 else 'text_input',
+            'qr_info': {'type': 'url' if i % 3 == 0 else 'text'}
+        })
+        for i in range(25)
+    )
+    
+    # All rows share a timestamp, so the id tie-break decides order
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = history.get_page(10, cursor=cursor)
+        seen.extend(item['id'] for item in page)
+        if cursor is None:
+            break
+    assert seen == list(range(25, 0, -1))
+    
+    scans, _ = history.get_page(50, record_type='scan', content_type='url')
+    assert {item['content'] for item in scans} == {'item-3', 'item-9', 'item-15', 'item-21'}
+    
+    future, _ = history.get_page(50, since='2999-01-01T00:00:00Z')
+    assert future == []
+    
+    history.db.close_all()
+
+def test_migrates_legacy_database(real_db, tmp_path):
+    """Test an existing v0 database gains backfilled filter columns"""
+    path = str(tmp_path / 'legacy.db')
+    conn = real_db(path)
+    conn.execute('''
+        CREATE TABLE qr_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            content TEXT NOT NULL,
+            data TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute(
+        "INSERT INTO qr_history (type, content, data) VALUES ('scan', 'x', ?)",
+        ('{"method": "file_upload", "qr_info": {"type": "email"}}',)
+    )
+    conn.commit()
+    conn.close()
+    
+    history = QRHistory(path)
+    page, _ = history.get_page(10, method='file_upload', content_type='email')
+    assert [item['content'] for item in page] == ['x']
+    assert history.db.connection().execute('PRAGMA user_version').fetchone()[0] >= 2
+    assert history.get_stats()['content_types'] == {'email': 1}
+    
+    with pytest.raises(ValueError):
+        history.get_page(10, cursor='not-a-cursor')
+    
+    history.db.close_all()
+
+def test_stats_summary_tracks_inserts_and_deletes(real_db, tmp_path):
+    """Test summary counters stay exact through inserts, deletes and clears"""
+    history = QRHistory(str(tmp_path / 'history.db'))
+    history.add_records([
+        ('scan', 'a', {'method': 'camera_capture', 'qr_info': {'type': 'url'}}),
+        ('scan', 'b', {'method': 'file_upload', 'qr_info': {'type': 'url'}}),
+        ('generate', 'c', {'method': 'text_input', 'qr_info': {'type': 'text'}}),
+        ('generate', 'd', None)
+    ])
+    history.delete_record(1)
+    
+    stats = history.get_stats()
+    assert stats['total_records'] == 3
+    assert stats['scans'] == 1
+    assert stats['generations'] == 2
+    assert stats['methods'] == {'file_upload': 1, 'text_input': 1}
+    assert stats['content_types'] == {'url': 1, 'text': 1}
+    assert sum(stats['days'].values()) == 3
+    
+    history.clear_history()
+    assert history.get_stats()['total_records'] == 0
+    assert history.get_stats()['days'] == {}
+    
+    history.db.close_all()
+
+def test_search_prefix_rank_and_pages(real_db, tmp_path):
+    """Test FTS search stays in sync and pages through ranked matches"""
+    history = QRHistory(str(tmp_path / 'history.db'))
+    history.add_records([
+        ('scan', 'TRACK 1Z999AA10123456784', None),
+        ('scan', 'https://shop.example.com/<b>order</b>', None),
+        ('generate', 'https://example.com', None),
+        ('scan', 'unrelated text', None)
+    ])
+    
+    results, cursor = history.search('1z999')
+    assert [item['content'] for item in results] == ['TRACK 1Z999AA10123456784']
+    assert cursor is None
+    
+    # Snippets escape stored content and mark the match
+    results, _ = history.search('order')
+    assert '<mark>order</mark>' in results[0]['snippet']
+    assert '&lt;b&gt;' in results[0]['snippet']
+    
+    for sort in ('rank', 'recent'):
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = history.search('exam', limit=1, cursor=cursor, sort=sort)
+            seen.extend(item['id'] for item in page)
+            if cursor is None:
+                break
+        assert sorted(seen) == [2, 3]
+    
+    history.delete_record(3)
+    assert [item['id'] for item in history.search('example')[0]] == [2]
+    history.clear_history()
+    assert history.search('example')[0] == []
+    
+    with pytest.raises(ValueError):
+        history.search('  ...  ')
+    
+    history.db.close_all()
@@ -0,0 +1,35 @@
+import pytest
+from unittest.mock import patch
+
+def test_executor_rejects_when_queue_full(setup_test_environment):
+    """Test jobs beyond capacity are shed instead of queued"""
+    from prometheus_client import REGISTRY
+    from utils.decode_executor import DecodeExecutor, ExecutorSaturated
+    
+    executor = DecodeExecutor(max_workers=0, queue_size=0, timeout=1, retry_after=3)
+    executor.start()
+    assert REGISTRY.get_sample_value('qr_decode_capacity') == 1
+    in_flight = REGISTRY.get_sample_value('qr_decode_in_flight')
+    
+    def nested_job():
+        # The outer job holds the only slot
+        assert REGISTRY.get_sample_value('qr_decode_in_flight') == in_flight + 1
+        return executor.run(lambda: 'inner')
+    
+    with pytest.raises(ExecutorSaturated) as excinfo:
+        executor.run(nested_job)
+    
+    assert excinfo.value.retry_after == 3
+    assert executor.run(lambda: 'ok') == 'ok'
+    assert executor.gauges()['in_flight'] == 0
+    assert REGISTRY.get_sample_value('qr_decode_in_flight') == in_flight
+
+def test_scan_returns_503_with_retry_after_when_saturated(client):
+    """Test scan routes answer fast with Retry-After when the decoder is busy"""
+    from utils.decode_executor import ExecutorSaturated
+    
+    with patch('routes.qr_routes.decode_executor.run', side_effect=ExecutorSaturated(2)):
+        response = client.post('/api/scan/data', json={'image': 'data:image/png;base64,YWJj'})
+    
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '2'
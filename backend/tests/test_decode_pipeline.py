@@ -0,0 +1,55 @@
+import struct
+import pytest
+from unittest.mock import MagicMock, patch
+
+def png_header(width, height):
+    return b'\x89PNG\r\n\x1a\n' + b'\x00\x00\x00\rIHDR' + struct.pack('>II', width, height)
+
+def jpeg_header(width, height):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    sof0 = b'\xff\xc0' + struct.pack('>HBHH', 11, 8, height, width) + b'\x01\x11\x00'
+    return b'\xff\xd8' + app0 + sof0
+
+def test_read_image_size_from_headers(setup_test_environment):
+    """Test image dimensions are read without decoding the image"""
+    from utils.decode_pipeline import read_image_size
+    
+    assert tuple(read_image_size(png_header(4000, 3000))) == (4000, 3000)
+    assert tuple(read_image_size(jpeg_header(4032, 3024))) == (4032, 3024)
+    assert read_image_size(b'not an image') is None
+
+@pytest.mark.parametrize('size, factor', [
+    (None, 1),
+    ((640, 480), 1),
+    ((4032, 3024), 2),
+    ((12000, 9000), 8),
+])
+def test_reduction_factor(setup_test_environment, size, factor):
+    """Test reduced-resolution decode is only used for large images"""
+    from utils.decode_pipeline import DecodePipeline
+    
+    assert DecodePipeline._reduction_factor(size) == factor
+
+def test_reduced_stage_positions_on_exif_rotated_photo(setup_test_environment):
+    """Test reduced-stage positions scale by the factor when EXIF rotates the image"""
+    from utils.decode_pipeline import DecodePipeline
+    
+    # 4032x3024 header, EXIF orientation 6: imdecode returns a 1512x2016 image at 1/2
+    rotated = MagicMock(shape=(2016, 1512))
+    found = [{'data': 'photo', 'type': 'QRCODE', 'rect': (1162, 1540, 210, 210)}]
+    with patch('utils.decode_pipeline.cv2') as mock_cv2, \
+         patch('utils.decode_pipeline.decoder_chain') as mock_chain:
+        mock_cv2.imdecode.return_value = rotated
+        mock_chain.decode.return_value = found
+        results, error = DecodePipeline.decode(jpeg_header(4032, 3024))
+    
+    assert error is None
+    assert results[0]['position'] == {'x': 2324, 'y': 3080, 'width': 420, 'height': 420}
+
+def test_stats_endpoint_reports_pipeline_stages(client):
+    """Test per-stage pipeline counters are exposed"""
+    response = client.get('/api/stats')
+    assert response.status_code == 200
+    
+    groups = response.get_json()['stats']['groups']
+    assert 'grayscale_hit_rate' in groups['decode_pipeline']
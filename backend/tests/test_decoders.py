@@ -0,0 +1,77 @@
+import threading
+from unittest.mock import patch
+import pytest
+from utils.decoders import BACKENDS, DecoderChain, dedupe
+from utils.stats import StatsRegistry, stats
+
+def fake_backend(name, results, stages=None, delay=None):
+    """A backend class returning fixed results, optionally after an event"""
+    def decode(image):
+        if delay is not None:
+            delay.wait(1)
+        return list(results)
+    
+    return type(name, (), {
+        'name': name,
+        'stages': stages,
+        'available': staticmethod(lambda: True),
+        'decode': staticmethod(decode)
+    })
+
+CODE = {'data': 'code', 'type': 'QRCODE', 'rect': (10, 10, 100, 100)}
+
+def test_chain_falls_back_in_order_and_records_per_backend_timing():
+    """Test the first backend with results wins and every call is timed"""
+    stats.reset('decoder_backends')
+    backends = {
+        'first': fake_backend('first', []),
+        'second': fake_backend('second', [CODE, dict(CODE, rect=(14, 12, 98, 99))]),
+        'third': fake_backend('third', [dict(CODE, data='never')])
+    }
+    with patch.dict(BACKENDS, backends):
+        chain = DecoderChain(['first', 'second', 'third'])
+        assert chain.decode('image') == [CODE]
+        # A backend limited to other stages is not tried
+        backends['second'].stages = {'grayscale'}
+        assert chain.decode('image', 'threshold')[0]['data'] == 'never'
+    
+    assert stats.get('decoder_backends', 'first_attempts') == 2
+    assert stats.get('decoder_backends', 'second_hits') == 1
+    assert stats.get('decoder_backends', 'first_ms_count') == 2
+    assert stats.get('decoder_backends', 'first_ms_le_2500') == 2
+    
+    with pytest.raises(ValueError):
+        DecoderChain(['missing'])
+
+def test_race_returns_first_backend_with_results():
+    """Test race mode does not wait for a slow backend"""
+    release = threading.Event()
+    backends = {
+        'slow': fake_backend('slow', [dict(CODE, data='slow')], delay=release),
+        'fast': fake_backend('fast', [CODE])
+    }
+    with patch.dict(BACKENDS, backends):
+        chain = DecoderChain(['slow', 'fast'], mode='race')
+        assert chain.decode('image') == [CODE]
+        
+        # One race per decode thread (tiles, frames) without queueing
+        with patch('utils.decode_executor.decode_thread_count', return_value=3):
+            assert DecoderChain(['slow', 'fast'], mode='race')._get_pool()._max_workers == 6
+    release.set()
+
+def test_dedupe_keeps_same_payload_at_another_position():
+    """Test duplicates are matched by payload and overlapping position"""
+    copy = dict(CODE, rect=(500, 10, 100, 100))
+    assert dedupe([CODE, dict(CODE, rect=(12, 8, 100, 100)), copy]) == [CODE, copy]
+
+def test_pool_counters_merge_into_parent_registry():
+    """Test counters drained in a pool process add up in the web worker"""
+    child, parent = StatsRegistry(), StatsRegistry()
+    child.observe('g', 'lat', 3)
+    parent.observe('g', 'lat', 30)
+    parent.merge(child.drain())
+    
+    assert parent.get('g', 'lat_count') == 2
+    assert parent.get('g', 'lat_le_5') == 1
+    assert parent.get('g', 'lat_le_50') == 2
+    assert child.get('g', 'lat_count') == 0
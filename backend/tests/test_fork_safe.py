@@ -0,0 +1,20 @@
+from unittest.mock import MagicMock, patch
+from utils.fork_safe import per_process
+
+def test_per_process_creates_one_object_per_pid():
+    """Test the factory runs once per process and again after reset()"""
+    factory = MagicMock(side_effect=lambda: object())
+    pool = per_process(factory)
+    assert pool.peek() is None
+    
+    first = pool.get()
+    assert pool.get() is first and pool.peek() is first
+    
+    # A forked child sees its parent's object but not its threads
+    with patch('utils.fork_safe.os.getpid', return_value=-1):
+        assert pool.peek() is None
+        assert pool.get() is not first
+    
+    pool.reset()
+    assert pool.peek() is None
+    assert factory.call_count == 2
@@ -0,0 +1,44 @@
+from unittest.mock import patch
+from utils.frame_decode import FrameDecoder, frame_limits, is_multiframe
+
+def code(data, x=10):
+    return {'data': data, 'type': 'QRCODE', 'position': {'x': x, 'y': 10, 'width': 50, 'height': 50}}
+
+def test_multiframe_containers_are_detected_from_the_header():
+    """Test GIF, TIFF and animated WebP take the frame-by-frame path"""
+    animated_webp = b'RIFF\x00\x00\x00\x00WEBPVP8X\x0a\x00\x00\x00\x02'
+    assert is_multiframe(b'GIF89a' + b'\x00' * 16)
+    assert is_multiframe(b'II*\x00' + b'\x00' * 16)
+    assert is_multiframe(animated_webp)
+    assert not is_multiframe(animated_webp[:-1] + b'\x00')
+    assert not is_multiframe(b'\x89PNG\r\n\x1a\n' + b'\x00' * 16)
+
+def test_frame_limits_only_lower_config_caps():
+    """Test per-request frame limits cannot exceed the configured caps"""
+    max_frames, max_pixels, max_codes = frame_limits(10 ** 6, 5, None)
+    assert max_frames < 10 ** 6
+    assert max_pixels == 5
+    assert max_codes == 0
+
+def test_frames_are_annotated_deduplicated_and_stop_early():
+    """Test results carry frame indices and decoding stops at max_codes"""
+    decoded = {0: [], 1: [code('a')], 2: [code('a')], 3: [code('b', x=200)], 4: [code('c', x=400)]}
+    seen = []
+    
+    def fake_frames(buffer, max_frames, max_pixels):
+        for index in range(max_frames):
+            seen.append(index)
+            yield index, index
+    
+    with patch('utils.frame_decode.iter_frames', side_effect=fake_frames), \
+         patch('utils.frame_decode.decode_thread_count', return_value=1), \
+         patch('utils.frame_decode.DecodePipeline.decode_frame', side_effect=lambda frame: decoded.get(frame, [])):
+        results, error = FrameDecoder.decode(b'gif', (5, 10 ** 9, 0))
+        assert error is None
+        assert [(r['data'], r['frame']) for r in results] == [('a', 1), ('b', 3), ('c', 4)]
+        
+        seen.clear()
+        results, error = FrameDecoder.decode(b'gif', (100, 10 ** 9, 2))
+        assert [(r['data'], r['frame']) for r in results] == [('a', 1), ('b', 3)]
+        # Only the frames in flight when the second code turned up were read
+        assert len(seen) <= 6
@@ -0,0 +1,62 @@
+import csv
+import gzip
+import io
+import json
+from unittest.mock import patch
+from models.qr_history import QRHistory
+
+def test_export_streams_filtered_ndjson_and_csv(real_db, client, tmp_path):
+    """Test export pages through every matching row in order"""
+    history = QRHistory(str(tmp_path / 'history.db'))
+    history.add_records(
+        ('scan' if i % 2 else 'generate', f'item-{i}', {'method': 'file_upload', 'qr_info': {'type': 'text'}})
+        for i in range(25)
+    )
+    
+    with patch('routes.history_routes.qr_history', history), \
+         patch('config.Config.HISTORY_EXPORT_CHUNK', 4):
+        response = client.get('/api/history/export?type=scan')
+        assert response.mimetype == 'application/x-ndjson'
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [row['content'] for row in rows] == [f'item-{i}' for i in range(1, 25, 2)]
+        assert rows[0]['data']['method'] == 'file_upload'
+        
+        response = client.get('/api/history/export?format=csv&gzip=true')
+        assert response.mimetype == 'application/gzip'
+        text = gzip.decompress(response.get_data()).decode()
+        rows = list(csv.DictReader(io.StringIO(text)))
+        assert len(rows) == 25
+        assert rows[0]['method'] == 'file_upload'
+        
+        assert client.get('/api/history/export?format=xml').status_code == 400
+    
+    history.db.close_all()
+
+def test_import_gzipped_ndjson_in_batches(real_db, client, tmp_path):
+    """Test import keeps timestamps, batches inserts and reports bad rows"""
+    lines = [
+        json.dumps({'type': 'scan', 'content': f'row-{i}', 'data': {'method': 'camera_capture'},
+                    'timestamp': '2024-03-01T10:00:00Z'})
+        for i in range(12)
+    ]
+    lines.insert(5, '{"type": "other", "content": "x"}')
+    lines.insert(8, 'not json')
+    body = gzip.compress(('\n'.join(lines) + '\n').encode())
+    
+    history = QRHistory(str(tmp_path / 'history.db'))
+    
+    with patch('routes.history_routes.qr_history', history), \
+         patch('config.Config.HISTORY_IMPORT_BATCH', 5):
+        response = client.post('/api/history/import', data=body,
+                               content_type='application/x-ndjson')
+    
+    result = response.get_json()
+    assert result['imported'] == 12
+    assert result['skipped'] == 2
+    assert [error['line'] for error in result['errors']] == [6, 9]
+    
+    stats = history.get_stats()
+    assert stats['methods'] == {'camera_capture': 12}
+    assert stats['days'] == {'2024-03-01': 12}
+    
+    history.db.close_all()
@@ -0,0 +1,70 @@
+import pytest
+import threading
+import time
+from models.history_recorder import HistoryRecorder
+
+class FakeHistory:
+    """Collects add_records calls instead of writing to SQLite"""
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+    
+    def add_records(self, records, delay=0.01):
+        time.sleep(delay)  # Stand-in for the commit's fsync
+        with self.lock:
+            self.batches.append(list(records))
+        return len(self.batches[-1])
+
+def test_sync_mode_commits_on_caller_thread():
+    """Test sync mode writes each call immediately"""
+    history = FakeHistory()
+    recorder = HistoryRecorder(history, mode='sync')
+    
+    recorder.record('scan', 'a', {'method': 'camera_capture'})
+    recorder.record_many([('scan', 'b', None), ('scan', 'c', None)])
+    
+    assert [len(batch) for batch in history.batches] == [1, 2]
+    recorder.close()
+
+def test_group_mode_shares_commits_between_threads():
+    """Test concurrent group-mode callers are committed together"""
+    history = FakeHistory()
+    recorder = HistoryRecorder(history, mode='group', batch_size=64)
+    
+    threads = [
+        threading.Thread(target=recorder.record, args=('scan', str(i)))
+        for i in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    
+    # Every caller returned only after its record was committed
+    assert sum(len(batch) for batch in history.batches) == 20
+    assert len(history.batches) < 20
+    recorder.close()
+
+def test_async_mode_drains_on_close():
+    """Test fire-and-forget records are flushed at shutdown"""
+    history = FakeHistory()
+    recorder = HistoryRecorder(history, mode='async', batch_size=1000, flush_interval=10)
+    
+    for i in range(50):
+        recorder.record('generate', str(i))
+    recorder.close()
+    
+    contents = [content for batch in history.batches for _, content, _ in batch]
+    assert contents == [str(i) for i in range(50)]
+
+def test_failed_group_commit_is_logged_and_raised(caplog):
+    """Test a failed commit reaches the waiting caller and the log"""
+    history = FakeHistory()
+    history.add_records = lambda records: 1 / 0
+    recorder = HistoryRecorder(history)
+    
+    assert recorder.mode == 'group'
+    with pytest.raises(ZeroDivisionError):
+        recorder.record('scan', 'lost')
+    assert 'Error writing 1 history records' in caplog.text
+    recorder.close()
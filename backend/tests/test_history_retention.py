@@ -0,0 +1,77 @@
+import gzip
+import json
+import os
+from models.qr_history import QRHistory
+from models.history_retention import HistoryPruner
+
+def _fill(history, old, recent):
+    """Insert old rows (2020) and recent rows (now) with 1 KB of content each"""
+    with history.db.write() as conn:
+        conn.executemany('''
+            INSERT INTO qr_history (type, content, data, method, timestamp)
+            VALUES ('scan', ?, '{"method": "file_upload"}', 'file_upload', ?)
+        ''', ((f'{i:04d}' + 'x' * 1024, f'2020-01-0{1 + i % 2} 12:00:00') for i in range(old)))
+        conn.executemany('''
+            INSERT INTO qr_history (type, content) VALUES ('generate', ?)
+        ''', ((f'new-{i}',) for i in range(recent)))
+
+def test_pruner_archives_expired_rows_and_vacuums(real_db, tmp_path):
+    """Test TTL pruning archives by day, deletes in chunks and frees pages"""
+    history = QRHistory(str(tmp_path / 'history.db'))
+    _fill(history, old=2000, recent=10)
+    
+    pruner = HistoryPruner(history, retention_days=30, chunk_size=300, pause=0,
+                           archive_dir=str(tmp_path / 'archive'), vacuum_pages=50)
+    result = pruner.run_once()
+    
+    assert result['expired'] == 2000
+    assert history.count() == 10
+    assert history.get_stats()['methods'] == {}
+    assert result['vacuumed_pages'] > 0
+    assert history.db.connection().execute('PRAGMA freelist_count').fetchone()[0] == 0
+    
+    archived = []
+    for day in ('01', '02'):
+        directory = tmp_path / 'archive' / '2020' / '01' / day
+        for name in sorted(os.listdir(directory)):
+            with gzip.open(directory / name, 'rt') as f:
+                archived.extend(json.loads(line) for line in f)
+    assert len(archived) == 2000
+    assert archived[0]['data'] == {'method': 'file_upload'}
+    
+    history.db.close_all()
+
+def test_pruner_row_cap_and_chunked_clear(real_db, tmp_path):
+    """Test the row-count policy drops the oldest rows and clear empties the table"""
+    history = QRHistory(str(tmp_path / 'history.db'))
+    _fill(history, old=50, recent=50)
+    
+    pruner = HistoryPruner(history, max_rows=60, chunk_size=7, pause=0)
+    assert pruner.run_once()['excess'] == 40
+    remaining = history.oldest_records(100)
+    assert len(remaining) == 60
+    assert remaining[0]['content'].startswith('0031')
+    
+    assert history.clear_history(chunk_size=7) == 60
+    assert history.get_stats()['total_records'] == 0
+    
+    history.db.close_all()
+
+def test_clear_history_archives_and_vacuums(real_db, tmp_path, monkeypatch):
+    """Test clearing archives every row and hands the freed pages back"""
+    monkeypatch.setattr('config.Config.HISTORY_ARCHIVE_DIR', str(tmp_path / 'archive'))
+    history = QRHistory(str(tmp_path / 'history.db'))
+    _fill(history, old=300, recent=0)
+    
+    assert history.clear_history(chunk_size=100) == 300
+    assert history.get_stats()['total_records'] == 0
+    assert history.db.connection().execute('PRAGMA freelist_count').fetchone()[0] == 0
+    
+    archived = 0
+    for root, _, names in os.walk(tmp_path / 'archive'):
+        for name in names:
+            with gzip.open(os.path.join(root, name), 'rt') as f:
+                archived += sum(1 for _ in f)
+    assert archived == 300
+    
+    history.db.close_all()
@@ -0,0 +1,57 @@
+import json
+import pytest
+from loadtest import runner
+from loadtest.scenarios import load_scenario
+
+def step(load, rps, p99_ms, error_rate=0.0, offered_rps=None):
+    result = {'load': load, 'endpoints': {'all': {'rps': rps, 'p99_ms': p99_ms, 'error_rate': error_rate}}}
+    if offered_rps is not None:
+        result['offered_rps'] = offered_rps
+    return result
+
+def test_summarize_reports_percentiles_errors_and_shed_per_endpoint():
+    """Test nearest-rank percentiles, error classification and per-endpoint split"""
+    samples = [('generate', float(ms), 200) for ms in range(1, 1001)]
+    samples += [('scan_data', 50.0, 304), ('scan_data', 60.0, 400),
+                ('scan_data', 70.0, 503), ('scan_data', 80.0, None)]
+
+    report = runner.summarize(samples, elapsed=10)
+
+    generate = report['generate']
+    assert generate['requests'] == 1000 and generate['rps'] == 100.0
+    assert (generate['p50_ms'], generate['p95_ms'], generate['p99_ms'], generate['p999_ms']) == \
+        (500.0, 950.0, 990.0, 999.0)
+    assert generate['errors'] == 0
+
+    # 304 succeeds; 400, 503 and a dropped connection are errors; 503 is also shed
+    assert report['scan_data']['errors'] == 3 and report['scan_data']['shed'] == 1
+    assert report['scan_data']['error_rate'] == 0.75
+    assert report['all']['requests'] == 1004 and report['all']['errors'] == 3
+
+def test_saturation_point_and_scenario_files(tmp_path):
+    """Test saturation detection in both modes and loading a JSON scenario"""
+    open_steps = [step(10, 10.1, 80, offered_rps=10.3), step(20, 19.8, 140, offered_rps=20.4),
+                  step(40, 30.0, 600, offered_rps=39.5)]
+    assert runner.find_saturation(open_steps, 'open', 1000, 0.01) == \
+        {'sustained': 20, 'saturated_at': 40, 'reason': 'throughput', 'max_rps': 30.0}
+    assert runner.find_saturation(open_steps[:2] + [step(40, 39.9, 1500)], 'open', 1000, 0.01)['reason'] == 'latency'
+
+    # Closed loop: doubling clients without gaining throughput is the knee
+    closed_steps = [step(1, 40, 30), step(2, 78, 31), step(4, 80, 60)]
+    assert runner.find_saturation(closed_steps, 'closed', 1000, 0.01)['saturated_at'] == 4
+    assert runner.find_saturation(closed_steps[:2], 'closed', 1000, 0.01)['sustained'] == 2
+
+    path = tmp_path / 'flags.json'
+    path.write_text(json.dumps({
+        'mix': {'generate': 3, 'history': 1},
+        'steps': [50, 100],
+        'servers': {'sync': {'env': {'HISTORY_WRITE_MODE': 'sync'}}, 'async': {'threads': 8}}
+    }))
+    scenario = load_scenario(str(path))
+    assert scenario['name'] == 'flags' and scenario['mode'] == 'open'
+    assert scenario['servers']['sync'] == {'workers': 3, 'threads': 4, 'env': {'HISTORY_WRITE_MODE': 'sync'}}
+    assert scenario['servers']['async']['threads'] == 8
+
+    path.write_text(json.dumps({'mix': {'websocket': 1}, 'steps': [1]}))
+    with pytest.raises(ValueError):
+        load_scenario(str(path))
@@ -0,0 +1,45 @@
+from unittest.mock import patch
+from utils.metrics import status_category
+
+def test_metrics_endpoint_exposes_request_and_stage_histograms(client):
+    """Test /metrics serves Prometheus text with request, stage and code metrics"""
+    result = [{'data': 'a', 'type': 'QRCODE', 'position': {'x': 0, 'y': 0, 'width': 10, 'height': 10}}]
+    with patch('routes.qr_routes.QRProcessor') as mock_processor, \
+         patch('routes.qr_routes.history_recorder'):
+        mock_processor.decode_qr_from_bytes.return_value = (result, None)
+        client.post('/api/scan/raw', data=b'frame', content_type='image/jpeg')
+    client.post('/api/scan/raw', data=b'', content_type='image/jpeg')
+    
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    
+    body = response.get_data(as_text=True)
+    assert 'qr_http_request_duration_seconds_bucket{endpoint="/api/scan/raw"' in body
+    assert 'qr_stage_duration_seconds_count{stage="request_parse"}' in body
+    assert 'qr_codes_per_image_bucket{endpoint="qr.scan_qr_from_raw",le="1.0"}' in body
+    assert 'qr_http_request_bytes_total{endpoint="/api/scan/raw"} ' in body
+    assert 'qr_errors_total{category="bad_request"}' in body
+    # The stats registry is bridged as gauges without a pid label
+    assert 'qr_worker_stat{group="decode_executor",name="completed"}' in body
+    assert 'qr_worker_derived{group="decode_executor",name="capacity"}' in body
+    assert 'pid=' not in body
+
+def test_streamed_response_bytes_are_counted(client):
+    """Test bytes of a streamed response are counted as they are sent"""
+    from prometheus_client import REGISTRY
+    with patch('utils.qr_batch.QRRenderer') as mock_renderer, \
+         patch('routes.qr_routes.history_recorder'):
+        mock_renderer.render_png.return_value = b'png'
+        labels = {'endpoint': '/api/generate/batch'}
+        before = REGISTRY.get_sample_value('qr_http_response_bytes_total', labels) or 0
+        response = client.post('/api/generate/batch', json={'items': ['first', 'second']})
+        body = response.get_data()
+    
+    assert REGISTRY.get_sample_value('qr_http_response_bytes_total', labels) - before == len(body)
+
+def test_status_categories():
+    """Test HTTP statuses map to error categories"""
+    assert status_category(200) is None
+    assert status_category(503) == 'saturated'
+    assert status_category(502) == 'server_error'
@@ -1,3 +1,4 @@
+import io
 import pytest
 from unittest.mock import patch, MagicMock
 
@@ -20,12 +21,170 @@ def test_scan_qr_endpoint(client):
 def test_qr_history_endpoint(client):
     """Test QR history endpoint"""
     # Mock database response
-    with patch('routes.qr_routes.QRHistory') as mock_history:
-        mock_instance = MagicMock()
+    with patch('routes.qr_routes.qr_history') as mock_instance:
         mock_instance.get_user_scans.return_value = [{'id': 1, 'data': 'test-scan', 'date': '2024-01-01'}]
-        mock_history.return_value = mock_instance
         
         response = client.get('/api/scans')
         
         if response.status_code != 404:
-            assert response.status_code in [200, 401]
\ No newline at end of file
+            assert response.status_code in [200, 401]
+
+def test_scan_file_decodes_from_memory(client):
+    """Test uploaded files are decoded from the in-memory buffer"""
+    received = {}
+    
+    def fake_decode(buffer):
+        received['bytes'] = bytes(buffer)
+        return [{'data': 'test-data', 'type': 'QRCODE',
+                 'position': {'x': 0, 'y': 0, 'width': 10, 'height': 10}}], None
+    
+    with patch('routes.qr_routes.QRProcessor') as mock_processor, \
+         patch('routes.qr_routes.FileHandler.save_uploaded_file') as mock_save:
+        mock_processor.decode_qr_from_bytes.side_effect = fake_decode
+        mock_processor.get_qr_info.return_value = {'type': 'text'}
+        
+        response = client.post('/api/scan/file', data={
+            'file': (io.BytesIO(b'fake-png-bytes' * 100000), 'code.png')
+        }, content_type='multipart/form-data')
+        
+        assert response.status_code == 200
+        assert response.get_json()['count'] == 1
+        assert received['bytes'] == b'fake-png-bytes' * 100000
+        mock_save.assert_not_called()
+
+def test_scan_raw_accepts_binary_frames(client):
+    """Test raw binary camera frames are decoded without base64"""
+    with patch('routes.qr_routes.QRProcessor') as mock_processor:
+        mock_processor.decode_qr_from_bytes.return_value = ([
+            {'data': 'test-data', 'type': 'QRCODE',
+             'position': {'x': 0, 'y': 0, 'width': 10, 'height': 10}}
+        ], None)
+        mock_processor.get_qr_info.return_value = {'type': 'text'}
+        
+        response = client.post('/api/scan/raw', data=b'\xff\xd8jpeg-frame',
+                               content_type='image/jpeg')
+        
+        assert response.status_code == 200
+        assert response.get_json()['results'][0]['data'] == 'test-data'
+        mock_processor.decode_qr_from_bytes.assert_called_once_with(b'\xff\xd8jpeg-frame')
+
+def test_scan_raw_rejects_unsupported_content_type(client):
+    """Test raw scan endpoint only accepts binary image bodies"""
+    response = client.post('/api/scan/raw', json={'image': 'data:image/png;base64,abc'})
+    assert response.status_code == 415
+
+def test_scan_batch_streams_ndjson_for_files_and_archives(client):
+    """Test batch scans expand archives and stream one line per image"""
+    import json
+    import zipfile
+    
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('labels/a.png', b'zip-image')
+        zf.writestr('labels/README.txt', b'not an image')
+    archive.seek(0)
+    
+    def fake_decode(data):
+        if data == b'blank':
+            return None, 'No QR codes found in image'
+        return [{'data': data.decode(), 'type': 'QRCODE',
+                 'position': {'x': 0, 'y': 0, 'width': 10, 'height': 10}}], None
+    
+    with patch('routes.qr_routes.QRProcessor') as mock_processor, \
+         patch('routes.qr_routes.history_recorder') as mock_history:
+        mock_processor.decode_qr_from_bytes.side_effect = fake_decode
+        mock_processor.get_qr_info.return_value = {'type': 'text'}
+        
+        response = client.post('/api/scan/batch', data={
+            'files': [
+                (io.BytesIO(b'one'), 'one.png'),
+                (io.BytesIO(b'blank'), 'blank.jpg'),
+                (io.BytesIO(b'x'), 'notes.txt'),
+                (archive, 'labels.zip')
+            ]
+        }, content_type='multipart/form-data')
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        
+        summary = lines[-1]
+        assert summary['done'] is True
+        assert summary['total'] == 4
+        assert summary['succeeded'] == 2
+        assert summary['failed'] == 2
+        assert sorted(l['filename'] for l in lines[:-1] if l['success']) == ['labels/a.png', 'one.png']
+        
+        # One bulk insert for the whole batch
+        mock_history.record_many.assert_called_once()
+        assert len(mock_history.record_many.call_args[0][0]) == 2
+
+def test_generate_batch_streams_zip_in_input_order(client):
+    """Test bulk generation returns a ZIP and records history in one insert"""
+    import zipfile
+    
+    with patch('utils.qr_batch.QRRenderer') as mock_renderer, \
+         patch('utils.qr_processor.qr_image_cache') as mock_cache, \
+         patch('routes.qr_routes.history_recorder') as mock_history:
+        mock_renderer.build_matrix.side_effect = lambda text, border, error_correction: text
+        mock_renderer.render_png.side_effect = lambda matrix, size: f'{matrix}:png'.encode()
+        mock_renderer.render_svg.side_effect = lambda matrix, size: f'{matrix}:svg'.encode()
+        response = client.post('/api/generate/batch', json={
+            'items': ['first', {'text': 'second', 'format': 'svg', 'filename': 'two.svg'}, '  '],
+            'defaults': {'size': [200, 200]}
+        })
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'application/zip'
+        
+        archive = zipfile.ZipFile(io.BytesIO(response.get_data()))
+        assert archive.namelist() == ['000000.png', 'two.svg', 'errors.ndjson']
+        assert archive.read('two.svg') == b'second:svg'
+        
+        # Rendered directly, leaving the shared image cache alone
+        mock_cache.put.assert_not_called()
+        
+        mock_history.record_many.assert_called_once()
+        recorded = list(mock_history.record_many.call_args[0][0])
+        assert [content for _, content, _ in recorded] == ['first', 'second']
+
+def test_generate_batch_item_names_and_limits():
+    """Test archive names cannot escape the archive or overwrite one another"""
+    from utils.qr_batch import normalize_item
+    filenames = set()
+    names = [normalize_item({'text': 'x', 'filename': name}, {}, index, filenames)['filename']
+             for index, name in enumerate(['../../etc/cron.d/job', 'a.png', 'a.png', '..'])]
+    assert names == ['etc_cron.d_job', 'a.png', 'a-1.png', '000003.png']
+    
+    assert 'error' in normalize_item({'text': 'x' * 5000}, {}, 0)
+    assert 'error' in normalize_item({'text': 'x', 'size': [100, 100000]}, {}, 0)
+
+def test_generate_batch_aborts_a_failed_stream(client):
+    """Test a failure mid-stream breaks the transfer and records what was written"""
+    with patch('utils.qr_batch.QRRenderer') as mock_renderer, \
+         patch('routes.qr_routes.make_writer') as mock_writer, \
+         patch('routes.qr_routes.history_recorder') as mock_history:
+        mock_renderer.render_png.return_value = b'png'
+        mock_writer.return_value.add.side_effect = [b'entry', OSError('disk full')]
+        
+        response = client.post('/api/generate/batch', json={'items': ['first', 'second']})
+        with pytest.raises(OSError):
+            response.get_data()
+        
+        recorded = list(mock_history.record_many.call_args[0][0])
+        assert [content for _, content, _ in recorded] == ['first']
+
+def test_history_pages_with_cursor(client):
+    """Test /history passes filters through and returns the next cursor"""
+    with patch('routes.history_routes.qr_history') as mock_history:
+        mock_history.get_page.return_value = ([{'id': 3, 'type': 'scan'}], 'abc')
+        
+        response = client.get('/api/history?limit=1&type=scan&cursor=xyz')
+        assert response.status_code == 200
+        assert response.get_json()['next_cursor'] == 'abc'
+        assert mock_history.get_page.call_args.kwargs['record_type'] == 'scan'
+        assert mock_history.get_page.call_args.kwargs['cursor'] == 'xyz'
+        
+        mock_history.get_page.side_effect = ValueError('Invalid cursor')
+        response = client.get('/api/history?cursor=bad')
+        assert response.status_code == 400
@@ -0,0 +1,68 @@
+import pytest
+from unittest.mock import patch
+
+def test_cache_evicts_by_bytes_and_shares_disk_tier(setup_test_environment, tmp_path):
+    """Test LRU byte budget and that a fresh worker hits the disk tier"""
+    from utils.qr_cache import QRImageCache
+    
+    cache = QRImageCache(max_bytes=10, directory=str(tmp_path))
+    cache.put('aa01', b'12345')
+    cache.put('aa02', b'67890')
+    cache.get('aa01')  # aa01 becomes most recently used
+    cache.put('aa03', b'abcde')
+    
+    assert list(cache._entries) == ['aa01', 'aa03']
+    
+    other_worker = QRImageCache(max_bytes=10, directory=str(tmp_path))
+    assert other_worker.get('aa02') == b'67890'
+    assert other_worker.get('ffff') is None
+
+def test_cache_key_covers_all_render_options(setup_test_environment):
+    """Test every rendering option changes the content address"""
+    from utils.qr_cache import QRImageCache
+    
+    base = QRImageCache.make_key('hello', (300, 300), 4, 'M', 'png')
+    assert base == QRImageCache.make_key('hello', [300, 300], 4, 'M', 'png')
+    assert base != QRImageCache.make_key('hello', (300, 300), 4, 'H', 'png')
+    assert base != QRImageCache.make_key('hello', (300, 300), 2, 'M', 'png')
+    assert base != QRImageCache.make_key('hello', (300, 300), 4, 'M', 'svg')
+
+def test_generate_honors_if_none_match(client):
+    """Test /api/generate returns a strong ETag and 304 on revalidation"""
+    rendered = ({'image': 'data:image/png;base64,AAAA', 'size': (300, 300),
+                 'data': 'https://example.com'}, None)
+    
+    with patch('routes.qr_routes.QRProcessor.generate_qr_code', return_value=rendered) as mock_generate, \
+         patch('routes.qr_routes.history_recorder.record') as mock_record:
+        first = client.post('/api/generate', json={'text': 'https://example.com'})
+        assert first.status_code == 200
+        etag = first.headers['ETag']
+        assert not etag.startswith('W/')
+        
+        second = client.post('/api/generate', json={'text': 'https://example.com'},
+                             headers={'If-None-Match': etag})
+        assert second.status_code == 304
+        assert second.get_data() == b''
+        
+        query = client.get('/api/generate?text=https://example.com',
+                           headers={'If-None-Match': etag})
+        assert query.status_code == 304
+        
+        # Revalidations never render and are not added to history
+        assert mock_generate.call_count == 1
+        assert mock_record.call_count == 1
+
+def test_generate_returns_raw_image_bodies(client):
+    """Test format=png/svg return image bodies instead of JSON"""
+    rendered = ({'image': b'<svg/>', 'size': (300, 300), 'data': 'hello'}, None)
+    
+    with patch('routes.qr_routes.QRProcessor.generate_qr_code', return_value=rendered) as mock_generate:
+        response = client.get('/api/generate?text=hello&format=svg')
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'image/svg+xml'
+        assert response.get_data() == b'<svg/>'
+        assert mock_generate.call_args[0][4] == 'svg'
+    
+    response = client.post('/api/generate', json={'text': 'hello', 'format': 'gif'})
+    assert response.status_code == 400
@@ -0,0 +1,77 @@
+from unittest.mock import patch
+from utils.scan_cache import DecodeResultCache, RecentScans
+from utils.stats import stats
+
+def test_exact_and_perceptual_hits_with_ttl_and_eviction():
+    """Test lookups by content key and near-identical dHash"""
+    cache = DecodeResultCache(max_entries=2, ttl=60, max_distance=2)
+    stats.reset('decode_result_cache')
+    
+    cache.put(b'a', 0b1111_0000, (['a'], None), 12.5, session='tab-1')
+    assert cache.get(b'a') == (['a'], None)
+    # Two bits away from a stored frame of the same session still hits
+    assert cache.get(b'other', 0b1111_0011, 'tab-1') == (['a'], None)
+    assert cache.get(b'other', 0b1111_0011, 'tab-2') is None
+    assert cache.get(b'other', 0b0000_1111, 'tab-1') is None
+    # A near-identical frame decoded with other frame limits does not hit
+    assert cache.get(b'other', 0b1111_0011, 'tab-1', variant=((1, 0, 0),)) is None
+    assert stats.get('decode_result_cache', 'decode_ms_saved') == 25.0
+    
+    cache.put(b'b', None, (['b'], None), 1)
+    cache.put(b'c', None, (['c'], None), 1)
+    assert cache.get(b'a') is None  # evicted
+    assert cache.gauges()['entries'] == 2
+    
+    with patch('utils.scan_cache.time.monotonic', return_value=10 ** 9):
+        assert cache.get(b'c') is None  # expired
+
+def test_dedup_window_is_per_session():
+    """Test a payload is recorded once per session within the window"""
+    recent = RecentScans(window=30)
+    assert recent.should_record('s1', 'code') is True
+    assert recent.should_record('s1', 'code') is False
+    assert recent.should_record('s2', 'code') is True
+    assert RecentScans(window=0).should_record('s1', 'code') is True
+
+def test_repeated_camera_frames_decode_and_record_once(client):
+    """Test the raw scan route reuses cached results and dedups history"""
+    cache = DecodeResultCache(max_entries=8, ttl=60)
+    result = [{'data': 'steady-code', 'type': 'QRCODE',
+               'position': {'x': 0, 'y': 0, 'width': 10, 'height': 10}}]
+    
+    with patch('routes.qr_routes.decode_result_cache', cache), \
+         patch('routes.qr_routes.recent_scans', RecentScans(window=30)), \
+         patch.object(cache, 'perceptual_hash', side_effect=[7, 6]), \
+         patch('routes.qr_routes.QRProcessor') as mock_processor, \
+         patch('routes.qr_routes.history_recorder') as mock_recorder:
+        mock_processor.decode_qr_from_bytes.return_value = (result, None)
+        mock_processor.get_qr_info.return_value = {'type': 'text'}
+        
+        for frame in (b'frame-1', b'frame-2'):
+            response = client.post('/api/scan/raw', data=frame, content_type='image/jpeg',
+                                   headers={'X-Scan-Session': 'tab-1'})
+            assert response.get_json()['results'][0]['data'] == 'steady-code'
+        
+        assert mock_processor.decode_qr_from_bytes.call_count == 1
+        recorded = [list(call.args[0]) for call in mock_recorder.record_many.call_args_list]
+        assert [len(batch) for batch in recorded] == [1, 0]
+
+def test_missed_camera_frames_are_not_cached(client):
+    """Test a sharp frame after a blurry one of the same scene is decoded again"""
+    cache = DecodeResultCache(max_entries=8, ttl=60)
+    result = [{'data': 'sharp-code', 'type': 'QRCODE',
+               'position': {'x': 0, 'y': 0, 'width': 10, 'height': 10}}]
+    
+    with patch('routes.qr_routes.decode_result_cache', cache), \
+         patch.object(cache, 'perceptual_hash', side_effect=[7, 6]), \
+         patch('routes.qr_routes.QRProcessor') as mock_processor, \
+         patch('routes.qr_routes.history_recorder'):
+        mock_processor.decode_qr_from_bytes.side_effect = [(None, 'No QR codes found in image'), (result, None)]
+        mock_processor.get_qr_info.return_value = {'type': 'text'}
+        
+        for frame in (b'blurry', b'sharp'):
+            response = client.post('/api/scan/raw', data=frame, content_type='image/jpeg',
+                                   headers={'X-Scan-Session': 'tab-1'})
+        
+        assert response.get_json()['results'][0]['data'] == 'sharp-code'
+        assert mock_processor.decode_qr_from_bytes.call_count == 2
@@ -0,0 +1,79 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from utils.scan_session import ScanSession
+
+CODE = [{'data': 'tracked', 'type': 'QRCODE',
+         'position': {'x': 100, 'y': 50, 'width': 40, 'height': 20}}]
+
+def test_session_tracks_region_skips_static_frames_and_adapts_interval():
+    """Test ROI hand-off between frames, change skipping and next-frame delay"""
+    session = ScanSession('tab-1', min_interval=200, interval=500, max_interval=2000,
+                          change_bits=4, roi_margin=0.5)
+    decode = MagicMock(side_effect=[([], 'No QR codes found in image', False),
+                                    (CODE, None, False), (CODE, None, True)])
+    
+    reply = session.process(b'f1', 0b0000, decode)
+    assert reply['count'] == 0 and reply['next_interval_ms'] == 200
+    assert decode.call_args.args[1] is None
+    
+    reply = session.process(b'f2', 0b1111_0000, decode)
+    assert reply['results'] == CODE and reply['next_interval_ms'] == 500
+    assert session.region() == (80, 40, 80, 40)
+    
+    # Three bits changed: skipped, previous results, slower next frame
+    reply = session.process(b'f3', 0b1111_0111, decode)
+    assert reply['skipped'] is True and reply['results'] == CODE
+    assert reply['next_interval_ms'] == 750
+    assert decode.call_count == 2
+    
+    reply = session.process(b'f4', 0b0000_1111, decode)
+    assert reply['tracked'] is True
+    assert decode.call_args.args[1] == (80, 40, 80, 40)
+
+def test_session_decodes_an_unchanged_frame_after_a_miss():
+    """Test a sharp frame after a blurry one of the same scene is still decoded"""
+    session = ScanSession('tab-1', change_bits=12)
+    decode = MagicMock(side_effect=[([], 'No QR codes found in image', False), (CODE, None, False)])
+    
+    assert session.process(b'blurry', 0b0000, decode)['count'] == 0
+    reply = session.process(b'sharp', 0b0001, decode)
+    assert reply['skipped'] is False and reply['results'] == CODE
+    assert decode.call_count == 2
+
+def test_stream_frame_records_new_codes_once(setup_test_environment):
+    """Test a streamed frame is decoded in the region and recorded to history"""
+    from routes import scan_stream_routes
+    from utils.scan_cache import RecentScans
+    
+    session = ScanSession('tab-1', change_bits=4)
+    with patch.object(scan_stream_routes.decode_result_cache, 'perceptual_hash', side_effect=[0, 0xFF]), \
+         patch('routes.scan_stream_routes.QRProcessor') as mock_processor, \
+         patch('routes.qr_routes.recent_scans', RecentScans(window=30)), \
+         patch('routes.qr_routes.history_recorder') as mock_recorder:
+        mock_processor.decode_qr_in_region.return_value = (CODE, None, False)
+        mock_processor.get_qr_info.return_value = {'type': 'text'}
+        
+        for frame in (b'frame-1', b'frame-2'):
+            reply = scan_stream_routes._scan_frame(session, frame)
+            assert reply['results'] == CODE
+        
+        assert mock_processor.decode_qr_in_region.call_args.args[1] == (80, 40, 80, 40)
+        recorded = [list(call.args[0]) for call in mock_recorder.record_many.call_args_list]
+        assert [len(batch) for batch in recorded] == [1, 0]
+
+def test_stream_handshakes_past_the_cap_are_refused(client):
+    """Test extra streams get a quick 503 and a closed stream frees its slot"""
+    import threading
+    slots = threading.BoundedSemaphore(1)
+    upgrade = {'Upgrade': 'websocket', 'Connection': 'Upgrade'}
+    with patch('routes.scan_stream_routes.stream_slots', slots):
+        slots.acquire()
+        response = client.get('/api/scan/stream', headers=upgrade)
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '60'
+        
+        slots.release()
+        # No socket under the test client, so the handshake itself fails
+        with pytest.raises(RuntimeError):
+            client.get('/api/scan/stream', headers=upgrade)
+        assert slots.acquire(blocking=False)
@@ -0,0 +1,57 @@
+from unittest.mock import patch
+from utils.tiled_decode import TiledDecoder, tile_grid
+
+class FakeImage:
+    """Stands in for a grayscale frame; slicing returns the tile origin"""
+    shape = (1000, 1500)
+    
+    def __getitem__(self, index):
+        rows, cols = index
+        return (cols.start, rows.start)
+
+def test_tile_grid_covers_image_with_overlap():
+    """Test tiles reach every edge and neighbours share the overlap"""
+    grid = tile_grid(1500, 1000, 600, 150)
+    assert grid[0] == (0, 0, 600, 600)
+    assert max(x + w for x, _, w, _ in grid) == 1500
+    assert max(y + h for _, y, _, h in grid) == 1000
+    xs = sorted({x for x, _, _, _ in grid})
+    assert all(b - a <= 600 - 150 for a, b in zip(xs, xs[1:]))
+    assert tile_grid(300, 200, 600, 150) == [(0, 0, 300, 200)]
+
+def test_tiled_decode_translates_and_merges_detections():
+    """Test tile-local boxes map back to the image and border codes count once"""
+    def decode_tile(variant, stage):
+        x, y = variant
+        # One code at image (550, 20) is visible from both top-left tiles
+        if y == 0 and x <= 550 < x + 600:
+            return [{'data': 'border', 'type': 'QRCODE', 'rect': (550 - x, 20, 80, 80)}]
+        return []
+    
+    with patch('utils.tiled_decode.cv2.imdecode', return_value=FakeImage()), \
+         patch('utils.tiled_decode.DecodePipeline._full_resolution_variants',
+               side_effect=lambda tile: iter([('grayscale', tile, (1, 1))])), \
+         patch('utils.decode_pipeline.decoder_chain.decode', side_effect=decode_tile), \
+         patch.object(TiledDecoder, 'geometry', return_value=(600, 150)):
+        results, error, tiles = TiledDecoder.decode(b'image', 4)
+    
+    assert error is None
+    assert results == [{'data': 'border', 'type': 'QRCODE',
+                        'position': {'x': 550, 'y': 20, 'width': 80, 'height': 80}}]
+    assert sum(tile['count'] for tile in tiles) == 2
+    assert all('ms' in tile for tile in tiles)
+
+def test_scan_raw_tiled_reports_tiles(client):
+    """Test ?tiled=1 selects tiled decoding and returns per-tile timing"""
+    result = [{'data': 'a', 'type': 'QRCODE', 'position': {'x': 0, 'y': 0, 'width': 10, 'height': 10}}]
+    tiles = [{'x': 0, 'y': 0, 'width': 600, 'height': 600, 'count': 1, 'ms': 3.2}]
+    
+    with patch('routes.qr_routes.QRProcessor') as mock_processor, \
+         patch('routes.qr_routes.history_recorder'):
+        mock_processor.decode_qr_tiled.return_value = (result, None, tiles)
+        response = client.post('/api/scan/raw?tiled=1&module_size=2.5', data=b'sheet',
+                               content_type='image/png')
+    
+    assert response.status_code == 200
+    assert response.get_json()['tiles'] == tiles
+    assert mock_processor.decode_qr_tiled.call_args.args[1] == 2.5
@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+import threading
+from unittest.mock import patch
+from utils.warmup import CODEC_MODULES, Readiness
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_readiness_reports_ready_after_every_step():
+    """Test steps run once per process in order and a failing step keeps it not ready until it passes"""
+    release = threading.Event()
+    calls = []
+    readiness = Readiness()
+    
+    readiness.start([('codecs', release.wait), ('schema', lambda: calls.append('schema'))])
+    readiness.start([('again', lambda: calls.append('again'))])
+    assert not readiness.ready and readiness.status()['ready'] is False
+    
+    release.set()
+    assert readiness.wait(5)
+    assert calls == ['schema']
+    assert list(readiness.status()['steps_ms']) == ['codecs', 'schema']
+    
+    fixed = threading.Event()
+    
+    def decode():
+        if not fixed.is_set():
+            raise ZeroDivisionError('division by zero')
+    
+    failing = Readiness(retry_delay=0.01, max_retry_delay=0.05)
+    failing.start([('decode', decode), ('later', lambda: calls.append('later'))])
+    assert not failing.wait(0.5)
+    assert failing.status()['error'].startswith('decode:')
+    assert 'later' not in calls
+    
+    fixed.set()
+    assert failing.wait(5)
+    assert calls[-1] == 'later' and 'error' not in failing.status()
+
+def test_readiness_retries_a_failed_step_with_backoff():
+    """Test a step that fails transiently is retried until the process is ready"""
+    attempts = []
+    
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise OSError('database is locked')
+    
+    delays = []
+    readiness = Readiness(retry_delay=0.01, max_retry_delay=0.015)
+    with patch('utils.warmup.time.sleep', side_effect=delays.append):
+        readiness.start([('schema', flaky)])
+        assert readiness.wait(5)
+    
+    assert len(attempts) == 3
+    assert delays == [0.01, 0.015]
+
+def test_ready_endpoint_returns_503_until_warm(client):
+    """Test /ready answers 503 while warming and 200 once warm; /health stays up"""
+    readiness = Readiness()
+    release = threading.Event()
+    with patch('app.readiness', readiness), \
+         patch('app.warm_up', lambda: readiness.start([('codecs', release.wait)])):
+        response = client.get('/ready')
+        assert response.status_code == 503
+        assert response.get_json()['ready'] is False
+        assert client.get('/health').status_code == 200
+        
+        release.set()
+        readiness.wait(5)
+        response = client.get('/ready')
+        assert response.status_code == 200
+        assert 'codecs' in response.get_json()['steps_ms']
+
+def test_importing_app_leaves_codecs_unloaded(tmp_path):
+    """Test `import app` does not import the codec libraries"""
+    env = dict(os.environ, DATABASE_PATH=str(tmp_path / 'history.db'), QR_CACHE_DIR='',
+               HISTORY_ARCHIVE_DIR=str(tmp_path / 'archive'))
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    output = subprocess.run(
+        [sys.executable, '-c',
+         f'import sys, app; print([name for name in {CODEC_MODULES!r} if name in sys.modules])'],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == '[]'
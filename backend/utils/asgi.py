@@ -0,0 +1,240 @@
+import asyncio
+import functools
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+from utils.fork_safe import per_process
+
+# Response bodies up to this size are collected on the view's thread and sent
+# from the event loop; larger or streamed bodies are sent as they are produced
+BUFFERED_RESPONSE_BYTES = 256 * 1024
+
+class WebSocket:
+    """One WebSocket connection as seen by a native ASGI handler"""
+    
+    def __init__(self, scope, receive, send):
+        self.args = {name: values[0] for name, values in parse_qs(scope['query_string'].decode('latin-1')).items()}
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        self.remote_addr = scope['client'][0] if scope.get('client') else ''
+        self.closed = False
+        self._receive = receive
+        self._send = send
+    
+    async def receive(self, timeout=None):
+        """Next message as bytes or str; None once closed or idle for timeout seconds"""
+        try:
+            message = await asyncio.wait_for(self._receive(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if message['type'] == 'websocket.disconnect':
+            self.closed = True
+            return None
+        return message['bytes'] if message.get('bytes') is not None else message.get('text')
+    
+    async def send(self, text):
+        await self._send({'type': 'websocket.send', 'text': text})
+    
+    async def close(self, code=1000):
+        if not self.closed:
+            self.closed = True
+            await self._send({'type': 'websocket.close', 'code': code})
+
+class AsgiApp:
+    """ASGI front for the Flask app.
+
+    Request bodies are received on the event loop, so a slow client costs a
+    coroutine rather than a worker thread. The Flask view then runs on a
+    thread pool with the whole body in hand (spooled to a temporary file
+    past spool_bytes); decodes are offloaded further to the decode process
+    pool by the views and history writes to the history writer, as under
+    WSGI, so every route and response is the same.
+
+    WebSocket paths in `websockets` are served by native coroutines,
+    handler(ws, run), where run(fn, *args) awaits fn on the thread pool;
+    other WebSocket requests are rejected. Lifespan startup calls
+    on_startup once per process. max_body is a byte limit or a
+    max_body(method, path) callable giving each request's limit, checked
+    against Content-Length and again while the body is received.
+    """
+    
+    def __init__(self, wsgi_app, websockets=None, on_startup=None, threads=32,
+                 max_body=16 * 1024 * 1024, spool_bytes=1024 * 1024):
+        self.wsgi_app = wsgi_app
+        self.websockets = websockets or {}
+        self.on_startup = on_startup
+        self.threads = threads
+        self.max_body = max_body
+        self.spool_bytes = spool_bytes
+        self._pool = per_process(lambda: ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='asgi'))
+    
+    def _get_pool(self):
+        return self._pool.get()
+    
+    async def run(self, fn, *args):
+        """Run fn(*args) on the thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(self._get_pool(), functools.partial(fn, *args))
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        elif scope['type'] == 'websocket':
+            await self._websocket(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+    
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.on_startup is not None:
+                    self.on_startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                pool = self._pool.peek()
+                if pool is not None:
+                    pool.shutdown(wait=False)
+                    self._pool.reset()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    async def _websocket(self, scope, receive, send):
+        await receive()  # websocket.connect
+        handler = self.websockets.get(scope['path'])
+        if handler is None:
+            # Closing before accepting rejects the handshake with a 403
+            await send({'type': 'websocket.close', 'code': 1008})
+            return
+        
+        await send({'type': 'websocket.accept'})
+        ws = WebSocket(scope, receive, send)
+        try:
+            await handler(ws, self.run)
+        finally:
+            await ws.close()
+    
+    async def _http(self, scope, receive, send):
+        headers = [(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']]
+        max_body = self.max_body(scope['method'], self._path(scope)) if callable(self.max_body) else self.max_body
+        length = next((value for name, value in headers if name.lower() == 'content-length'), '')
+        if length.isdigit() and int(length) > max_body:
+            await self._send_too_large(send)
+            return
+        
+        # Receive the whole body before a thread is involved
+        body = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+        try:
+            size = 0
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                chunk = message.get('body', b'')
+                size += len(chunk)
+                if size > max_body:
+                    await self._send_too_large(send)
+                    return
+                body.write(chunk)
+                more_body = message.get('more_body', False)
+            body.seek(0)
+            
+            loop = asyncio.get_running_loop()
+            environ = self._environ(scope, headers, body, size)
+            response = await loop.run_in_executor(self._get_pool(), self._call_wsgi, environ, loop, send)
+        finally:
+            body.close()
+        
+        if response is not None:
+            start, content = response
+            await send(start)
+            await send({'type': 'http.response.body', 'body': content})
+    
+    async def _send_too_large(self, send):
+        await send({'type': 'http.response.start', 'status': 413,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': b'{"error":"File too large"}\n'})
+    
+    @staticmethod
+    def _path(scope):
+        """Request path below the application's root_path"""
+        root_path = scope.get('root_path', '')
+        return scope['path'][len(root_path):] if scope['path'].startswith(root_path) else scope['path']
+    
+    @staticmethod
+    def _environ(scope, headers, body, size):
+        root_path = scope.get('root_path', '')
+        path = AsgiApp._path(scope)
+        server = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+            'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1] or 80),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+            'CONTENT_LENGTH': str(size),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.input_terminated': True,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False
+        }
+        for name, value in headers:
+            key = name.upper().replace('-', '_')
+            if key == 'CONTENT_LENGTH':
+                continue
+            if key != 'CONTENT_TYPE':
+                key = f'HTTP_{key}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+        return environ
+    
+    def _call_wsgi(self, environ, loop, send):
+        """Run the WSGI app on a pool thread.
+
+        Returns (start message, body) for a small response; a large or
+        streamed one is sent from here and None is returned.
+        """
+        started = []
+        
+        def start_response(status, response_headers, exc_info=None):
+            started[:] = [{
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                            for name, value in response_headers]
+            }]
+        
+        iterable = self.wsgi_app(environ, start_response)
+        try:
+            chunks = []
+            size = 0
+            iterator = iter(iterable)
+            for chunk in iterator:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > BUFFERED_RESPONSE_BYTES:
+                    break
+            else:
+                return started[0], b''.join(chunks)
+            
+            def send_now(message):
+                # Waits for the event loop to take it, pacing the view to the client
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+            
+            send_now(started[0])
+            for chunk in chunks:
+                send_now({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            for chunk in iterator:
+                if chunk:
+                    send_now({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            send_now({'type': 'http.response.body', 'body': b''})
+            return None
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
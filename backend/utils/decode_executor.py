@@ -0,0 +1,292 @@
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+)
+from config import Config
+from utils.fork_safe import per_process
+from utils.stats import stats
+from utils.metrics import DECODE_CAPACITY, DECODE_IN_FLIGHT, STAGE_SECONDS
+from utils.warmup import warm_codecs
+
+STATS_GROUP = 'decode_executor'
+
+class ExecutorSaturated(Exception):
+    """Raised when the decode queue is full and the job was not accepted"""
+    def __init__(self, retry_after):
+        super().__init__('Decoder is busy, retry later')
+        self.retry_after = retry_after
+
+class DecodeTimeout(Exception):
+    """Raised when a decode job does not finish within its timeout"""
+
+def cpu_quota():
+    """Number of CPUs available to this container (cgroup quota aware)"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        if quota > 0:
+            return max(1, math.ceil(quota / period))
+    except (OSError, ValueError):
+        pass
+    
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def decode_thread_count():
+    """Threads per decode process for tiles and frames"""
+    return Config.DECODE_THREADS if Config.DECODE_THREADS > 0 else cpu_quota()
+
+def decode_threads():
+    """Per-process thread pool for decode work split into parts.
+    
+    Tiles and animation frames of one image are decoded on it inside a
+    pool process; ZBar, OpenCV and Pillow release the GIL while decoding.
+    """
+    return _thread_pool.get()
+
+_thread_pool = per_process(lambda: ThreadPoolExecutor(max_workers=decode_thread_count(), thread_name_prefix='decode'))
+
+def _picklable(args):
+    """Job arguments as they are sent to a pool process.
+    
+    memoryviews cannot be pickled, so an upload buffer is copied to bytes
+    here and pickled again on submit: the pooled path costs two copies of
+    each image that the inline path (DECODE_WORKERS=0) avoids.
+    """
+    return tuple(bytes(arg) if isinstance(arg, memoryview) else arg for arg in args)
+
+def _run_job(fn, args):
+    """Run a job in the pool, reporting when it actually started.
+    
+    Counters the job recorded in the pool process are returned with the
+    result and merged into the web worker's registry.
+    """
+    started_at = time.monotonic()
+    try:
+        result = fn(*args)
+    finally:
+        counters = stats.drain()
+    return started_at, result, counters
+
+class DecodeExecutor:
+    """Process pool for CPU-heavy decodes with a bounded queue.
+    
+    At most max_workers jobs run at once and at most queue_size more may
+    wait; anything beyond that is rejected immediately with
+    ExecutorSaturated so the request can be shed instead of stalling a
+    web worker. A slot is only released when its job really finishes, so
+    timed-out jobs still count against capacity until they complete.
+    
+    With max_workers=0 jobs run inline in the calling thread.
+    """
+    
+    def __init__(self, max_workers, queue_size, timeout, retry_after):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._pool = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._slots = threading.BoundedSemaphore(max(1, max_workers) + queue_size)
+    
+    @classmethod
+    def from_config(cls):
+        max_workers = Config.DECODE_WORKERS
+        if max_workers < 0:
+            max_workers = max(1, cpu_quota() // Config.WEB_CONCURRENCY)
+        
+        return cls(
+            max_workers=max_workers,
+            queue_size=Config.DECODE_QUEUE_SIZE,
+            timeout=Config.DECODE_TIMEOUT,
+            retry_after=Config.DECODE_RETRY_AFTER
+        )
+    
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a threaded Gunicorn worker is not safe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=warm_codecs
+                )
+            return self._pool
+    
+    def start(self):
+        """Start every pool process now rather than on the first decodes"""
+        # Set here, in the web worker: pool processes import this module too
+        DECODE_CAPACITY.set(max(1, self.max_workers) + self.queue_size)
+        if self.max_workers == 0:
+            return
+        pool = self._get_pool()
+        # The pool starts another process for each job submitted while none is idle
+        futures = [pool.submit(os.getpid) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+    
+    def run(self, fn, *args):
+        """Run fn(*args) on the pool and return its result.
+        
+        Raises ExecutorSaturated when the queue is full and DecodeTimeout
+        when the job exceeds the configured timeout.
+        """
+        if not self._slots.acquire(blocking=False):
+            stats.incr(STATS_GROUP, 'rejected')
+            raise ExecutorSaturated(self.retry_after)
+        
+        with self._lock:
+            self._in_flight += 1
+        DECODE_IN_FLIGHT.inc()
+        stats.incr(STATS_GROUP, 'submitted')
+        
+        if self.max_workers == 0:
+            try:
+                result = fn(*args)
+            finally:
+                self._release()
+            stats.incr(STATS_GROUP, 'completed')
+            return result
+        
+        args = _picklable(args)
+        
+        enqueued_at = time.monotonic()
+        future = self._get_pool().submit(_run_job, fn, args)
+        future.add_done_callback(lambda _: self._release())
+        
+        try:
+            started_at, result, counters = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            stats.incr(STATS_GROUP, 'timeouts')
+            raise DecodeTimeout(f'Decode did not finish within {self.timeout}s')
+        
+        stats.merge(counters)
+        stats.incr(STATS_GROUP, 'wait_ms_total', (started_at - enqueued_at) * 1000)
+        STAGE_SECONDS.labels('decode_queue_wait').observe(started_at - enqueued_at)
+        stats.incr(STATS_GROUP, 'completed')
+        return result
+    
+    def imap_unordered(self, fn, jobs, window=None):
+        """Run fn over (key, args) jobs, yielding (key, result, error) as each finishes.
+        
+        Meant for batch work: instead of rejecting, it waits for free slots
+        and keeps at most `window` jobs (default: one per pool process) in
+        flight, leaving the queue headroom to interactive requests. Jobs
+        are pulled from the iterable lazily.
+        """
+        window = window or max(1, self.max_workers)
+        jobs = iter(jobs)
+        pending = {}
+        exhausted = False
+        
+        while True:
+            while not exhausted and len(pending) < window:
+                try:
+                    key, args = next(jobs)
+                except StopIteration:
+                    exhausted = True
+                    break
+                
+                if not self._slots.acquire(timeout=self.timeout):
+                    stats.incr(STATS_GROUP, 'rejected')
+                    yield key, None, ExecutorSaturated(self.retry_after)
+                    continue
+                
+                with self._lock:
+                    self._in_flight += 1
+                DECODE_IN_FLIGHT.inc()
+                stats.incr(STATS_GROUP, 'submitted')
+                
+                if self.max_workers == 0:
+                    try:
+                        result, error = fn(*args), None
+                        stats.incr(STATS_GROUP, 'completed')
+                    except Exception as e:
+                        result, error = None, e
+                    finally:
+                        self._release()
+                    yield key, result, error
+                    continue
+                
+                args = _picklable(args)
+                future = self._get_pool().submit(_run_job, fn, args)
+                future.add_done_callback(lambda _: self._release())
+                pending[future] = (key, time.monotonic())
+            
+            if not pending:
+                return
+            
+            done, _ = wait(pending, timeout=self.timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Nothing finished within the timeout: give up on everything in flight
+                for future, (key, _) in pending.items():
+                    future.cancel()
+                    stats.incr(STATS_GROUP, 'timeouts')
+                    yield key, None, DecodeTimeout(f'Decode did not finish within {self.timeout}s')
+                pending.clear()
+                continue
+            
+            for future in done:
+                key, enqueued_at = pending.pop(future)
+                try:
+                    started_at, result, counters = future.result()
+                except Exception as e:
+                    yield key, None, e
+                    continue
+                
+                stats.merge(counters)
+                stats.incr(STATS_GROUP, 'wait_ms_total', (started_at - enqueued_at) * 1000)
+                STAGE_SECONDS.labels('decode_queue_wait').observe(started_at - enqueued_at)
+                stats.incr(STATS_GROUP, 'completed')
+                yield key, result, None
+    
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        DECODE_IN_FLIGHT.dec()
+        self._slots.release()
+    
+    def gauges(self):
+        """Current queue depth and saturation for this worker"""
+        with self._lock:
+            in_flight = self._in_flight
+        
+        workers = max(1, self.max_workers)
+        completed = stats.get(STATS_GROUP, 'completed')
+        wait_total = stats.get(STATS_GROUP, 'wait_ms_total')
+        return {
+            'workers': self.max_workers,
+            'capacity': workers + self.queue_size,
+            'in_flight': in_flight,
+            'queue_depth': max(0, in_flight - workers),
+            'saturation': round(in_flight / (workers + self.queue_size), 4),
+            'avg_wait_ms': round(wait_total / completed, 3) if completed else None
+        }
+    
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+decode_executor = DecodeExecutor.from_config()
+stats.register(STATS_GROUP, decode_executor.gauges)
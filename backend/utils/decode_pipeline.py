@@ -0,0 +1,241 @@
+import struct
+from config import Config
+from utils.decoders import decoder_chain
+from utils.lazy_import import lazy_import
+from utils.stats import stats
+from utils.metrics import count_error, stage_timer
+
+cv2 = lazy_import('cv2')
+
+STATS_GROUP = 'decode_pipeline'
+STAGES = ('region', 'reduced', 'grayscale', 'equalized', 'threshold', 'upscaled')
+
+# cv2 flags that decode straight to grayscale at 1/n resolution. For JPEG
+# libjpeg scales during the DCT, so the full image is never materialized.
+REDUCED_FLAGS = {
+    2: 'IMREAD_REDUCED_GRAYSCALE_2',
+    4: 'IMREAD_REDUCED_GRAYSCALE_4',
+    8: 'IMREAD_REDUCED_GRAYSCALE_8'
+}
+
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def read_image_size(image_buffer):
+    """Read (width, height) from an encoded image header without decoding it.
+
+    Supports PNG, JPEG, GIF, BMP and WebP. Returns None for anything else.
+    """
+    try:
+        data = memoryview(image_buffer).cast('B')
+        length = len(data)
+        
+        if data[:8] == b'\x89PNG\r\n\x1a\n':
+            return struct.unpack_from('>II', data, 16)
+        
+        if data[:2] == b'\xff\xd8':
+            offset = 2
+            while offset + 9 < length:
+                if data[offset] != 0xFF:
+                    return None
+                marker = data[offset + 1]
+                if marker == 0xFF:
+                    offset += 1
+                    continue
+                if marker in JPEG_SOF_MARKERS:
+                    height, width = struct.unpack_from('>HH', data, offset + 5)
+                    return width, height
+                if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                    offset += 2
+                    continue
+                segment_length, = struct.unpack_from('>H', data, offset + 2)
+                offset += 2 + segment_length
+            return None
+        
+        if data[:4] == b'GIF8':
+            return struct.unpack_from('<HH', data, 6)
+        
+        if data[:2] == b'BM':
+            width, height = struct.unpack_from('<ii', data, 18)
+            return width, abs(height)
+        
+        if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+            chunk = bytes(data[12:16])
+            if chunk == b'VP8 ':
+                width, height = struct.unpack_from('<HH', data, 26)
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b'VP8L':
+                b0, b1, b2, b3 = data[21:25]
+                width = 1 + (((b1 & 0x3F) << 8) | b0)
+                height = 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+                return width, height
+            if chunk == b'VP8X':
+                width = 1 + int.from_bytes(data[24:27], 'little')
+                height = 1 + int.from_bytes(data[27:30], 'little')
+                return width, height
+    
+    except (struct.error, TypeError, ValueError, IndexError):
+        return None
+    
+    return None
+
+class DecodePipeline:
+    """Staged QR decode that tries cheap passes before expensive ones.
+
+    1. reduced    - grayscale decode at 1/2, 1/4 or 1/8 resolution for
+                    large images (size read from the header)
+    2. grayscale  - full-resolution grayscale
+    3. equalized  - CLAHE contrast enhancement
+    4. threshold  - Otsu binarization of a lightly blurred image
+    5. upscaled   - 2x upscale for small images with tiny codes
+
+    The first stage that finds codes wins. Positions are always reported
+    in original-image coordinates.
+    """
+    
+    @staticmethod
+    def decode(image_array, decode_error="Could not decode image data"):
+        """Decode QR codes from an encoded image held in a uint8 array"""
+        stats.incr(STATS_GROUP, 'images')
+        
+        original_size = read_image_size(image_array)
+        factor = DecodePipeline._reduction_factor(original_size)
+        if factor > 1:
+            with stage_timer('image_decode'):
+                image = cv2.imdecode(image_array, getattr(cv2, REDUCED_FLAGS[factor]))
+            if image is not None:
+                # Not original_size / image.shape: imdecode applies EXIF
+                # orientation, so the header size may be the rotated one
+                results = DecodePipeline._run_stage('reduced', image, (factor, factor))
+                if results:
+                    return results, None
+        
+        with stage_timer('image_decode'):
+            image = cv2.imdecode(image_array, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            count_error('undecodable_image')
+            return None, decode_error
+        
+        results = DecodePipeline.decode_frame(image)
+        if results:
+            return results, None
+        
+        stats.incr(STATS_GROUP, 'misses')
+        count_error('no_code')
+        return None, "No QR codes found in image"
+    
+    @staticmethod
+    def decode_region(image_array, region, decode_error="Could not decode image data"):
+        """Decode a frame, trying only the region around a known code first.
+
+        region is (x, y, width, height) in frame coordinates; it is clipped
+        to the frame. On a miss the full-resolution passes run on the frame
+        that was already decoded. Returns (results, error, region_hit).
+        """
+        stats.incr(STATS_GROUP, 'images')
+        
+        with stage_timer('image_decode'):
+            image = cv2.imdecode(image_array, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            count_error('undecodable_image')
+            return None, decode_error, False
+        
+        if region:
+            x, y, width, height = region
+            left, top = max(0, int(x)), max(0, int(y))
+            right = min(image.shape[1], int(x + width))
+            bottom = min(image.shape[0], int(y + height))
+            if right > left and bottom > top:
+                crop = image[top:bottom, left:right]
+                results = DecodePipeline._run_stage('region', crop, (1, 1), (left, top))
+                if results:
+                    return results, None, True
+        
+        results = DecodePipeline.decode_frame(image)
+        if results:
+            return results, None, False
+        
+        stats.incr(STATS_GROUP, 'misses')
+        count_error('no_code')
+        return None, "No QR codes found in image", False
+    
+    @staticmethod
+    def decode_frame(image, offset=(0, 0)):
+        """Run the full-resolution passes on a grayscale array until one finds codes.
+
+        offset is added to every position, for crops of a larger image.
+        Returns a (possibly empty) list of results.
+        """
+        for stage, variant, scale in DecodePipeline._full_resolution_variants(image):
+            results = DecodePipeline._run_stage(stage, variant, scale, offset)
+            if results:
+                return results
+        return []
+    
+    @staticmethod
+    def _reduction_factor(original_size):
+        """Pick the largest reduction that keeps the long side above target"""
+        if not original_size:
+            return 1
+        
+        long_side = max(original_size)
+        for factor in (8, 4, 2):
+            if long_side / factor >= Config.DECODE_REDUCED_TARGET_SIDE:
+                return factor
+        return 1
+    
+    @staticmethod
+    def _full_resolution_variants(image):
+        """Lazily yield (stage, image, scale) for the full-resolution passes"""
+        yield 'grayscale', image, (1, 1)
+        
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        yield 'equalized', clahe.apply(image), (1, 1)
+        
+        blurred = cv2.GaussianBlur(image, (5, 5), 0)
+        _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        yield 'threshold', binary, (1, 1)
+        
+        if max(image.shape[:2]) <= Config.DECODE_UPSCALE_MAX_SIDE:
+            upscaled = cv2.resize(image, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+            yield 'upscaled', upscaled, (0.5, 0.5)
+    
+    @staticmethod
+    def _run_stage(stage, image, scale, offset=(0, 0)):
+        """Run the decoder backends on one variant and count the attempt"""
+        stats.incr(STATS_GROUP, f'{stage}_attempts')
+        found = decoder_chain.decode(image, stage)
+        if not found:
+            return []
+        
+        stats.incr(STATS_GROUP, f'{stage}_hits')
+        return [DecodePipeline._format_result(item, scale, offset) for item in found]
+    
+    @staticmethod
+    def _format_result(item, scale, offset=(0, 0)):
+        """Convert a backend result to the API schema in original coordinates"""
+        scale_x, scale_y = scale
+        offset_x, offset_y = offset
+        left, top, width, height = item['rect']
+        return {
+            'data': item['data'],
+            'type': item['type'],
+            'position': {
+                'x': int(round(left * scale_x)) + offset_x,
+                'y': int(round(top * scale_y)) + offset_y,
+                'width': int(round(width * scale_x)),
+                'height': int(round(height * scale_y))
+            }
+        }
+    
+    @staticmethod
+    def stage_stats():
+        """Per-stage attempts, hits and hit rate for this worker"""
+        result = {}
+        for stage in STAGES:
+            attempts = stats.get(STATS_GROUP, f'{stage}_attempts')
+            hits = stats.get(STATS_GROUP, f'{stage}_hits')
+            result[f'{stage}_hit_rate'] = round(hits / attempts, 4) if attempts else None
+        return result
+
+stats.register(STATS_GROUP, DecodePipeline.stage_stats)
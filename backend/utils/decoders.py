@@ -0,0 +1,221 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from config import Config
+from utils.fork_safe import per_process
+from utils.lazy_import import lazy_import
+from utils.stats import stats
+from utils.metrics import BACKEND_SECONDS, STAGE_SECONDS
+
+cv2 = lazy_import('cv2')
+pyzbar = lazy_import('pyzbar.pyzbar')
+
+STATS_GROUP = 'decoder_backends'
+DECODER_MODES = ('chain', 'race')
+
+class PyzbarBackend:
+    """ZBar via pyzbar; fast, and strong on clean or small codes"""
+    name = 'pyzbar'
+    stages = None
+    
+    @staticmethod
+    def available():
+        try:
+            return pyzbar.decode is not None
+        except ImportError:  # libzbar missing: the OpenCV backend still works
+            return False
+    
+    @staticmethod
+    def decode(image):
+        """Return [{'data', 'type', 'rect': (left, top, width, height)}]"""
+        return [
+            {
+                'data': qr.data.decode('utf-8'),
+                'type': qr.type,
+                'rect': (qr.rect.left, qr.rect.top, qr.rect.width, qr.rect.height)
+            }
+            for qr in pyzbar.decode(image)
+        ]
+
+class OpenCVBackend:
+    """cv2.QRCodeDetector multi-code detection.
+    
+    The detector binarizes internally, so the equalized and threshold
+    variants add little for it, and it costs several times more than ZBar
+    on large frames, so it only runs on the plain and cropped stages.
+    """
+    name = 'opencv'
+    stages = {'region', 'reduced', 'grayscale'}
+    _local = threading.local()
+    
+    @staticmethod
+    def available():
+        return hasattr(cv2, 'QRCodeDetector')
+    
+    @staticmethod
+    def decode(image):
+        """Return [{'data', 'type', 'rect': (left, top, width, height)}]"""
+        detector = getattr(OpenCVBackend._local, 'detector', None)
+        if detector is None:
+            detector = OpenCVBackend._local.detector = cv2.QRCodeDetector()
+        
+        found, texts, points, _ = detector.detectAndDecodeMulti(image)
+        if not found or points is None:
+            return []
+        
+        results = []
+        for text, corners in zip(texts, points):
+            if not text:
+                continue
+            xs = [float(x) for x, _ in corners]
+            ys = [float(y) for _, y in corners]
+            left, top = int(min(xs)), int(min(ys))
+            results.append({
+                'data': text,
+                'type': 'QRCODE',
+                'rect': (left, top, int(max(xs)) - left, int(max(ys)) - top)
+            })
+        return results
+
+BACKENDS = {
+    PyzbarBackend.name: PyzbarBackend,
+    OpenCVBackend.name: OpenCVBackend
+}
+
+def position_box(result):
+    """(left, top, width, height) of a formatted result's position"""
+    position = result['position']
+    return position['x'], position['y'], position['width'], position['height']
+
+def dedupe(results, box=lambda result: result['rect']):
+    """Drop repeats of a payload whose box overlaps an earlier one.
+    
+    box(result) returns (left, top, width, height). The same payload at a
+    clearly different position (two copies of a code in one image) is kept.
+    """
+    kept = []
+    for result in results:
+        left, top, width, height = box(result)
+        center_x, center_y = left + width / 2, top + height / 2
+        duplicate = False
+        for other in kept:
+            other_left, other_top, other_width, other_height = box(other)
+            if other['data'] == result['data'] and \
+                    other_left <= center_x <= other_left + other_width and \
+                    other_top <= center_y <= other_top + other_height:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(result)
+    return kept
+
+class DecoderChain:
+    """Runs the configured decoder backends on one image variant.
+    
+    'chain' tries backends in order and stops at the first that finds a
+    code; 'race' starts every backend on a small thread pool (ZBar and
+    OpenCV both release the GIL) and returns the first non-empty result,
+    trading extra CPU for latency. Each backend call is timed into a
+    per-backend latency histogram, with attempts, hits and errors, so
+    the default order can be chosen from /api/stats.
+    """
+    
+    def __init__(self, names, mode='chain'):
+        if mode not in DECODER_MODES:
+            raise ValueError(f'Unknown decoder mode: {mode}')
+        
+        unknown = [name for name in names if name not in BACKENDS]
+        if unknown:
+            raise ValueError(f'Unknown decoder backend: {", ".join(unknown)}')
+        
+        self.names = list(names)
+        self.mode = mode
+        self._backends = None
+        self._pool = per_process(self._new_pool)
+    
+    @classmethod
+    def from_config(cls):
+        return cls(Config.DECODER_BACKENDS, Config.DECODER_MODE)
+    
+    @property
+    def backends(self):
+        """Configured backends whose library loads, checked on first use.
+        
+        Checking imports the decoder libraries, so it is deferred until the
+        first decode (or warmup) rather than done at import time.
+        """
+        if self._backends is None:
+            backends = [BACKENDS[name] for name in self.names if BACKENDS[name].available()]
+            if not backends:
+                raise ValueError('No decoder backend is available')
+            self._backends = backends
+        return self._backends
+    
+    def decode(self, image, stage=None):
+        """Decode one variant; returns deduplicated results of one backend"""
+        backends = [b for b in self.backends if b.stages is None or stage in b.stages]
+        if self.mode == 'race' and len(backends) > 1:
+            return self._race(backends, image)
+        
+        for backend in backends:
+            results = self._timed(backend, image)
+            if results:
+                return dedupe(results)
+        return []
+    
+    def _race(self, backends, image):
+        pending = {self._get_pool().submit(self._timed, backend, image): backend for backend in backends}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                backend = pending.pop(future)
+                results = future.result()
+                if results:
+                    # Losers keep running in the pool; their timings still count
+                    stats.incr(STATS_GROUP, f'{backend.name}_wins')
+                    return dedupe(results)
+        return []
+    
+    def _get_pool(self):
+        return self._pool.get()
+    
+    def _new_pool(self):
+        # Imported here: decode_executor imports this module via warmup
+        from utils.decode_executor import decode_thread_count
+        
+        # Tiles and frames race concurrently on every decode thread,
+        # so one race per thread must not queue behind another's losers
+        return ThreadPoolExecutor(max_workers=decode_thread_count() * len(self.backends),
+                                  thread_name_prefix='decoder')
+    
+    @staticmethod
+    def _timed(backend, image):
+        start = time.perf_counter()
+        try:
+            results = backend.decode(image)
+        except Exception:
+            stats.incr(STATS_GROUP, f'{backend.name}_errors')
+            results = []
+        
+        elapsed = time.perf_counter() - start
+        stats.observe(STATS_GROUP, f'{backend.name}_ms', elapsed * 1000)
+        STAGE_SECONDS.labels('barcode_decode').observe(elapsed)
+        BACKEND_SECONDS.labels(backend.name, 'true' if results else 'false').observe(elapsed)
+        stats.incr(STATS_GROUP, f'{backend.name}_attempts')
+        if results:
+            stats.incr(STATS_GROUP, f'{backend.name}_hits')
+        return results
+    
+    def backend_stats(self):
+        """Hit rate and mean latency per backend"""
+        result = {'mode': self.mode, 'order': [b.name for b in self.backends]}
+        for backend in self.backends:
+            attempts = stats.get(STATS_GROUP, f'{backend.name}_attempts')
+            hits = stats.get(STATS_GROUP, f'{backend.name}_hits')
+            total_ms = stats.get(STATS_GROUP, f'{backend.name}_ms_sum')
+            result[f'{backend.name}_hit_rate'] = round(hits / attempts, 4) if attempts else None
+            result[f'{backend.name}_mean_ms'] = round(total_ms / attempts, 3) if attempts else None
+        return result
+
+decoder_chain = DecoderChain.from_config()
+stats.register(STATS_GROUP, decoder_chain.backend_stats)
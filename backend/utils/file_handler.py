@@ -1,8 +1,39 @@
+import io
 import os
+import tarfile
 import uuid
+import zipfile
+from contextlib import contextmanager
+from flask import Request
 from werkzeug.utils import secure_filename
 from config import Config
 
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz')
+
+# Endpoints whose bodies may exceed MAX_CONTENT_LENGTH; they are spooled to
+# temporary files by Werkzeug (or read as a stream) instead of held in memory
+BATCH_ENDPOINTS = {'qr.scan_qr_batch', 'qr.generate_qr_batch', 'history.import_history'}
+
+class InMemoryRequest(Request):
+    """Request that keeps multipart uploads in memory.
+
+    Werkzeug spools uploads over 500KB to a temporary file. Uploads are
+    already capped by MAX_CONTENT_LENGTH, so keep them in a BytesIO whose
+    buffer can be handed straight to the decoder.
+    """
+    @property
+    def max_content_length(self):
+        if self.endpoint in BATCH_ENDPOINTS:
+            return Config.BATCH_MAX_CONTENT_LENGTH
+        return super().max_content_length
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if Config.SCAN_UPLOAD_TO_DISK or self.endpoint in BATCH_ENDPOINTS:
+            return super()._get_file_stream(
+                total_content_length, content_type, filename, content_length
+            )
+        return io.BytesIO()
+
 class FileHandler:
     @staticmethod
     def allowed_file(filename):
@@ -25,6 +56,83 @@ class FileHandler:
         
         return None, None
     
+    @staticmethod
+    @contextmanager
+    def upload_buffer(file):
+        """Yield a memoryview of an uploaded file's contents.
+
+        Uploads held in a BytesIO (see InMemoryRequest) are exposed without
+        copying; any other stream is read into memory once.
+        """
+        stream = file.stream
+        if isinstance(stream, io.BytesIO):
+            view = stream.getbuffer()
+        else:
+            stream.seek(0)
+            view = memoryview(stream.read())
+        
+        try:
+            yield view
+        finally:
+            view.release()
+    
+    @staticmethod
+    def is_archive(filename):
+        """Check if a file is a zip or tar archive"""
+        return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+    
+    @staticmethod
+    def iter_batch_images(files):
+        """Yield (filename, image_bytes, error) for each image in a batch upload.
+
+        Archives are expanded member by member (non-image members are
+        skipped). Each image is read with a MAX_CONTENT_LENGTH cap, and
+        iteration stops after BATCH_MAX_FILES images.
+        """
+        count = 0
+        for file in files:
+            if FileHandler.is_archive(file.filename):
+                members = FileHandler._iter_archive_members(file)
+            else:
+                if not FileHandler.allowed_file(file.filename):
+                    yield file.filename, None, 'File type not allowed'
+                    continue
+                members = [(file.filename, file.stream.read)]
+            
+            for name, read in members:
+                if count >= Config.BATCH_MAX_FILES:
+                    yield name, None, f'Batch limit of {Config.BATCH_MAX_FILES} images reached'
+                    return
+                count += 1
+                
+                data = read(Config.MAX_CONTENT_LENGTH + 1)
+                if len(data) > Config.MAX_CONTENT_LENGTH:
+                    yield name, None, 'File too large'
+                    continue
+                
+                yield name, data, None
+    
+    @staticmethod
+    def _iter_archive_members(file):
+        """Yield (name, read) for image members of a zip or tar upload"""
+        if file.filename.lower().endswith('.zip'):
+            archive = zipfile.ZipFile(file.stream)
+            for info in archive.infolist():
+                if info.is_dir() or not FileHandler.allowed_file(info.filename):
+                    continue
+                yield info.filename, lambda limit, info=info: FileHandler._read_zip_member(archive, info, limit)
+        else:
+            archive = tarfile.open(fileobj=file.stream, mode='r:*')
+            for member in archive:
+                if not member.isfile() or not FileHandler.allowed_file(member.name):
+                    continue
+                yield member.name, archive.extractfile(member).read
+    
+    @staticmethod
+    def _read_zip_member(archive, info, limit):
+        with archive.open(info) as member:
+            return member.read(limit)
+    
     @staticmethod
     def delete_file(file_path):
         """Delete a file from the filesystem"""
@@ -47,4 +155,4 @@ class FileHandler:
                 'exists': True
             }
         except Exception:
-            return {'exists': False}
\ No newline at end of file
+            return {'exists': False}
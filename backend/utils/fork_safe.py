@@ -0,0 +1,38 @@
+import os
+import threading
+
+class PerProcess:
+    """A lazily created object that each process creates for itself.
+    
+    Threads do not survive fork: a Gunicorn worker (or decode process)
+    inherits its parent's pools and queues but none of the threads behind
+    them. get() calls factory() on first use in every process and returns
+    that process's object from then on.
+    """
+    
+    def __init__(self, factory):
+        self.factory = factory
+        self._lock = threading.Lock()
+        self._value = None
+        self._pid = None
+    
+    def get(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._value = self.factory()
+                self._pid = os.getpid()
+            return self._value
+    
+    def peek(self):
+        """This process's object, or None if it has not been created"""
+        return self._value if self._pid == os.getpid() else None
+    
+    def reset(self):
+        """Forget this process's object; the next get() creates a new one"""
+        with self._lock:
+            self._value = None
+            self._pid = None
+
+def per_process(factory):
+    """Wrap factory so that get() returns one object per process"""
+    return PerProcess(factory)
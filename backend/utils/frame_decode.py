@@ -0,0 +1,128 @@
+import io
+from concurrent.futures import FIRST_COMPLETED, wait
+from config import Config
+from utils.decode_executor import decode_thread_count, decode_threads
+from utils.decode_pipeline import DecodePipeline
+from utils.decoders import dedupe, position_box
+from utils.lazy_import import lazy_import
+from utils.stats import stats
+from utils.metrics import count_error, stage_timer
+
+np = lazy_import('numpy')
+Image = lazy_import('PIL.Image')
+ImageSequence = lazy_import('PIL.ImageSequence')
+
+STATS_GROUP = 'frame_decode'
+
+def is_multiframe(image_buffer):
+    """True for containers that may hold several frames (header check only).
+    
+    GIF and TIFF always go through Pillow (OpenCV cannot read GIF at all);
+    WebP only when its VP8X header has the animation flag set.
+    """
+    head = bytes(memoryview(image_buffer).cast('B')[:21])
+    if head[:4] == b'GIF8' or head[:4] in (b'II*\x00', b'MM\x00*'):
+        return True
+    if head[:4] == b'RIFF' and head[8:16] == b'WEBPVP8X':
+        return len(head) > 20 and bool(head[20] & 0x02)
+    return False
+
+def frame_limits(max_frames=None, max_pixels=None, max_codes=None):
+    """(max_frames, max_pixels, max_codes) with request values capped by config.
+    
+    max_codes 0 means decode every frame within the caps.
+    """
+    return (
+        min(max_frames or Config.DECODE_MAX_FRAMES, Config.DECODE_MAX_FRAMES),
+        min(max_pixels or Config.DECODE_MAX_FRAME_PIXELS, Config.DECODE_MAX_FRAME_PIXELS),
+        max(0, max_codes or 0)
+    )
+
+def iter_frames(image_buffer, max_frames, max_pixels):
+    """Lazily yield (index, grayscale array) per frame, within the caps.
+    
+    Only the current frame is held in memory; Pillow composites GIF frames
+    onto the canvas as it seeks.
+    """
+    with Image.open(io.BytesIO(image_buffer)) as image:
+        pixels = 0
+        for index, frame in enumerate(ImageSequence.Iterator(image)):
+            if index >= max_frames:
+                stats.incr(STATS_GROUP, 'frame_cap_hits')
+                return
+            pixels += frame.width * frame.height
+            if pixels > max_pixels:
+                stats.incr(STATS_GROUP, 'pixel_cap_hits')
+                return
+            with stage_timer('image_decode'):
+                gray = np.asarray(frame.convert('L'))
+            yield index, gray
+
+class FrameDecoder:
+    """Decode every frame of an animated or multi-page image.
+    
+    Frames are read one at a time and decoded on the decode thread pool
+    with a small window in flight, so memory stays bounded by the window
+    rather than the frame count. Decoding stops early once max_codes
+    distinct codes are found. Each result carries its frame index; a code
+    visible in several frames at the same place is reported once, for the
+    earliest frame.
+    """
+    
+    @staticmethod
+    def decode(image_buffer, limits=None, decode_error="Could not decode image data"):
+        """Returns (results, error) like DecodePipeline.decode"""
+        max_frames, max_pixels, max_codes = limits or frame_limits()
+        stats.incr(STATS_GROUP, 'images')
+        
+        pool = decode_threads()
+        window = decode_thread_count() * 2
+        pending = {}
+        found = []
+        frames = iter_frames(image_buffer, max_frames, max_pixels)
+        try:
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < window:
+                    try:
+                        index, frame = next(frames)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending[pool.submit(DecodePipeline.decode_frame, frame)] = index
+                
+                if not pending:
+                    break
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    stats.incr(STATS_GROUP, 'frames')
+                    found.extend(dict(result, frame=index) for result in future.result())
+                
+                if max_codes and len(FrameDecoder._merge(found)) >= max_codes:
+                    stats.incr(STATS_GROUP, 'early_exits')
+                    break
+        
+        except (Image.UnidentifiedImageError, OSError, ValueError):
+            if not found:
+                count_error('undecodable_image')
+                return None, decode_error
+        
+        finally:
+            for future in pending:
+                future.cancel()
+            frames.close()
+        
+        results = FrameDecoder._merge(found)
+        if max_codes:
+            results = results[:max_codes]
+        if not results:
+            count_error('no_code')
+            return None, "No QR codes found in image"
+        return results, None
+    
+    @staticmethod
+    def _merge(found):
+        found = sorted(found, key=lambda result: result['frame'])
+        return dedupe(found, box=position_box)
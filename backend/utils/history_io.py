@@ -0,0 +1,129 @@
+import csv
+import gzip
+import io
+import json
+import zlib
+from models.qr_history import QRHistory
+
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+CSV_COLUMNS = ['id', 'type', 'content', 'method', 'content_type', 'timestamp', 'data']
+RECORD_TYPES = {'scan', 'generate'}
+GZIP_MAGIC = b'\x1f\x8b'
+
+def export_lines(records, output_format):
+    """Serialize records (data as raw JSON) to NDJSON or CSV text chunks"""
+    if output_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        for record in records:
+            data = json.loads(record['data']) if record['data'] else {}
+            writer.writerow([
+                record['id'],
+                record['type'],
+                record['content'],
+                data.get('method', ''),
+                (data.get('qr_info') or {}).get('type', ''),
+                record['timestamp'],
+                record['data'] or ''
+            ])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+        return
+    
+    for record in records:
+        yield json.dumps({
+            'id': record['id'],
+            'type': record['type'],
+            'content': record['content'],
+            'data': json.loads(record['data']) if record['data'] else None,
+            'timestamp': record['timestamp']
+        }) + '\n'
+
+def gzip_chunks(chunks, flush_bytes=64 * 1024):
+    """Gzip a stream of text chunks, emitting compressed output incrementally"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    pending = 0
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        pending += len(data)
+        out = compressor.compress(data)
+        if pending >= flush_bytes:
+            out += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if out:
+            yield out
+    yield compressor.flush()
+
+def batch_text_chunks(chunks, size=64 * 1024):
+    """Join small text chunks so each response write carries ~size bytes"""
+    parts = []
+    pending = 0
+    for chunk in chunks:
+        parts.append(chunk)
+        pending += len(chunk)
+        if pending >= size:
+            yield ''.join(parts)
+            parts = []
+            pending = 0
+    if parts:
+        yield ''.join(parts)
+
+def open_import_stream(stream, compressed=False):
+    """Wrap a binary request stream as text, gunzipping when needed"""
+    buffered = io.BufferedReader(stream) if not hasattr(stream, 'peek') else stream
+    if compressed or buffered.peek(2)[:2] == GZIP_MAGIC:
+        buffered = gzip.GzipFile(fileobj=buffered, mode='rb')
+    return io.TextIOWrapper(buffered, encoding='utf-8', newline='')
+
+def iter_import_records(text_stream, input_format, report, max_errors=100):
+    """Yield (record_type, content, data, timestamp) from an NDJSON or CSV export.
+
+    Invalid rows are skipped: report['skipped'] counts them and the first
+    max_errors are described in report['errors'] as {'line', 'error'}.
+    Ids in the export are not reused; rows get new ids on insert.
+    """
+    if input_format == 'csv':
+        rows = enumerate(csv.DictReader(text_stream), start=2)
+    else:
+        rows = (
+            (number, line) for number, line in enumerate(text_stream, start=1)
+            if line.strip()
+        )
+    
+    for number, row in rows:
+        try:
+            if input_format == 'csv':
+                data = json.loads(row['data']) if row.get('data') else None
+                row = {**row, 'data': data}
+            else:
+                row = json.loads(row)
+            record = _import_record(row)
+        except (ValueError, TypeError, AttributeError) as e:
+            report['skipped'] += 1
+            if len(report['errors']) < max_errors:
+                report['errors'].append({'line': number, 'error': str(e)})
+            continue
+        yield record
+
+def _import_record(row):
+    """Validate one exported row"""
+    if not isinstance(row, dict):
+        raise ValueError('Row must be an object')
+    record_type = row.get('type')
+    if record_type not in RECORD_TYPES:
+        raise ValueError(f'Invalid type: {record_type}')
+    content = row.get('content')
+    if not isinstance(content, str) or not content:
+        raise ValueError('Content cannot be empty')
+    data = row.get('data')
+    if data is not None and not isinstance(data, dict):
+        raise ValueError('Data must be an object')
+    timestamp = row.get('timestamp') or None
+    if timestamp is not None:
+        if not isinstance(timestamp, str):
+            raise ValueError('Invalid timestamp')
+        timestamp = QRHistory.normalize_time(timestamp)
+    return record_type, content, data, timestamp
@@ -0,0 +1,34 @@
+import importlib
+import types
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that is imported on first attribute access.
+    
+    Lets modules name heavy codec libraries (OpenCV, NumPy, Pillow, ZBar,
+    qrcode) at the top as usual without paying for the import until a
+    request needs them; warmup.warm_codecs() imports them up front. The
+    stand-in is an ordinary module attribute, so it can be patched.
+    """
+    
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_lazy_module'] = None
+    
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            module = self.__dict__['_lazy_module'] = importlib.import_module(self.__name__)
+        return module
+    
+    def __getattr__(self, attr):
+        value = getattr(self._load(), attr)
+        # Later lookups find it directly and skip __getattr__
+        self.__dict__[attr] = value
+        return value
+    
+    def __dir__(self):
+        return dir(self._load())
+
+def lazy_import(name):
+    """Return a LazyModule for the dotted module name"""
+    return LazyModule(name)
@@ -0,0 +1,154 @@
+import os
+import time
+from flask import g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from utils.stats import stats
+
+# Seconds; stages range from sub-millisecond SQLite reads to multi-second tiled decodes
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CODE_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# HTTP status -> error category; decode-level categories are counted where they happen
+STATUS_CATEGORIES = {
+    400: 'bad_request',
+    404: 'not_found',
+    413: 'too_large',
+    415: 'unsupported_media_type',
+    503: 'saturated',
+    504: 'timeout'
+}
+
+REQUEST_SECONDS = Histogram(
+    'qr_http_request_duration_seconds', 'HTTP request latency',
+    ['endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    'qr_stage_duration_seconds', 'Time spent in each processing stage',
+    ['stage'], buckets=LATENCY_BUCKETS
+)
+BACKEND_SECONDS = Histogram(
+    'qr_decoder_backend_duration_seconds', 'Time per decoder backend call',
+    ['backend', 'found'], buckets=LATENCY_BUCKETS
+)
+SQLITE_SECONDS = Histogram(
+    'qr_sqlite_duration_seconds', 'SQLite time per history operation',
+    ['operation'], buckets=LATENCY_BUCKETS
+)
+CODES_PER_IMAGE = Histogram(
+    'qr_codes_per_image', 'QR codes found per scanned image',
+    ['endpoint'], buckets=CODE_COUNT_BUCKETS
+)
+BYTES_IN = Counter('qr_http_request_bytes', 'Request body bytes received', ['endpoint'])
+BYTES_OUT = Counter('qr_http_response_bytes', 'Response body bytes sent', ['endpoint'])
+ERRORS = Counter('qr_errors', 'Errors by category', ['category'])
+# The /api/stats registry, copied in by sync_stats(): raw counters summed
+# over the pod's live workers, derived values (rates, means) the highest
+WORKER_STATS = Gauge('qr_worker_stat', 'Runtime counters from /api/stats',
+                     ['group', 'name'], multiprocess_mode='livesum')
+WORKER_DERIVED = Gauge('qr_worker_derived', 'Derived runtime values from /api/stats',
+                       ['group', 'name'], multiprocess_mode='livemax')
+# Seconds between copies of a worker's registry into the gauges above
+STATS_SYNC_INTERVAL = 1.0
+# Summed over the pod's live web workers: decode saturation for the HPA
+DECODE_IN_FLIGHT = Gauge('qr_decode_in_flight', 'Decode jobs running or queued',
+                         multiprocess_mode='livesum')
+DECODE_CAPACITY = Gauge('qr_decode_capacity', 'Decode jobs accepted before shedding',
+                        multiprocess_mode='livesum')
+
+def stage_timer(stage):
+    """Context manager / decorator timing one processing stage"""
+    return STAGE_SECONDS.labels(stage).time()
+
+def sqlite_timer(operation):
+    """Context manager / decorator timing one history operation"""
+    return SQLITE_SECONDS.labels(operation).time()
+
+def count_error(category):
+    ERRORS.labels(category).inc()
+
+def status_category(status):
+    """Error category for an HTTP status, or None for successes"""
+    if status >= 500 and status not in STATUS_CATEGORIES:
+        return 'server_error'
+    return STATUS_CATEGORIES.get(status)
+
+_last_sync = 0.0
+
+def sync_stats(force=False):
+    """Copy this worker's stats registry into the multiprocess gauges.
+    
+    Runs at most once per STATS_SYNC_INTERVAL from request handling, so a
+    scrape served by any worker sees every worker's recent values.
+    """
+    global _last_sync
+    now = time.monotonic()
+    if not force and now - _last_sync < STATS_SYNC_INTERVAL:
+        return
+    _last_sync = now
+    
+    for gauge, groups in ((WORKER_STATS, stats.counters()), (WORKER_DERIVED, stats.derived())):
+        for group, values in groups.items():
+            for name, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    gauge.labels(group, name).set(value)
+
+def render_metrics():
+    """Prometheus text exposition for every process on this pod.
+    
+    With PROMETHEUS_MULTIPROC_DIR set (under Gunicorn) samples written by
+    all web workers and decode processes are aggregated from that
+    directory; otherwise the in-process registry is used.
+    """
+    sync_stats(force=True)
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def init_app(app):
+    """Time every request and count request/response bytes and errors"""
+    
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+    
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('request_started', None)
+        # WebSocket scan streams last for the whole session; not a request latency
+        if started is None or request.headers.get('Upgrade', '').lower() == 'websocket':
+            return response
+        
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.labels(endpoint, request.method, str(response.status_code)).observe(
+            time.perf_counter() - started
+        )
+        if request.content_length:
+            BYTES_IN.labels(endpoint).inc(request.content_length)
+        if response.content_length:
+            BYTES_OUT.labels(endpoint).inc(response.content_length)
+        elif response.is_streamed:
+            # Exports and batch ZIP/PDF/NDJSON have no length up front
+            response.response = _count_streamed(response.response, BYTES_OUT.labels(endpoint))
+        
+        category = status_category(response.status_code)
+        if category:
+            count_error(category)
+        sync_stats()
+        return response
+
+def _count_streamed(iterable, counter):
+    """Yield a response body unchanged, counting bytes as they are sent"""
+    try:
+        for chunk in iterable:
+            counter.inc(len(chunk))
+            yield chunk
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
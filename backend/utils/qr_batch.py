@@ -0,0 +1,278 @@
+import csv
+import io
+import json
+import zipfile
+import zlib
+from werkzeug.utils import secure_filename
+from config import Config
+from utils.qr_renderer import QRRenderer
+
+BATCH_OUTPUTS = {'zip': 'application/zip', 'pdf': 'application/pdf'}
+IMAGE_EXTENSIONS = {'png': 'png', 'svg': 'svg'}
+
+def normalize_item(item, defaults, index, filenames=None):
+    """Merge one batch item with shared defaults into a render spec.
+    
+    Pass the same filenames set for every item of a batch: a name already
+    used gets a -1, -2, ... suffix so no archive entry is overwritten.
+    """
+    if isinstance(item, str):
+        item = {'text': item}
+    if not isinstance(item, dict):
+        return {'index': index, 'error': 'Item must be a string or object'}
+    
+    text = str(item.get('text', '')).strip()
+    if not text:
+        return {'index': index, 'error': 'Text cannot be empty'}
+    if len(text) > Config.GENERATE_BATCH_MAX_TEXT:
+        return {'index': index, 'error': f'Text longer than {Config.GENERATE_BATCH_MAX_TEXT} characters'}
+    
+    size = item.get('size', defaults.get('size', [300, 300]))
+    if isinstance(size, (list, tuple)) and len(size) == 2:
+        size = (int(size[0]), int(size[1]))
+    else:
+        size = (300, 300)
+    if not all(0 < side <= Config.GENERATE_BATCH_MAX_SIZE for side in size):
+        return {'index': index, 'error': f'Size must be 1-{Config.GENERATE_BATCH_MAX_SIZE} pixels per side'}
+    
+    output_format = item.get('format', defaults.get('format', 'png'))
+    if output_format not in IMAGE_EXTENSIONS:
+        return {'index': index, 'error': f'Unsupported output format: {output_format}'}
+    
+    # Client names become archive entry names: no paths (zip slip)
+    filename = secure_filename(str(item.get('filename') or '')) or \
+        f'{index:06d}.{IMAGE_EXTENSIONS[output_format]}'
+    if filenames is not None:
+        filename = _unique_filename(filename, filenames)
+    
+    return {
+        'index': index,
+        'text': text,
+        'size': size,
+        'border': int(item.get('border', defaults.get('border', 4))),
+        'error_correction': item.get('errorCorrection', defaults.get('errorCorrection', 'M')),
+        'format': output_format,
+        'filename': filename
+    }
+
+def _unique_filename(filename, filenames):
+    stem, dot, extension = filename.rpartition('.')
+    if not dot:
+        stem, extension = filename, ''
+    
+    candidate = filename
+    counter = 0
+    while candidate in filenames:
+        counter += 1
+        candidate = f'{stem}-{counter}{dot}{extension}'
+    filenames.add(candidate)
+    return candidate
+
+def iter_uploaded_items(file):
+    """Lazily read batch items from an uploaded CSV or NDJSON file.
+
+    CSV needs a header row with a 'text' column; 'size' may be given as
+    'WIDTHxHEIGHT'. NDJSON lines are JSON strings or objects.
+    """
+    stream = io.TextIOWrapper(file.stream, encoding='utf-8', newline='')
+    
+    if file.filename.lower().endswith('.csv'):
+        for row in csv.DictReader(stream):
+            item = {k: v for k, v in row.items() if v not in (None, '')}
+            if 'size' in item:
+                item['size'] = item['size'].lower().split('x')
+            yield item
+    else:
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Reported as an invalid item rather than aborting the batch
+                yield None
+
+def render_chunk(specs, output):
+    """Render a chunk of specs; runs on the CPU process pool.
+
+    For ZIP output each item is the encoded PNG or SVG, rendered directly
+    rather than through generate_qr_code so a large batch does not evict
+    the shared image cache; for PDF it is the list of dark module runs,
+    which the PDF writer draws as vector rectangles.
+    """
+    rendered = []
+    for spec in specs:
+        if 'error' in spec:
+            rendered.append((spec, None, spec['error']))
+            continue
+        
+        try:
+            matrix = QRRenderer.build_matrix(spec['text'], spec['border'], spec['error_correction'])
+            if output == 'pdf':
+                payload = (matrix.shape[0], QRRenderer.dark_runs(matrix))
+            elif spec['format'] == 'svg':
+                payload = QRRenderer.render_svg(matrix, spec['size'])
+            else:
+                payload = QRRenderer.render_png(matrix, spec['size'])
+            error = None
+        except Exception as e:
+            payload, error = None, f"Error generating QR code: {str(e)}"
+        
+        rendered.append((spec, payload, error))
+    return rendered
+
+class _StreamSink:
+    """Write-only file object that hands written bytes back to a generator"""
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self._offset
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+class ZipStreamWriter:
+    """Build a ZIP archive incrementally without a seekable output.
+
+    zipfile falls back to data descriptors when the file object cannot
+    seek, so every entry can be flushed to the client as soon as it is
+    written.
+    """
+    def __init__(self):
+        self._sink = _StreamSink()
+        self._zip = zipfile.ZipFile(self._sink, 'w')
+    
+    def add(self, spec, payload):
+        # PNG is already compressed; SVG text deflates well
+        compress_type = zipfile.ZIP_DEFLATED if spec['format'] == 'svg' else zipfile.ZIP_STORED
+        self._zip.writestr(spec['filename'], payload, compress_type=compress_type)
+        return self._sink.drain()
+    
+    def add_errors(self, errors):
+        if errors:
+            lines = ''.join(json.dumps(error) + '\n' for error in errors)
+            self._zip.writestr('errors.ndjson', lines, compress_type=zipfile.ZIP_DEFLATED)
+        return self._sink.drain()
+    
+    def close(self):
+        self._zip.close()
+        return self._sink.drain()
+
+class PdfStreamWriter:
+    """Write a multi-page label-sheet PDF incrementally.
+
+    Codes are laid out on a columns x rows grid per A4 page and drawn as
+    vector rectangles, so pages stay small and crisp at any print size.
+    Each page is emitted as soon as it is full; only the object offsets
+    are kept until the cross-reference table is written at the end.
+    """
+    PAGE_WIDTH = 595.28
+    PAGE_HEIGHT = 841.89
+    MARGIN = 36
+    GUTTER = 12
+    
+    def __init__(self, columns=4, rows=5):
+        self.columns = columns
+        self.rows = rows
+        self._offset = 0
+        self._offsets = {}
+        self._page_ids = []
+        self._next_id = 3  # 1 = catalog, 2 = page tree
+        self._cell = 0
+        self._content = []
+        self._header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    
+    def _object(self, object_id, body):
+        data = f'{object_id} 0 obj\n'.encode() + body + b'\nendobj\n'
+        self._offsets[object_id] = self._offset
+        self._offset += len(data)
+        return data
+    
+    def _start(self):
+        if self._header is None:
+            return b''
+        data, self._header = self._header, None
+        self._offset += len(data)
+        return data
+    
+    def add(self, spec, payload):
+        modules, runs = payload
+        out = self._start()
+        
+        cell_width = (self.PAGE_WIDTH - 2 * self.MARGIN) / self.columns
+        cell_height = (self.PAGE_HEIGHT - 2 * self.MARGIN) / self.rows
+        side = min(cell_width, cell_height) - self.GUTTER
+        column = self._cell % self.columns
+        row = self._cell // self.columns
+        x = self.MARGIN + column * cell_width + (cell_width - side) / 2
+        top = self.PAGE_HEIGHT - self.MARGIN - row * cell_height - (cell_height - side) / 2
+        scale = side / modules
+        
+        # Module space: origin at the code's top-left corner, y pointing down
+        rects = ' '.join(f'{rx} {ry} {length} 1 re' for rx, ry, length in runs)
+        self._content.append(f'q {scale:.4f} 0 0 {-scale:.4f} {x:.2f} {top:.2f} cm {rects} f Q')
+        
+        self._cell += 1
+        if self._cell == self.columns * self.rows:
+            out += self._flush_page()
+        return out
+    
+    def add_errors(self, errors):
+        return b''
+    
+    def _flush_page(self):
+        content = zlib.compress('\n'.join(self._content).encode('ascii'))
+        self._content = []
+        self._cell = 0
+        
+        page_id, content_id = self._next_id, self._next_id + 1
+        self._next_id += 2
+        self._page_ids.append(page_id)
+        
+        out = self._object(page_id, (
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {self.PAGE_WIDTH} {self.PAGE_HEIGHT}] '
+            f'/Contents {content_id} 0 R >>'
+        ).encode())
+        out += self._object(content_id, (
+            f'<< /Length {len(content)} /Filter /FlateDecode >>\nstream\n'.encode()
+            + content + b'\nendstream'
+        ))
+        return out
+    
+    def close(self):
+        out = self._start()
+        if self._content or not self._page_ids:
+            out += self._flush_page()
+        
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self._page_ids)
+        out += self._object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        out += self._object(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>'.encode())
+        
+        xref_offset = self._offset
+        size = self._next_id
+        xref = [f'xref\n0 {size}\n', '0000000000 65535 f \n']
+        xref += [f'{self._offsets[i]:010d} 00000 n \n' for i in range(1, size)]
+        out += ''.join(xref).encode()
+        out += f'trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n'.encode()
+        return out
+
+def make_writer(output, options):
+    """Create the streaming writer for a batch output type"""
+    if output == 'pdf':
+        return PdfStreamWriter(
+            columns=max(1, int(options.get('columns', 4))),
+            rows=max(1, int(options.get('rows', 5)))
+        )
+    return ZipStreamWriter()
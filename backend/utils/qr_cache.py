@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from config import Config
+from utils.stats import stats
+
+STATS_GROUP = 'qr_image_cache'
+
+class QRImageCache:
+    """Two-tier cache for generated QR images.
+
+    Tier 1 is an in-process LRU bounded by total value bytes. Tier 2 is a
+    content-addressed directory (one file per key, sharded by key prefix)
+    that every Gunicorn worker on the pod reads and writes. Disk writes go
+    through a temp file and os.replace, so readers never see partial
+    entries. The disk tier is pruned oldest-first once it exceeds its
+    byte budget.
+    """
+    
+    PRUNE_EVERY = 256
+    
+    def __init__(self, max_bytes, directory=None, disk_max_bytes=0):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._puts = 0
+    
+    @classmethod
+    def from_config(cls):
+        return cls(
+            max_bytes=Config.QR_CACHE_MAX_BYTES,
+            directory=Config.QR_CACHE_DIR or None,
+            disk_max_bytes=Config.QR_CACHE_DISK_MAX_BYTES
+        )
+    
+    @staticmethod
+    def make_key(text, size, border, error_correction, output_format):
+        """Content address for one rendering of a QR code"""
+        payload = json.dumps(
+            [text, list(size), border, error_correction, output_format],
+            separators=(',', ':'),
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key):
+        """Return cached bytes for key, or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        
+        if value is not None:
+            stats.incr(STATS_GROUP, 'memory_hits')
+            return value
+        
+        value = self._read_disk(key)
+        if value is not None:
+            stats.incr(STATS_GROUP, 'disk_hits')
+            self._remember(key, value)
+            return value
+        
+        stats.incr(STATS_GROUP, 'misses')
+        return None
+    
+    def put(self, key, value):
+        """Store bytes under key in both tiers"""
+        self._remember(key, value)
+        self._write_disk(key, value)
+    
+    def _remember(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            
+            self._entries[key] = value
+            self._bytes += len(value)
+            
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                stats.incr(STATS_GROUP, 'evictions')
+    
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+    
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def _write_disk(self, key, value):
+        if not self.directory:
+            return
+        
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing QR cache entry {key}: {e}")
+            return
+        
+        with self._lock:
+            self._puts += 1
+            should_prune = self.disk_max_bytes and self._puts % self.PRUNE_EVERY == 0
+        if should_prune:
+            self.prune_disk()
+    
+    def prune_disk(self):
+        """Delete the oldest disk entries until the tier fits its budget"""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                stats.incr(STATS_GROUP, 'disk_evictions')
+            except OSError:
+                pass
+    
+    def gauges(self):
+        """Current size of the in-process tier"""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes}
+
+qr_image_cache = QRImageCache.from_config()
+stats.register(STATS_GROUP, qr_image_cache.gauges)
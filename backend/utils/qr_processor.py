@@ -1,129 +1,165 @@
-import cv2
-import qrcode
-import numpy as np
-from PIL import Image, ImageDraw, ImageFont
-from pyzbar import pyzbar
-import io
 import base64
+from utils.decode_pipeline import DecodePipeline
+from utils.tiled_decode import TiledDecoder
+from utils.frame_decode import FrameDecoder, is_multiframe
+from utils.metrics import count_error, stage_timer
+from utils.qr_cache import QRImageCache, qr_image_cache
+from utils.qr_renderer import ERROR_LEVELS, QRRenderer
+from utils.lazy_import import lazy_import
+
+np = lazy_import('numpy')
+
+OUTPUT_MIMETYPES = {
+    'data_uri': 'application/json',
+    'png': 'image/png',
+    'svg': 'image/svg+xml'
+}
 
 class QRProcessor:
     @staticmethod
-    def decode_qr_from_image(image_path):
+    def decode_qr_from_image(image_path, frame_limits=None):
         """Decode QR codes from an image file"""
         try:
-            # Read image
-            image = cv2.imread(image_path)
-            if image is None:
-                return None, "Could not read image file"
+            # Read encoded file bytes; decoding happens in the pipeline
+            image_array = np.fromfile(image_path, np.uint8)
+            if is_multiframe(image_array):
+                return FrameDecoder.decode(image_array, frame_limits, "Could not read image file")
+            return DecodePipeline.decode(image_array, "Could not read image file")
             
-            # Decode QR codes
-            qr_codes = pyzbar.decode(image)
+        except Exception as e:
+            count_error('decode_exception')
+            return None, f"Error processing image: {str(e)}"
+    
+    @staticmethod
+    def decode_qr_from_bytes(image_buffer, frame_limits=None):
+        """Decode QR codes from an in-memory encoded image buffer.
+
+        Accepts anything exposing the buffer protocol (bytes, bytearray,
+        memoryview) and wraps it in a NumPy view without copying it first.
+        Animated and multi-page images decode every frame within
+        frame_limits (see utils.frame_decode.frame_limits) and annotate
+        each result with its 'frame' index.
+        """
+        try:
+            if is_multiframe(image_buffer):
+                return FrameDecoder.decode(image_buffer, frame_limits)
             
-            if not qr_codes:
-                return None, "No QR codes found in image"
+            image_array = np.frombuffer(image_buffer, np.uint8)
+            return DecodePipeline.decode(image_array)
             
-            results = []
-            for qr in qr_codes:
-                result = {
-                    'data': qr.data.decode('utf-8'),
-                    'type': qr.type,
-                    'position': {
-                        'x': qr.rect.left,
-                        'y': qr.rect.top,
-                        'width': qr.rect.width,
-                        'height': qr.rect.height
-                    }
-                }
-                results.append(result)
+        except Exception as e:
+            count_error('decode_exception')
+            return None, f"Error processing image data: {str(e)}"
+    
+    @staticmethod
+    def decode_qr_in_region(image_buffer, region):
+        """Decode a camera frame, searching the tracked region first.
+
+        Returns (results, error, region_hit); see DecodePipeline.decode_region.
+        """
+        try:
+            image_array = np.frombuffer(image_buffer, np.uint8)
+            return DecodePipeline.decode_region(image_array, region)
             
-            return results, None
+        except Exception as e:
+            count_error('decode_exception')
+            return None, f"Error processing image data: {str(e)}", False
+    
+    @staticmethod
+    def decode_qr_tiled(image_buffer, module_size):
+        """Decode a large multi-code image as overlapping tiles.
+
+        Returns (results, error, tiles); see TiledDecoder.decode.
+        """
+        try:
+            image_array = np.frombuffer(image_buffer, np.uint8)
+            return TiledDecoder.decode(image_array, module_size)
             
         except Exception as e:
-            return None, f"Error processing image: {str(e)}"
+            count_error('decode_exception')
+            return None, f"Error processing image data: {str(e)}", []
     
     @staticmethod
     def decode_qr_from_base64(base64_data):
         """Decode QR codes from base64 image data"""
+        image_bytes, error = QRProcessor.base64_to_bytes(base64_data)
+        if error:
+            return None, error
+        
+        return QRProcessor.decode_qr_from_bytes(image_bytes)
+    
+    @staticmethod
+    def base64_to_bytes(base64_data):
+        """Decode a base64 image (optionally a data URI) to bytes"""
         try:
             # Remove header if present
             if ',' in base64_data:
                 base64_data = base64_data.split(',')[1]
             
-            # Decode base64 to image
-            image_bytes = base64.b64decode(base64_data)
-            image_array = np.frombuffer(image_bytes, np.uint8)
-            image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-            
-            if image is None:
-                return None, "Could not decode image data"
-            
-            # Decode QR codes
-            qr_codes = pyzbar.decode(image)
-            
-            if not qr_codes:
-                return None, "No QR codes found in image"
-            
-            results = []
-            for qr in qr_codes:
-                result = {
-                    'data': qr.data.decode('utf-8'),
-                    'type': qr.type,
-                    'position': {
-                        'x': qr.rect.left,
-                        'y': qr.rect.top,
-                        'width': qr.rect.width,
-                        'height': qr.rect.height
-                    }
-                }
-                results.append(result)
-            
-            return results, None
+            # Decode base64 to image bytes
+            with stage_timer('base64_decode'):
+                return base64.b64decode(base64_data), None
             
         except Exception as e:
+            count_error('invalid_base64')
             return None, f"Error processing image data: {str(e)}"
     
     @staticmethod
-    def generate_qr_code(data, size=(300, 300), border=4, error_correction='M'):
-        """Generate QR code from text data"""
+    def cache_key(data, size=(300, 300), border=4, error_correction='M', output_format='data_uri'):
+        """Content address (and strong ETag) for a generated QR code"""
+        if error_correction not in ERROR_LEVELS:
+            error_correction = 'M'
+        return QRImageCache.make_key(data, size, border, error_correction, output_format)
+    
+    @staticmethod
+    def generate_qr_code(data, size=(300, 300), border=4, error_correction='M', output_format='data_uri'):
+        """Generate QR code from text data.
+
+        output_format 'data_uri' returns a base64 PNG data URI string;
+        'png' and 'svg' return the encoded image bytes.
+        """
         try:
-            # Set error correction level
-            error_levels = {
-                'L': qrcode.constants.ERROR_CORRECT_L,
-                'M': qrcode.constants.ERROR_CORRECT_M,
-                'Q': qrcode.constants.ERROR_CORRECT_Q,
-                'H': qrcode.constants.ERROR_CORRECT_H
-            }
-            
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=error_levels.get(error_correction, qrcode.constants.ERROR_CORRECT_M),
-                box_size=10,
-                border=border,
-            )
+            if output_format not in OUTPUT_MIMETYPES:
+                return None, f"Unsupported output format: {output_format}"
             
-            qr.add_data(data)
-            qr.make(fit=True)
+            key = QRProcessor.cache_key(data, size, border, error_correction, output_format)
+            image = qr_image_cache.get(key)
             
-            # Create QR code image
-            img = qr.make_image(fill_color="black", back_color="white")
-            img = img.resize(size, Image.Resampling.LANCZOS)
-            
-            # Convert to base64 for web display
-            buffer = io.BytesIO()
-            img.save(buffer, format='PNG')
-            buffer.seek(0)
+            if image is None:
+                image = QRProcessor._render(data, size, border, error_correction, output_format)
+                qr_image_cache.put(key, image)
             
-            img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+            if output_format == 'data_uri':
+                image = image.decode('ascii')
             
             return {
-                'image': f"data:image/png;base64,{img_base64}",
+                'image': image,
                 'size': size,
                 'data': data
             }, None
             
         except Exception as e:
+            count_error('generate_exception')
             return None, f"Error generating QR code: {str(e)}"
     
+    @staticmethod
+    def _render(data, size, border, error_correction, output_format):
+        """Render a QR code at the exact size in the requested format"""
+        with stage_timer('qr_render'):
+            matrix = QRRenderer.build_matrix(data, border, error_correction)
+        
+        if output_format == 'svg':
+            with stage_timer('svg_encode'):
+                return QRRenderer.render_svg(matrix, size)
+        
+        with stage_timer('png_encode'):
+            png = QRRenderer.render_png(matrix, size)
+        if output_format == 'png':
+            return png
+        
+        # Convert to base64 for web display
+        return b'data:image/png;base64,' + base64.b64encode(png)
+    
     @staticmethod
     def get_qr_info(data):
         """Get information about QR code content"""
@@ -0,0 +1,103 @@
+import io
+from utils.lazy_import import lazy_import
+
+np = lazy_import('numpy')
+qrcode = lazy_import('qrcode')
+Image = lazy_import('PIL.Image')
+
+# qrcode.constants.ERROR_CORRECT_* (the format-information bits of the QR
+# spec), spelled out so qrcode is only imported on the first render
+ERROR_LEVELS = {
+    'L': 1,
+    'M': 0,
+    'Q': 3,
+    'H': 2
+}
+
+class QRRenderer:
+    """Render QR module matrices directly at the requested output size.
+
+    The PNG path scales each module by a whole number of pixels in a single
+    NumPy step and pads the rest with white, so module edges stay sharp and
+    no resampling is needed. Output is a 1-bit PNG. The SVG path emits one
+    path made of horizontal runs of dark modules.
+    """
+    
+    @staticmethod
+    def build_matrix(data, border=4, error_correction='M'):
+        """Build the module matrix (True = dark), quiet zone included"""
+        qr = qrcode.QRCode(
+            version=1,
+            error_correction=ERROR_LEVELS.get(error_correction, ERROR_LEVELS['M']),
+            border=border,
+        )
+        qr.add_data(data)
+        qr.make(fit=True)
+        return np.asarray(qr.get_matrix(), dtype=bool)
+    
+    @staticmethod
+    def rasterize(matrix, size):
+        """Rasterize a module matrix to exactly size=(width, height) pixels.
+
+        Returns a boolean array where True is a white pixel.
+        """
+        width, height = size
+        modules = matrix.shape[0]
+        light = ~matrix
+        
+        scale = min(width, height) // modules
+        if scale < 1:
+            # Smaller than one pixel per module: nearest-neighbour sample
+            rows = np.arange(height) * modules // height
+            cols = np.arange(width) * modules // width
+            return light[np.ix_(rows, cols)]
+        
+        scaled = light.repeat(scale, axis=0).repeat(scale, axis=1)
+        pad_y = height - scaled.shape[0]
+        pad_x = width - scaled.shape[1]
+        return np.pad(
+            scaled,
+            ((pad_y // 2, pad_y - pad_y // 2), (pad_x // 2, pad_x - pad_x // 2)),
+            constant_values=True
+        )
+    
+    @staticmethod
+    def render_png(matrix, size):
+        """Encode a module matrix as a 1-bit PNG at the exact size"""
+        image = Image.fromarray(QRRenderer.rasterize(matrix, size))
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        return buffer.getvalue()
+    
+    @staticmethod
+    def dark_runs(matrix):
+        """Return (x, y, length) for every horizontal run of dark modules"""
+        runs = []
+        for y, row in enumerate(matrix):
+            # Run boundaries: indices where the row switches light/dark
+            padded = np.concatenate(([False], row, [False]))
+            edges = np.flatnonzero(padded[1:] != padded[:-1])
+            for start, end in zip(edges[::2], edges[1::2]):
+                runs.append((int(start), y, int(end - start)))
+        return runs
+    
+    @staticmethod
+    def render_svg(matrix, size):
+        """Encode a module matrix as an SVG document"""
+        width, height = size
+        modules = matrix.shape[0]
+        
+        segments = [
+            f'M{x} {y}h{length}v1h-{length}z'
+            for x, y, length in QRRenderer.dark_runs(matrix)
+        ]
+        
+        svg = (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {modules} {modules}" shape-rendering="crispEdges">'
+            f'<rect width="{modules}" height="{modules}" fill="#fff"/>'
+            f'<path fill="#000" d="{"".join(segments)}"/>'
+            '</svg>\n'
+        )
+        return svg.encode('utf-8')
@@ -0,0 +1,179 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+from utils.lazy_import import lazy_import
+from utils.stats import stats
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+STATS_GROUP = 'decode_result_cache'
+
+class DecodeResultCache:
+    """Per-worker cache of decode results for recently seen images.
+
+    Entries are found by an exact hash of the encoded bytes, or, for
+    camera frames, by a difference hash (dHash) of the downscaled grayscale
+    frame within DECODE_CACHE_MAX_DISTANCE bits of an earlier frame from the
+    same scan session and decoded with the same variant (frame limits),
+    so a code held steady in front of the camera is decoded once per TTL
+    rather than every frame. Callers store only decodes that found codes:
+    a miss on a blurry frame must not answer for the sharp frame of the
+    same scene that follows it. Entries expire DECODE_CACHE_TTL seconds
+    after they are stored (hits do not extend them) and the oldest are
+    evicted beyond DECODE_CACHE_SIZE. Each entry remembers how long its
+    decode took, which is credited to 'decode_ms_saved' on every hit.
+    """
+    
+    # Neighbouring pixels must differ by more than this to set a dHash bit,
+    # so sensor noise on flat background does not flip bits
+    PERCEPTUAL_DELTA = 4
+    
+    def __init__(self, max_entries=512, ttl=5, hash_size=32, max_distance=8):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hash_size = hash_size
+        self.max_distance = max_distance
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_config(cls):
+        return cls(
+            max_entries=Config.DECODE_CACHE_SIZE,
+            ttl=Config.DECODE_CACHE_TTL,
+            hash_size=Config.DECODE_CACHE_HASH_SIZE,
+            max_distance=Config.DECODE_CACHE_MAX_DISTANCE
+        )
+    
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl > 0
+    
+    @staticmethod
+    def content_key(buffer):
+        """Fast exact hash of the encoded image bytes"""
+        return hashlib.blake2b(buffer, digest_size=16).digest()
+    
+    def perceptual_hash(self, buffer):
+        """Difference hash of the frame as an int, or None if undecodable.
+
+        The frame is decoded at 1/8 scale (cheap for JPEG), shrunk to
+        (hash_size + 1) x hash_size, and each bit records whether a pixel
+        is clearly brighter than its left-hand neighbour.
+        """
+        try:
+            image = cv2.imdecode(np.frombuffer(buffer, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+            if image is None:
+                return None
+            small = cv2.resize(image, (self.hash_size + 1, self.hash_size), interpolation=cv2.INTER_AREA)
+            small = small.astype(np.int16)
+            bits = np.packbits(small[:, 1:] - small[:, :-1] > self.PERCEPTUAL_DELTA)
+            return int.from_bytes(bits.tobytes(), 'big')
+        except Exception:
+            return None
+    
+    def get(self, key, phash=None, session=None, variant=None):
+        """Return the cached (results, error) for an image, or None"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            kind = 'exact_hits'
+            
+            if entry is None and phash is not None:
+                kind = 'perceptual_hits'
+                # Newest first: the most recent frame is the likeliest match
+                for candidate in reversed(self._entries.values()):
+                    if candidate['phash'] is not None and candidate['session'] == session and \
+                            candidate['variant'] == variant and \
+                            (candidate['phash'] ^ phash).bit_count() <= self.max_distance:
+                        entry = candidate
+                        break
+        
+        if entry is None:
+            stats.incr(STATS_GROUP, 'misses')
+            return None
+        
+        stats.incr(STATS_GROUP, kind)
+        stats.incr(STATS_GROUP, 'decode_ms_saved', entry['cost_ms'])
+        return entry['value']
+    
+    def put(self, key, phash, value, cost_ms, session=None, variant=None):
+        """Store a decode result with the time its decode took"""
+        with self._lock:
+            self._entries[key] = {
+                'key': key,
+                'phash': phash,
+                'session': session,
+                'variant': variant,
+                'value': value,
+                'cost_ms': cost_ms,
+                'expires': time.monotonic() + self.ttl
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                stats.incr(STATS_GROUP, 'evictions')
+    
+    def _expire(self, now):
+        # Insertion order is expiry order, so stop at the first live entry
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry['expires'] > now:
+                break
+            del self._entries[key]
+            stats.incr(STATS_GROUP, 'expired')
+    
+    def gauges(self):
+        """Entry count and hit rate for this worker"""
+        hits = stats.get(STATS_GROUP, 'exact_hits') + stats.get(STATS_GROUP, 'perceptual_hits')
+        lookups = hits + stats.get(STATS_GROUP, 'misses')
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            'entries': entries,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+        }
+
+class RecentScans:
+    """Dedup window for history writes, per scan session.
+
+    should_record(session, payload) is True the first time a payload is
+    seen in a session and again only after HISTORY_DEDUP_WINDOW seconds
+    without it, so a code held in front of the camera is recorded once.
+    """
+    
+    def __init__(self, window=30, max_entries=10000):
+        self.window = window
+        self.max_entries = max_entries
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_config(cls):
+        return cls(window=Config.HISTORY_DEDUP_WINDOW)
+    
+    def should_record(self, session, payload):
+        if self.window <= 0:
+            return True
+        
+        now = time.monotonic()
+        key = (session, payload)
+        with self._lock:
+            last_seen = self._seen.pop(key, None)
+            # Every sighting extends the window
+            self._seen[key] = now
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+        
+        if last_seen is not None and now - last_seen < self.window:
+            stats.incr(STATS_GROUP, 'history_deduplicated')
+            return False
+        return True
+
+decode_result_cache = DecodeResultCache.from_config()
+recent_scans = RecentScans.from_config()
+stats.register(STATS_GROUP, decode_result_cache.gauges)
@@ -0,0 +1,122 @@
+import time
+from config import Config
+from utils.stats import stats
+
+STATS_GROUP = 'scan_stream'
+
+class ScanSession:
+    """State carried between frames of one streaming camera scan.
+    
+    Each frame is compared with the last decoded frame by dHash; if that
+    decode found codes and fewer than change_bits bits differ, the frame
+    is skipped and the previous results are returned (a miss is never
+    reused: a sharper frame of the same scene hashes alike). Otherwise
+    the frame is decoded, searching the region around the last code
+    position first (expanded by roi_margin of the code size on every
+    side) before the full frame. The reply carries the delay the client
+    should wait before sending the next frame.
+    """
+    
+    def __init__(self, session_id, min_interval=200, interval=500, max_interval=2000,
+                 change_bits=12, roi_margin=0.5):
+        self.session_id = session_id
+        self.min_interval = min_interval
+        self.base_interval = interval
+        self.max_interval = max_interval
+        self.change_bits = change_bits
+        self.roi_margin = roi_margin
+        self.interval = interval
+        self.last_hash = None
+        self.last_results = []
+        self.last_position = None
+    
+    @classmethod
+    def from_config(cls, session_id):
+        return cls(
+            session_id,
+            min_interval=Config.SCAN_STREAM_MIN_INTERVAL,
+            interval=Config.SCAN_STREAM_INTERVAL,
+            max_interval=Config.SCAN_STREAM_MAX_INTERVAL,
+            change_bits=Config.SCAN_STREAM_CHANGE_BITS,
+            roi_margin=Config.SCAN_STREAM_ROI_MARGIN
+        )
+    
+    def is_unchanged(self, phash):
+        """True when a frame barely differs from the last decode, which found codes"""
+        if phash is None or self.last_hash is None or not self.last_results:
+            return False
+        return (phash ^ self.last_hash).bit_count() < self.change_bits
+    
+    def region(self):
+        """(x, y, width, height) to search first, or None without a fix"""
+        if not self.last_position:
+            return None
+        
+        pad_x = int(self.last_position['width'] * self.roi_margin)
+        pad_y = int(self.last_position['height'] * self.roi_margin)
+        return (
+            self.last_position['x'] - pad_x,
+            self.last_position['y'] - pad_y,
+            self.last_position['width'] + 2 * pad_x,
+            self.last_position['height'] + 2 * pad_y
+        )
+    
+    def process(self, frame, phash, decode):
+        """Handle one frame and return the reply dict.
+        
+        decode(frame, region) must return (results, error, region_hit).
+        """
+        stats.incr(STATS_GROUP, 'frames')
+        
+        if self.is_unchanged(phash):
+            stats.incr(STATS_GROUP, 'frames_skipped')
+            # Nothing moved: back off until the scene changes
+            self.interval = min(self.max_interval, int(self.interval * 1.5))
+            return self._reply(self.last_results, skipped=True)
+        
+        start = time.perf_counter()
+        results, error, region_hit = decode(frame, self.region())
+        decode_ms = (time.perf_counter() - start) * 1000
+        stats.incr(STATS_GROUP, 'region_hits' if region_hit else 'full_frame_decodes')
+        
+        self.last_hash = phash
+        self.last_results = results or []
+        self.last_position = _bounding_box(self.last_results)
+        
+        if self.last_results:
+            # Code in view: track it at the normal rate
+            self.interval = self.base_interval
+        else:
+            # Scene is changing without a code: look again soon
+            self.interval = self.min_interval
+        # Never ask for frames faster than this worker decodes them
+        self.interval = min(self.max_interval, max(self.interval, int(decode_ms * 2)))
+        
+        return self._reply(self.last_results, error=None if results else error,
+                           tracked=region_hit, decode_ms=round(decode_ms, 2))
+    
+    def _reply(self, results, skipped=False, error=None, tracked=False, decode_ms=0.0):
+        reply = {
+            'success': bool(results),
+            'results': results,
+            'count': len(results),
+            'skipped': skipped,
+            'tracked': tracked,
+            'decode_ms': decode_ms,
+            'next_interval_ms': self.interval
+        }
+        if error:
+            reply['error'] = error
+        return reply
+
+def _bounding_box(results):
+    """Smallest box covering every result position, or None"""
+    positions = [result['position'] for result in results if result.get('position')]
+    if not positions:
+        return None
+    
+    left = min(p['x'] for p in positions)
+    top = min(p['y'] for p in positions)
+    right = max(p['x'] + p['width'] for p in positions)
+    bottom = max(p['y'] + p['height'] for p in positions)
+    return {'x': left, 'y': top, 'width': right - left, 'height': bottom - top}
@@ -0,0 +1,86 @@
+import os
+import threading
+from collections import defaultdict
+
+# Upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+class StatsRegistry:
+    """Thread-safe named counters grouped by subsystem.
+
+    Counters live in process memory, so under Gunicorn every worker reports
+    its own values (the snapshot includes the worker pid).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: defaultdict(int))
+        self._providers = {}
+    
+    def incr(self, group, name, amount=1):
+        """Increment a counter"""
+        with self._lock:
+            self._counters[group][name] += amount
+    
+    def observe(self, group, name, value, buckets=LATENCY_BUCKETS_MS):
+        """Add a value to a histogram kept as cumulative counters.
+
+        Records name_le_<bound> for every bucket the value fits in, plus
+        name_count and name_sum.
+        """
+        with self._lock:
+            counters = self._counters[group]
+            for bound in buckets:
+                if value <= bound:
+                    counters[f'{name}_le_{bound}'] += 1
+            counters[f'{name}_count'] += 1
+            counters[f'{name}_sum'] += value
+    
+    def drain(self):
+        """Return all counters and reset them (pool processes report deltas)"""
+        with self._lock:
+            result = {group: dict(values) for group, values in self._counters.items()}
+            self._counters.clear()
+        return result
+    
+    def merge(self, counters):
+        """Add counters returned by drain() in another process"""
+        with self._lock:
+            for group, values in counters.items():
+                for name, amount in values.items():
+                    self._counters[group][name] += amount
+    
+    def get(self, group, name):
+        """Read a single counter value"""
+        with self._lock:
+            return self._counters[group].get(name, 0)
+    
+    def register(self, group, provider):
+        """Register a callable returning a dict of derived values for a group"""
+        self._providers[group] = provider
+    
+    def reset(self, group=None):
+        """Reset counters for one group, or all groups"""
+        with self._lock:
+            if group is None:
+                self._counters.clear()
+            else:
+                self._counters.pop(group, None)
+    
+    def counters(self):
+        """Return a copy of the raw counters, without derived values"""
+        with self._lock:
+            return {group: dict(values) for group, values in self._counters.items()}
+    
+    def derived(self):
+        """Return the values of every registered provider"""
+        return {group: provider() for group, provider in self._providers.items()}
+    
+    def snapshot(self):
+        """Return all counters and derived values"""
+        result = self.counters()
+        for group, values in self.derived().items():
+            result.setdefault(group, {}).update(values)
+        
+        return {'pid': os.getpid(), 'groups': result}
+
+stats = StatsRegistry()
@@ -0,0 +1,111 @@
+import time
+from config import Config
+from utils.decode_executor import decode_threads
+from utils.decode_pipeline import DecodePipeline
+from utils.decoders import dedupe, position_box
+from utils.lazy_import import lazy_import
+from utils.stats import stats
+from utils.metrics import count_error, stage_timer
+
+cv2 = lazy_import('cv2')
+
+STATS_GROUP = 'tiled_decode'
+
+# A QR symbol is surrounded by a 4-module quiet zone on each side
+QUIET_ZONE_MODULES = 8
+
+def tile_grid(width, height, tile_size, overlap):
+    """(x, y, width, height) tiles covering the image with the given overlap.
+    
+    Neighbouring tiles share `overlap` pixels, so any code no larger than
+    the overlap lies wholly inside at least one tile. Edge tiles are moved
+    inwards rather than shrunk.
+    """
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        step = tile_size - overlap
+        positions = list(range(0, length - tile_size, step))
+        positions.append(length - tile_size)
+        return positions
+    
+    return [
+        (x, y, min(tile_size, width), min(tile_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+class TiledDecoder:
+    """Decode large images with many codes as overlapping tiles.
+    
+    Tile geometry follows from the expected module size in pixels: a code
+    spans about module_size * (DECODE_TILE_CODE_MODULES + quiet zone)
+    pixels, tiles overlap by that much and are DECODE_TILE_SPAN codes
+    wide. Tiles are decoded at full resolution on the decode thread pool,
+    then detections are translated back to image coordinates and
+    deduplicated across tile borders.
+    """
+    
+    @staticmethod
+    def geometry(module_size):
+        """(tile_size, overlap) in pixels for an expected module size"""
+        code_side = int(module_size * (Config.DECODE_TILE_CODE_MODULES + QUIET_ZONE_MODULES))
+        return max(Config.DECODE_TILE_MIN_SIZE, code_side * Config.DECODE_TILE_SPAN), code_side
+    
+    @staticmethod
+    def decode(image_array, module_size, decode_error="Could not decode image data"):
+        """Decode every tile of an encoded image.
+        
+        Returns (results, error, tiles); tiles lists each tile's box, how
+        many codes it found and how long it took.
+        """
+        stats.incr(STATS_GROUP, 'images')
+        
+        with stage_timer('image_decode'):
+            image = cv2.imdecode(image_array, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            count_error('undecodable_image')
+            return None, decode_error, []
+        
+        height, width = image.shape[:2]
+        tile_size, overlap = TiledDecoder.geometry(module_size)
+        grid = tile_grid(width, height, tile_size, overlap)
+        # Bound the work for tiny module sizes on huge images
+        while len(grid) > Config.DECODE_TILE_MAX_TILES:
+            tile_size *= 2
+            grid = tile_grid(width, height, tile_size, overlap)
+        
+        outcomes = list(decode_threads().map(
+            lambda box: TiledDecoder._decode_tile(image, box), grid
+        ))
+        
+        found, tiles = [], []
+        for (x, y, tile_width, tile_height), (results, elapsed_ms) in zip(grid, outcomes):
+            found.extend(results)
+            tiles.append({
+                'x': x,
+                'y': y,
+                'width': tile_width,
+                'height': tile_height,
+                'count': len(results),
+                'ms': round(elapsed_ms, 2)
+            })
+        
+        results = dedupe(found, box=position_box)
+        stats.incr(STATS_GROUP, 'tiles', len(grid))
+        stats.incr(STATS_GROUP, 'codes', len(results))
+        if not results:
+            count_error('no_code')
+            return None, "No QR codes found in image", tiles
+        return results, None, tiles
+    
+    @staticmethod
+    def _decode_tile(image, box):
+        """Run the full-resolution stages on one tile until one finds codes"""
+        x, y, width, height = box
+        tile = image[y:y + height, x:x + width]
+        start = time.perf_counter()
+        results = DecodePipeline.decode_frame(tile, (x, y))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        stats.observe(STATS_GROUP, 'tile_ms', elapsed_ms)
+        return results, elapsed_ms
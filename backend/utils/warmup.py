@@ -0,0 +1,101 @@
+import importlib
+import os
+import threading
+import time
+from utils.decoders import decoder_chain
+from utils.fork_safe import per_process
+from utils.stats import stats
+
+STATS_GROUP = 'warmup'
+
+# Imported by warm_codecs(); everything else in the app loads them lazily
+CODEC_MODULES = ('numpy', 'cv2', 'PIL.Image', 'PIL.ImageSequence', 'PIL.PngImagePlugin',
+                 'qrcode', 'pyzbar.pyzbar')
+
+def warm_codecs():
+    """Import the codec libraries and resolve the decoder backends.
+    
+    Safe before fork: importing starts no threads. Run in a preloading
+    Gunicorn master, the imported pages are shared copy-on-write by every
+    worker; decode pool processes run it as their initializer.
+    """
+    for name in CODEC_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:  # e.g. libzbar missing; the decoder chain reports it
+            pass
+    try:
+        decoder_chain.backends
+    except ValueError as e:
+        print(f"Decoder warm-up: {e}")
+
+class Readiness:
+    """Per-process warm-up state behind /ready.
+    
+    start() runs the warm-up steps once per process on a background
+    thread, so /health answers while the worker warms and /ready answers
+    503 until every step has finished. A step that raises is retried with
+    exponential backoff (retry_delay doubling up to max_retry_delay); the
+    process stays not ready meanwhile and the last error is reported.
+    """
+    
+    def __init__(self, retry_delay=1, max_retry_delay=30):
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._lock = threading.Lock()
+        self._state = per_process(_WarmupState)
+    
+    def start(self, steps):
+        """Run (name, fn) steps in order on a warm-up thread, once per process"""
+        with self._lock:
+            state = self._state.get()
+            if state.started:
+                return
+            state.started = True
+            threading.Thread(target=self._run, args=(steps, state), name='warmup', daemon=True).start()
+    
+    def _run(self, steps, state):
+        for name, fn in steps:
+            delay = self.retry_delay
+            while True:
+                start = time.perf_counter()
+                try:
+                    fn()
+                    break
+                except Exception as e:
+                    state.error = f'{name}: {str(e)}'
+                    stats.incr(STATS_GROUP, 'errors')
+                    print(f"Warm-up failed at {name}, retrying in {delay}s: {e}")
+                    time.sleep(delay)
+                    delay = min(delay * 2, self.max_retry_delay)
+            state.steps[name] = round((time.perf_counter() - start) * 1000, 1)
+        state.error = None
+        stats.incr(STATS_GROUP, 'completed')
+        state.done.set()
+    
+    @property
+    def ready(self):
+        state = self._state.peek()
+        return state is not None and state.done.is_set()
+    
+    def wait(self, timeout=None):
+        """Block until warmed up; returns whether it is"""
+        return self._state.get().done.wait(timeout) and self.ready
+    
+    def status(self):
+        state = self._state.peek() or _WarmupState()
+        status = {'ready': self.ready, 'pid': os.getpid(), 'steps_ms': dict(state.steps)}
+        if state.error:
+            status['error'] = state.error
+        return status
+
+class _WarmupState:
+    """One process's warm-up progress"""
+    
+    def __init__(self):
+        self.started = False
+        self.done = threading.Event()
+        self.steps = {}
+        self.error = None
+
+readiness = Readiness()
@@ -8,8 +8,23 @@ const totalRecordsSpan = document.getElementById('total-records');
 const totalScansSpan = document.getElementById('total-scans');
 const totalGenerationsSpan = document.getElementById('total-generations');
 
+const PAGE_SIZE = 25;
+
 let historyData = [];
 let currentFilter = 'all';
+let nextCursor = null;
+let pageLoading = false;
+
+// Sentinel below the list; loads the next page when scrolled into view
+const pageSentinel = document.createElement('div');
+pageSentinel.className = 'history-sentinel';
+historyList.after(pageSentinel);
+
+const pageObserver = new IntersectionObserver(entries => {
+    if (entries.some(entry => entry.isIntersecting)) {
+        loadNextPage();
+    }
+}, { rootMargin: '200px' });
 
 // Initialize history page
 document.addEventListener('DOMContentLoaded', () => {
@@ -29,9 +44,9 @@ function setupFilterButtons() {
             filterButtons.forEach(b => b.classList.remove('active'));
             btn.classList.add('active');
             
-            // Apply filter
+            // Reload from the server with the new filter
             currentFilter = filter;
-            filterHistory();
+            loadHistory();
         });
     });
 }
@@ -45,17 +60,19 @@ function setupHistoryActions() {
     });
 }
 
-// Load history from API
+// Load the first page of history from API
 async function loadHistory() {
     try {
         utils.showLoading();
         hideEmptyState();
+        pageObserver.unobserve(pageSentinel);
         
-        const result = await api.getHistory(100); // Load more records for better UX
+        const result = await fetchPage(null);
         
         if (result.success) {
             historyData = result.history;
             filterHistory();
+            updatePaging(result.next_cursor);
         } else {
             utils.showToast('Failed to load history', 'error');
             showEmptyState();
@@ -70,6 +87,49 @@ async function loadHistory() {
     }
 }
 
+// Load the page after nextCursor and append it
+async function loadNextPage() {
+    if (!nextCursor || pageLoading) {
+        return;
+    }
+    
+    try {
+        pageLoading = true;
+        const result = await fetchPage(nextCursor);
+        
+        if (result.success) {
+            historyData = historyData.concat(result.history);
+            displayHistory(result.history, true);
+            updatePaging(result.next_cursor);
+        }
+        
+    } catch (error) {
+        console.error('Load page error:', error);
+        utils.showToast(error.message || 'Failed to load more history', 'error');
+    } finally {
+        pageLoading = false;
+    }
+}
+
+// Request one page for the current filter
+function fetchPage(cursor) {
+    return api.getHistory({
+        limit: PAGE_SIZE,
+        cursor,
+        type: currentFilter === 'all' ? null : currentFilter
+    });
+}
+
+// Watch the sentinel only while more pages remain
+function updatePaging(cursor) {
+    nextCursor = cursor;
+    if (nextCursor) {
+        pageObserver.observe(pageSentinel);
+    } else {
+        pageObserver.unobserve(pageSentinel);
+    }
+}
+
 // Load statistics
 async function loadStats() {
     try {
@@ -87,37 +147,30 @@ async function loadStats() {
     }
 }
 
-// Filter history
+// Show loaded history (already filtered by type on the server)
 function filterHistory() {
-    let filteredData = historyData;
-    
-    if (currentFilter !== 'all') {
-        filteredData = historyData.filter(item => item.type === currentFilter);
-    }
-    
-    if (filteredData.length === 0) {
+    if (historyData.length === 0) {
         showEmptyState();
     } else {
         hideEmptyState();
-        displayHistory(filteredData);
+        displayHistory(historyData);
     }
 }
 
-// Display history
-function displayHistory(data) {
-    historyList.innerHTML = '';
+// Display history, replacing the list or appending a page
+function displayHistory(data, append = false) {
+    if (!append) {
+        historyList.innerHTML = '';
+    }
     
-    data.forEach(item => {
+    data.forEach((item, index) => {
         const historyItem = createHistoryItem(item);
+        
+        // Add animation
+        historyItem.style.animationDelay = `${index * 0.1}s`;
+        historyItem.classList.add('fade-in');
         historyList.appendChild(historyItem);
     });
-    
-    // Add animation
-    const items = historyList.querySelectorAll('.history-item');
-    items.forEach((item, index) => {
-        item.style.animationDelay = `${index * 0.1}s`;
-        item.classList.add('fade-in');
-    });
 }
 
 // Create history item element
@@ -284,9 +337,12 @@ async function deleteHistoryItem(id) {
                     historyData = historyData.filter(h => h.id !== id);
                     
                     // Check if empty
-                    if (historyData.length === 0 || 
-                        (currentFilter !== 'all' && historyData.filter(h => h.type === currentFilter).length === 0)) {
-                        showEmptyState();
+                    if (historyData.length === 0) {
+                        if (nextCursor) {
+                            loadNextPage();
+                        } else {
+                            showEmptyState();
+                        }
                     }
                     
                     // Update stats
@@ -318,6 +374,7 @@ async function clearAllHistory() {
         
         if (result.success) {
             historyData = [];
+            updatePaging(null);
             showEmptyState();
             loadStats(); // Update stats
             utils.showToast(result.message || 'History cleared successfully', 'success');
@@ -345,49 +402,15 @@ function hideEmptyState() {
     emptyState.style.display = 'none';
 }
 
-// Export history data
+// Export history data (streamed by the server, current filter applied)
 function exportHistory() {
-    if (historyData.length === 0) {
-        utils.showToast('No history to export', 'error');
-        return;
+    const query = new URLSearchParams({ format: 'csv' });
+    if (currentFilter !== 'all') {
+        query.set('type', currentFilter);
     }
     
-    const exportData = historyData.map(item => ({
-        type: item.type,
-        content: item.content,
-        timestamp: item.timestamp,
-        content_type: item.data?.qr_info?.type || 'text',
-        method: item.data?.method || 'unknown'
-    }));
-    
-    const csv = convertToCSV(exportData);
-    const blob = new Blob([csv], { type: 'text/csv' });
-    const url = URL.createObjectURL(blob);
     const filename = `qr_history_${new Date().toISOString().split('T')[0]}.csv`;
-    
-    utils.downloadFile(url, filename);
-    utils.showToast('History exported successfully', 'success');
-}
-
-// Convert data to CSV
-function convertToCSV(data) {
-    if (data.length === 0) return '';
-    
-    const headers = Object.keys(data[0]);
-    const csvHeaders = headers.join(',');
-    
-    const csvRows = data.map(row => {
-        return headers.map(header => {
-            const value = row[header] || '';
-            // Escape quotes and wrap in quotes if contains comma or newline
-            if (typeof value === 'string' && (value.includes(',') || value.includes('\n') || value.includes('"'))) {
-                return `"${value.replace(/"/g, '""')}"`;
-            }
-            return value;
-        }).join(',');
-    });
-    
-    return [csvHeaders, ...csvRows].join('\n');
+    utils.downloadFile(`${API_BASE_URL}/history/export?${query}`, filename);
 }
 
 // Search history
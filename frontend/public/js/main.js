@@ -1,6 +1,11 @@
 // Global configuration
 const API_BASE_URL = 'http://localhost:5000/api';
 
+// Identifies this tab's scans so the backend records a steady code once
+const SCAN_SESSION_ID = (window.crypto && crypto.randomUUID)
+    ? crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
 // Utility functions
 const utils = {
     // Show loading state
@@ -210,12 +215,49 @@ const api = {
         }
     },
 
+    // Scan QR from a binary image blob (compressed camera frames)
+    scanFromBlob: async (blob) => {
+        try {
+            const response = await fetch(`${API_BASE_URL}/scan/raw`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': blob.type || 'application/octet-stream',
+                    'X-Scan-Session': SCAN_SESSION_ID
+                },
+                body: blob
+            });
+
+            if (!response.ok) {
+                const errorData = await response.json().catch(() => ({}));
+                throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
+            }
+
+            return await response.json();
+        } catch (error) {
+            console.error('Frame upload failed:', error);
+            throw error;
+        }
+    },
+
+    // Open a streaming scan session; send frames as binary messages and
+    // wait next_interval_ms from each JSON reply before sending the next
+    openScanStream: () => {
+        const url = `${API_BASE_URL.replace(/^http/, 'ws')}/scan/stream?session=${encodeURIComponent(SCAN_SESSION_ID)}`;
+        const socket = new WebSocket(url);
+        socket.binaryType = 'arraybuffer';
+        return socket;
+    },
+
     // Scan QR from file
     scanFromFile: (file) => api.uploadFile('/scan/file', file),
 
     // Scan QR from image data
     scanFromData: (imageData) => api.request('/scan/data', {
         method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-Scan-Session': SCAN_SESSION_ID
+        },
         body: JSON.stringify({ image: imageData })
     }),
 
@@ -231,8 +273,16 @@ const api = {
         body: JSON.stringify({ text })
     }),
 
-    // Get history
-    getHistory: (limit = 50) => api.request(`/history?limit=${limit}`),
+    // Get one page of history; pass next_cursor back as cursor for the next page
+    getHistory: (params = {}) => {
+        const query = new URLSearchParams();
+        Object.entries(params).forEach(([key, value]) => {
+            if (value !== undefined && value !== null && value !== '') {
+                query.set(key, value);
+            }
+        });
+        return api.request(`/history?${query}`);
+    },
 
     // Delete history record
     deleteHistoryRecord: (id) => api.request(`/history/${id}`, {
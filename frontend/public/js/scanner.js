@@ -1,6 +1,20 @@
 let currentStream = null;
 let isScanning = false;
-let scanInterval = null;
+let scanTimer = null;
+let scanSocket = null;
+let frameInFlight = false;
+let streamCodes = '';
+
+// Delay between frames when the server does not suggest one (HTTP fallback)
+const SCAN_INTERVAL_MS = 500;
+
+// Compressed frame encoding for camera scans (WebP where supported)
+const FRAME_QUALITY = 0.8;
+const FRAME_TYPE = (() => {
+    const probe = document.createElement('canvas');
+    probe.width = probe.height = 1;
+    return probe.toDataURL('image/webp').startsWith('data:image/webp') ? 'image/webp' : 'image/jpeg';
+})();
 
 // DOM elements
 const video = document.getElementById('video');
@@ -111,41 +125,101 @@ function stopCamera() {
     captureBtn.style.display = 'none';
 }
 
-// Start continuous scanning
+// Start continuous scanning over a streaming session (HTTP if unavailable)
 function startContinuousScanning() {
     if (isScanning) return;
     
     isScanning = true;
-    scanInterval = setInterval(() => {
-        if (video.videoWidth > 0 && video.videoHeight > 0) {
-            scanVideoFrame();
-        }
-    }, 500); // Scan every 500ms
+    streamCodes = '';
+    openScanStream();
+    scheduleNextFrame(0);
 }
 
 // Stop continuous scanning
 function stopContinuousScanning() {
     isScanning = false;
-    if (scanInterval) {
-        clearInterval(scanInterval);
-        scanInterval = null;
+    if (scanTimer) {
+        clearTimeout(scanTimer);
+        scanTimer = null;
     }
+    if (scanSocket) {
+        const socket = scanSocket;
+        scanSocket = null;
+        socket.close();
+    }
+}
+
+// The server replies to every frame with its results and the delay to
+// wait before the next one (longer while the scene is static)
+function openScanStream() {
+    if (!('WebSocket' in window)) return;
+    
+    const socket = api.openScanStream();
+    socket.onmessage = (event) => {
+        const reply = JSON.parse(event.data);
+        if (reply.type === 'pong') return;
+        
+        frameInFlight = false;
+        if (reply.results && reply.results.length > 0) {
+            handleStreamResults(reply.results);
+        }
+        scheduleNextFrame(reply.next_interval_ms ?? SCAN_INTERVAL_MS);
+    };
+    socket.onclose = () => {
+        if (scanSocket !== socket) return;
+        
+        // Fall back to one HTTP request per frame
+        scanSocket = null;
+        if (frameInFlight) {
+            frameInFlight = false;
+            scheduleNextFrame(SCAN_INTERVAL_MS);
+        }
+    };
+    scanSocket = socket;
+}
+
+// Schedule the next continuous-scan frame
+function scheduleNextFrame(delay) {
+    if (!isScanning) return;
+    
+    clearTimeout(scanTimer);
+    scanTimer = setTimeout(scanVideoFrame, delay);
 }
 
 // Scan video frame
 function scanVideoFrame() {
-    if (!video.videoWidth || !video.videoHeight) return;
-    
-    // Set canvas size to match video
-    canvas.width = video.videoWidth;
-    canvas.height = video.videoHeight;
+    scanTimer = null;
+    if (!isScanning) return;
+    if (!video.videoWidth || !video.videoHeight || frameInFlight) {
+        scheduleNextFrame(SCAN_INTERVAL_MS);
+        return;
+    }
     
-    const ctx = canvas.getContext('2d');
-    ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
+    // Wait for the stream to connect rather than racing it over HTTP
+    if (scanSocket && scanSocket.readyState === WebSocket.CONNECTING) {
+        scheduleNextFrame(50);
+        return;
+    }
     
-    // Convert to base64 and scan
-    const imageData = canvas.toDataURL('image/png');
-    scanImageData(imageData, false); // Don't show loading for continuous scan
+    frameInFlight = true;
+    captureFrameBlob()
+        .then(blob => {
+            if (scanSocket && scanSocket.readyState === WebSocket.OPEN) {
+                // The reply clears frameInFlight and schedules the next frame
+                scanSocket.send(blob);
+                return;
+            }
+            return scanFrame(blob, false) // Don't show loading for continuous scan
+                .finally(() => {
+                    frameInFlight = false;
+                    scheduleNextFrame(SCAN_INTERVAL_MS);
+                });
+        })
+        .catch(error => {
+            console.error('Frame capture error:', error);
+            frameInFlight = false;
+            scheduleNextFrame(SCAN_INTERVAL_MS);
+        });
 }
 
 // Capture and scan
@@ -155,6 +229,13 @@ function captureAndScan() {
         return;
     }
     
+    captureFrameBlob()
+        .then(blob => scanFrame(blob, true)) // Show loading for manual capture
+        .catch(error => utils.showToast(error.message, 'error'));
+}
+
+// Draw the current video frame and encode it as a compressed blob
+function captureFrameBlob() {
     // Set canvas size to match video
     canvas.width = video.videoWidth;
     canvas.height = video.videoHeight;
@@ -162,9 +243,15 @@ function captureAndScan() {
     const ctx = canvas.getContext('2d');
     ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
     
-    // Convert to base64 and scan
-    const imageData = canvas.toDataURL('image/png');
-    scanImageData(imageData, true); // Show loading for manual capture
+    return new Promise((resolve, reject) => {
+        canvas.toBlob(blob => {
+            if (blob) {
+                resolve(blob);
+            } else {
+                reject(new Error('Failed to encode camera frame'));
+            }
+        }, FRAME_TYPE, FRAME_QUALITY);
+    });
 }
 
 // File upload setup
@@ -213,7 +300,7 @@ function handleFileSelect(event) {
 // Handle file
 function handleFile(file) {
     // Validate file type
-    const allowedTypes = ['image/png', 'image/jpeg', 'image/jpg', 'image/gif', 'image/bmp', 'image/webp'];
+    const allowedTypes = ['image/png', 'image/jpeg', 'image/jpg', 'image/gif', 'image/bmp', 'image/webp', 'image/tiff'];
     if (!allowedTypes.includes(file.type)) {
         utils.showToast('Please select a valid image file', 'error');
         return;
@@ -266,15 +353,15 @@ async function scanFromFile() {
     }
 }
 
-// Scan image data
-async function scanImageData(imageData, showLoading = true) {
+// Scan a captured camera frame
+async function scanFrame(blob, showLoading = true) {
     try {
         if (showLoading) {
             utils.showLoading();
             hideResults();
         }
         
-        const result = await api.scanFromData(imageData);
+        const result = await api.scanFromBlob(blob);
         
         if (result.success && result.results.length > 0) {
             displayResults(result.results);
@@ -282,10 +369,8 @@ async function scanImageData(imageData, showLoading = true) {
                 utils.showToast(`Found ${result.results.length} QR code(s)!`, 'success');
             }
             
-            // Stop continuous scanning when QR code is found
             if (isScanning && !showLoading) {
-                stopContinuousScanning();
-                utils.showToast('QR code detected!', 'success');
+                handleContinuousResults();
             }
         } else if (showLoading) {
             utils.showToast('No QR codes found', 'error');
@@ -303,6 +388,23 @@ async function scanImageData(imageData, showLoading = true) {
     }
 }
 
+// Stop continuous scanning when QR code is found
+function handleContinuousResults() {
+    stopContinuousScanning();
+    utils.showToast('QR code detected!', 'success');
+}
+
+// Keep streaming while a code is in view so the server can track it;
+// only announce codes that were not in the previous reply
+function handleStreamResults(results) {
+    const codes = results.map(result => result.data).sort().join('\n');
+    if (codes === streamCodes) return;
+    
+    streamCodes = codes;
+    displayResults(results);
+    utils.showToast('QR code detected!', 'success');
+}
+
 // Display scan results
 function displayResults(results) {
     resultsContainer.innerHTML = '';